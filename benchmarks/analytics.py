@@ -0,0 +1,57 @@
+"""Пропускная способность векторизованного расчёта серий и соблюдения привычек.
+
+    python -m benchmarks.analytics --logs 10000000 --habits 200000
+
+Логи генерируются в памяти, поэтому замеряется только расчёт. Чтение из БД
+замеряется с --from-db на уже заполненной базе.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.common import measure, report, setup
+
+
+def synthetic(logs, habits, days, seed=0):
+    rng = np.random.default_rng(seed)
+    periodicity = rng.integers(1, 8, habits)
+    start_day = np.full(habits, 20000 - days)
+    today = np.full(habits, 20000)
+    log_habit = rng.integers(0, habits, logs)
+    log_day = rng.integers(20000 - days, 20001, logs)
+    return periodicity, start_day, today, log_habit, log_day
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logs', type=int, default=10_000_000)
+    parser.add_argument('--habits', type=int, default=200_000)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--from-db', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from habits.analytics import analyse, build_adherence_report, load_habits, load_logs
+
+    if args.from_db:
+        from django.utils import timezone
+
+        started = time.perf_counter()
+        habit_ids, _, _, _, zone_index, zone_names = load_habits(timezone.now())
+        log_habit, _ = load_logs(habit_ids, zone_index, zone_names)
+        elapsed = time.perf_counter() - started
+        print(f'load from db: {len(log_habit)} logs in {elapsed:.1f}s ({len(log_habit) / elapsed:,.0f} logs/s)')
+        result = build_adherence_report()
+        print(f'full report: {result.logs} logs in {result.duration_ms} ms')
+        return
+
+    data = synthetic(args.logs, args.habits, args.days)
+    durations = measure(lambda: analyse(*data), args.repeat)
+    report(f'analyse {args.logs} logs', durations)
+    print(f'{args.logs / min(durations):,.0f} logs/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Пропускная способность чтения привычек: gunicorn gthread (WSGI) против воркеров uvicorn (ASGI).
+
+Каждый режим запускается отдельным gunicorn с одинаковым числом воркеров; рядом
+с req/s выводится суммарный RSS процессов сервера, чтобы сравнивать при равной памяти.
+
+    python -m benchmarks.asgi_load --modes wsgi:3 asgi:3 --concurrency 64 --duration 15
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import percentile, setup
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def process_tree(pid):
+    pids = [pid]
+    for task in Path(f'/proc/{pid}/task').iterdir():
+        children = (task / 'children').read_text().split()
+        for child in children:
+            pids.extend(process_tree(int(child)))
+    return pids
+
+
+def rss_mb(pid):
+    total = 0
+    for child in process_tree(pid):
+        for line in Path(f'/proc/{child}/status').read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                total += int(line.split()[1])
+    return total / 1024
+
+
+def start_server(mode, workers, threads, port):
+    env = dict(
+        os.environ,
+        SERVER_MODE=mode,
+        GUNICORN_WORKERS=str(workers),
+        GUNICORN_THREADS=str(threads),
+        ASYNC_READ_API='True' if mode == 'asgi' else 'False',
+    )
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/api/', timeout=1)
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'Сервер {mode} не запустился')
+
+
+async def load(url, token, concurrency, duration):
+    latencies, errors = [], 0
+    headers = {'Authorization': f'Bearer {token}', 'Host': 'localhost'}
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(headers=headers, limits=limits, timeout=30) as client:
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.TransportError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modes', nargs='+', default=['wsgi:3', 'asgi:3'], help='режим:воркеры')
+    parser.add_argument('--threads', type=int, default=8, help='потоков на воркер gthread')
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--habits', type=int, default=50)
+    parser.add_argument('--path', default='/api/habits/?page_size=20')
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from habits.models import Habit
+    from users.authentication import issue_token
+
+    User = get_user_model()
+    user, _ = User.objects.get_or_create(username='bench-asgi')
+    missing = args.habits - Habit.objects.filter(user=user).count()
+    Habit.objects.bulk_create([
+        Habit(user=user, place='Дом', time='09:00', action=f'Привычка {i}', execution_time=60, is_public=True)
+        for i in range(max(missing, 0))
+    ])
+    token = issue_token(user)
+
+    for spec in args.modes:
+        mode, workers = spec.split(':')
+        server = start_server(mode, int(workers), args.threads, args.port)
+        try:
+            url = f'http://127.0.0.1:{args.port}{args.path}'
+            asyncio.run(load(url, token, args.concurrency, 2))
+            latencies, errors = asyncio.run(load(url, token, args.concurrency, args.duration))
+            print(
+                f'{mode} x{workers}: {len(latencies) / args.duration:.0f} req/s '
+                f'p50={statistics.median(latencies) * 1000:.1f}ms p99={percentile(latencies, 0.99) * 1000:.1f}ms '
+                f'ошибок={errors} rss={rss_mb(server.pid):.0f}MB'
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
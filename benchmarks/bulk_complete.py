@@ -0,0 +1,51 @@
+"""Отметка N выполнений: по одному через /complete/ против одного /complete-bulk/.
+
+    python -m benchmarks.bulk_complete --items 500
+"""
+import argparse
+import uuid
+
+from benchmarks.common import api_client, measure, report, rollback, setup
+
+
+def seed(items):
+    from django.contrib.auth import get_user_model
+    from habits.models import Habit
+
+    User = get_user_model()
+    user = User.objects.create_user(username='bench-bulk-complete')
+    habits = Habit.objects.bulk_create([
+        Habit(user=user, place='Дом', time='09:00', action=f'Привычка {i}', execution_time=60)
+        for i in range(items)
+    ])
+    return user, [habit.pk for habit in habits]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+
+    with rollback():
+        user, habit_ids = seed(args.items)
+        client = api_client(user)
+
+        def one_by_one():
+            for habit_id in habit_ids:
+                client.post(f'/api/habits/{habit_id}/complete/')
+
+        def bulk():
+            items = [{'habit_id': habit_id, 'idempotency_key': uuid.uuid4().hex} for habit_id in habit_ids]
+            for start in range(0, len(items), settings.BULK_COMPLETE_MAX_ITEMS):
+                client.post('/api/habits/complete-bulk/', {'items': items[start:start + settings.BULK_COMPLETE_MAX_ITEMS]}, format='json')
+
+        report(f'{args.items} x /complete/', measure(one_by_one, args.repeat))
+        report(f'/complete-bulk/ ({args.items} items)', measure(bulk, args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habit_tracker.settings')
+    django.setup()
+
+
+@contextmanager
+def rollback():
+    from django.db import transaction
+
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+def api_client(user):
+    from django.test.utils import setup_test_environment
+    from rest_framework.test import APIClient
+
+    # Разрешает хост testserver, как при запуске тестов
+    setup_test_environment()
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+def analyze(*tables):
+    from django.db import connection
+
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f'ANALYZE {table}')
+
+
+def measure(fn, repeat=5):
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - started)
+    return durations
+
+
+def report(name, durations):
+    print(
+        f'{name}: min={min(durations) * 1000:.1f}ms '
+        f'median={statistics.median(durations) * 1000:.1f}ms '
+        f'max={max(durations) * 1000:.1f}ms'
+    )
+
+
+def percentile(durations, fraction):
+    durations = sorted(durations)
+    return durations[min(int(len(durations) * fraction), len(durations) - 1)]
+
+
+def summarize(durations, elapsed=None, items=1):
+    # elapsed — полное время прогона, если запросы шли параллельно;
+    # items — сколько единиц работы (например, напоминаний) в одном замере
+    elapsed = elapsed or sum(durations)
+    return {
+        'n': len(durations),
+        'p50_ms': round(statistics.median(durations) * 1000, 3),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 3),
+        'mean_ms': round(statistics.mean(durations) * 1000, 3),
+        'throughput': round(len(durations) * items / elapsed, 2),
+    }
@@ -0,0 +1,49 @@
+"""Сравнение двух результатов benchmarks.suite: код возврата 1 при регрессии сверх порога.
+
+    python -m benchmarks.compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+
+# Метрика и направление: для задержек хуже — больше, для пропускной способности — меньше
+METRICS = {'p50_ms': 1, 'p99_ms': 1, 'throughput': -1}
+
+
+def compare(baseline, current, threshold):
+    rows, regressions = [], []
+    for name, result in current['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        for metric, direction in METRICS.items():
+            if not base.get(metric):
+                continue
+            change = (result[metric] - base[metric]) / base[metric]
+            regressed = change * direction > threshold
+            rows.append((name, metric, base[metric], result[metric], change, regressed))
+            if regressed:
+                regressions.append((name, metric))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустимое ухудшение, доля')
+    args = parser.parse_args()
+
+    with open(args.baseline) as baseline, open(args.current) as current:
+        rows, regressions = compare(json.load(baseline), json.load(current), args.threshold)
+
+    for name, metric, before, after, change, regressed in rows:
+        mark = '  РЕГРЕССИЯ' if regressed else ''
+        print(f'{name:15} {metric:10} {before:>10.2f} -> {after:>10.2f} ({change:+.1%}){mark}')
+    if regressions:
+        print(f'Регрессий сверх {args.threshold:.0%}: {len(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
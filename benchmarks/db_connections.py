@@ -0,0 +1,45 @@
+"""Повторное использование соединений с БД: запрос или задача Celery с новым соединением
+(CONN_MAX_AGE=0) против постоянного соединения с проверкой перед использованием.
+Для сравнения с pgbouncer запустите с DB_HOST/DB_PORT пулера и DB_POOL_MODE=pgbouncer.
+
+    python -m benchmarks.db_connections --iterations 500
+"""
+import argparse
+
+from benchmarks.common import measure, report, setup
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import close_old_connections, connection
+    from django.db.backends.signals import connection_created
+    from habits.models import Habit
+
+    connects = []
+    connection_created.connect(lambda **kwargs: connects.append(1), weak=False)
+
+    def unit_of_work():
+        # Как запрос gunicorn или задача Celery: проверка соединения до и после работы
+        close_old_connections()
+        Habit.objects.order_by().values_list('id', flat=True).first()
+        close_old_connections()
+
+    for name, max_age, health_checks in (
+        ('соединение на запрос', 0, False),
+        ('постоянное', 60, False),
+        ('постоянное с проверкой', 60, True),
+    ):
+        connection.close()
+        connection.settings_dict.update(CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=health_checks)
+        connects.clear()
+        durations = measure(unit_of_work, args.iterations)
+        report(f'{connection.vendor} {name}', durations)
+        print(f'  новых соединений: {len(connects)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import random
+from datetime import timedelta
+
+BATCH_SIZE = 10000
+PASSWORD = 'bench-password'
+
+
+def batched(objects, size=BATCH_SIZE):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed_users(count, prefix='bench'):
+    # Хэш пароля считается один раз и переиспользуется: иначе засев
+    # упирается в PBKDF2, а не в БД
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+
+    User = get_user_model()
+    password = make_password(PASSWORD)
+    users = (
+        User(username=f'{prefix}-{i}', password=password, telegram_chat_id=str(100000 + i))
+        for i in range(count)
+    )
+    for batch in batched(users):
+        User.objects.bulk_create(batch)
+    return list(User.objects.filter(username__startswith=f'{prefix}-').order_by('id').values_list('id', flat=True))
+
+
+def seed_habits(user_ids, per_user, public_ratio=0.2, seed=0):
+    from habits.models import Habit
+
+    rng = random.Random(seed)
+    habits = (
+        Habit(
+            user_id=user_id, place='Дом', time=f'{rng.randrange(24):02d}:{rng.randrange(60):02d}',
+            action=f'Привычка {i}', execution_time=60, periodicity=rng.randint(1, 7),
+            is_public=rng.random() < public_ratio,
+        )
+        for user_id in user_ids
+        for i in range(per_user)
+    )
+    ids = []
+    for batch in batched(habits):
+        ids.extend(habit.pk for habit in Habit.objects.bulk_create(batch))
+    return ids
+
+
+def seed_logs(habit_ids, per_habit, now, days=90, seed=0):
+    from habits.models import HabitLog
+
+    rng = random.Random(seed)
+    logs = (
+        HabitLog(habit_id=habit_id, completed_at=now - timedelta(days=rng.randrange(days), minutes=rng.randrange(1440)))
+        for habit_id in habit_ids
+        for _ in range(per_habit)
+    )
+    count = 0
+    for batch in batched(logs):
+        count += len(HabitLog.objects.bulk_create(batch))
+    return count
@@ -0,0 +1,56 @@
+"""Импорт привычек: пакетная проверка и bulk_create против сохранения по одной.
+
+    python -m benchmarks.habit_import --rows 20000
+"""
+import argparse
+import time
+
+from benchmarks.common import rollback, setup
+
+
+def make_rows(count, pleasant_id):
+    rows = []
+    for i in range(count):
+        row = {'place': 'Дом', 'time': f'{i % 24:02d}:{i % 60:02d}:00', 'action': f'Привычка {i}', 'execution_time': 60}
+        if i % 2:
+            row['related_habit'] = pleasant_id
+        else:
+            row['reward'] = 'Чай'
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20_000)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from habits.importing import import_habits
+    from habits.models import Habit
+    from habits.serializers import HabitSerializer
+
+    with rollback():
+        user = get_user_model().objects.create_user(username='bench-import')
+        pleasant = Habit.objects.create(user=user, place='Дом', time='10:00', action='Ванна', is_pleasant=True, execution_time=60)
+        rows = make_rows(args.rows, pleasant.pk)
+
+        started = time.perf_counter()
+        for row in rows:
+            serializer = HabitSerializer(data=row)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(user=user)
+        per_object = time.perf_counter() - started
+        print(f'per object: {args.rows / per_object:,.0f} rows/s')
+
+        started = time.perf_counter()
+        for start in range(0, len(rows), args.batch):
+            import_habits(user, rows[start:start + args.batch])
+        batched = time.perf_counter() - started
+        print(f'batch import: {args.rows / batched:,.0f} rows/s ({per_object / batched:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""Скорость проверки правил привычки: движок правил над словарями против Habit.full_clean.
+
+    python -m benchmarks.habit_rules --validations 200000
+"""
+import argparse
+import time
+
+from benchmarks.common import setup
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--validations', type=int, default=200_000)
+    args = parser.parse_args()
+
+    setup()
+    from django.core.exceptions import ValidationError
+    from habits.models import Habit
+    from habits.rules import check_habit, habit_values
+
+    rows = [
+        {'reward': 'Чай' if i % 2 else None, 'related_habit': None if i % 2 else 1, 'is_pleasant': False,
+         'execution_time': 60 + i % 100, 'periodicity': 1 + i % 7}
+        for i in range(1000)
+    ]
+
+    started = time.perf_counter()
+    for i in range(args.validations):
+        check_habit(habit_values(rows[i % len(rows)]), True)
+    elapsed = time.perf_counter() - started
+    print(f'check_habit: {args.validations / elapsed:,.0f} validations/s')
+
+    pleasant = Habit(pk=1, is_pleasant=True)
+    habits = [
+        Habit(place='Дом', time='09:00', action='Привычка', execution_time=row['execution_time'], reward=row['reward'],
+              periodicity=row['periodicity'], related_habit=pleasant if row['related_habit'] else None, user_id=1)
+        for row in rows
+    ]
+    count = args.validations // 10
+    started = time.perf_counter()
+    for i in range(count):
+        # Без проверки внешних ключей, которая потребовала бы запросов к БД
+        try:
+            habits[i % len(habits)].full_clean(exclude=['user', 'related_habit'], validate_unique=False)
+        except ValidationError:
+            pass
+    elapsed = time.perf_counter() - started
+    print(f'Habit.full_clean: {count / elapsed:,.0f} validations/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Вставка и поиск последнего выполнения: секционированный HabitLog против обычной таблицы.
+
+    python -m benchmarks.habitlog_partitions --rows 100000000 --months 24
+
+Только PostgreSQL. Обе таблицы заполняются одинаковыми логами за --months
+месяцев; сравниваются вставка пачки логов и запросы последних выполнений.
+"""
+import argparse
+import sys
+
+from benchmarks.common import analyze, measure, report, rollback, setup
+
+PLAIN_TABLE = 'bench_habitlog_plain'
+
+
+def seed(rows, months, habits):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.utils import timezone
+    from habits.models import Habit
+    from habits.partitions import add_months, create_partition, month_start
+
+    User = get_user_model()
+    user = User.objects.create_user(username='bench-partitions')
+    created = Habit.objects.bulk_create([
+        Habit(user=user, place='Дом', time='09:00', action=f'Привычка {i}', execution_time=60)
+        for i in range(habits)
+    ])
+    first_id = created[0].pk
+
+    current = month_start(timezone.now())
+    for offset in range(-months, 1):
+        create_partition(add_months(current, offset))
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TABLE {PLAIN_TABLE} (id bigserial PRIMARY KEY, completed_at timestamptz NOT NULL, '
+            f'idempotency_key varchar(64), habit_id bigint NOT NULL)'
+        )
+        for table in ('habits_habitlog', PLAIN_TABLE):
+            cursor.execute(
+                f'INSERT INTO {table} (habit_id, completed_at) '
+                f'SELECT %s + n %% %s, now() - (n %% (%s * 30 * 1440)) * interval \'1 minute\' '
+                f'FROM generate_series(1, %s) AS n',
+                [first_id, habits, months, rows],
+            )
+        cursor.execute(f'CREATE INDEX ON {PLAIN_TABLE} (habit_id, completed_at DESC)')
+    analyze('habits_habitlog', PLAIN_TABLE)
+    return first_id
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000_000)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--habits', type=int, default=100_000)
+    parser.add_argument('--batch', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from habits.partitions import is_partitioned
+
+    if not is_partitioned():
+        sys.exit('Нужен PostgreSQL с применённой миграцией секционирования habits_habitlog')
+
+    with rollback():
+        habit_id = seed(args.rows, args.months, args.habits)
+
+        def run(sql, params):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+
+        for name, table in (('partitioned', 'habits_habitlog'), ('plain', PLAIN_TABLE)):
+            insert = (
+                f'INSERT INTO {table} (habit_id, completed_at) '
+                f'SELECT %s + n %% %s, now() FROM generate_series(1, %s) AS n'
+            )
+            report(f'{name}: insert {args.batch} rows', measure(lambda: run(insert, [habit_id, args.habits, args.batch]), args.repeat))
+
+            latest = f'SELECT completed_at FROM {table} WHERE habit_id = %s ORDER BY completed_at DESC LIMIT 1'
+            report(f'{name}: latest log', measure(lambda: run(latest, [habit_id]), args.repeat))
+
+            recent = (
+                f'SELECT count(*) FROM {table} '
+                f"WHERE habit_id = %s AND completed_at >= date_trunc('month', now())"
+            )
+            report(f'{name}: logs this month', measure(lambda: run(recent, [habit_id]), args.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Вход под конкурентной нагрузкой: задержка входа и соседних запросов API при разной стоимости PBKDF2.
+
+    python -m benchmarks.login --logins 200 --concurrency 16 --iterations 600000 100000
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import api_client, percentile, setup
+
+
+def summary(name, durations):
+    if not durations:
+        print(f'  {name}: нет запросов')
+        return
+    print(
+        f'  {name}: n={len(durations)} median={statistics.median(durations) * 1000:.1f}ms '
+        f'p95={percentile(durations, 0.95) * 1000:.1f}ms max={max(durations) * 1000:.1f}ms'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--iterations', type=int, nargs='+', default=[600_000, 100_000])
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import authenticate, get_user_model
+    from django.db import connection
+    from django.test import override_settings
+    from users.hashing import HashingOverloaded
+
+    User = get_user_model()
+    user = User.objects.create_user(username='bench-login', password='bench-password')
+    client = api_client(user)
+    try:
+        for iterations in args.iterations:
+            with override_settings(PASSWORD_PBKDF2_ITERATIONS=iterations):
+                user.set_password('bench-password')
+                user.save(update_fields=['password'])
+                logins, reads, rejected = [], [], []
+                done = threading.Event()
+
+                def login():
+                    started = time.perf_counter()
+                    try:
+                        authenticate(username='bench-login', password='bench-password')
+                        logins.append(time.perf_counter() - started)
+                    except HashingOverloaded:
+                        rejected.append(time.perf_counter() - started)
+                    finally:
+                        connection.close()
+
+                def read():
+                    # Обычные запросы API, которые идут параллельно со входами
+                    while not done.is_set():
+                        started = time.perf_counter()
+                        client.get('/api/habits/')
+                        reads.append(time.perf_counter() - started)
+                    connection.close()
+
+                reader = threading.Thread(target=read)
+                reader.start()
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                    for _ in range(args.logins):
+                        executor.submit(login)
+                elapsed = time.perf_counter() - started
+                done.set()
+                reader.join()
+
+                print(f'iterations={iterations}: {len(logins) / elapsed:.1f} logins/s, отклонено {len(rejected)}')
+                summary('вход', logins)
+                summary('отказ 503', rejected)
+                summary('GET /api/habits/', reads)
+    finally:
+        user.delete()
+
+
+if __name__ == '__main__':
+    main()
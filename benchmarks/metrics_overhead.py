@@ -0,0 +1,78 @@
+"""Накладные расходы метрик: стоимость одного наблюдения, GET /api/habits/ с MetricsMiddleware и без,
+и суммирование по процессам в многопроцессном режиме.
+
+    python -m benchmarks.metrics_overhead --observations 100000 --requests 500
+    python -m benchmarks.metrics_overhead --multiprocess --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from benchmarks.common import api_client, measure, report, rollback, setup
+
+
+def observe_many(count):
+    from habits.metrics import QueryStats, observe_request
+
+    queries = QueryStats()
+    for _ in range(count):
+        observe_request('HabitViewSet.list', 'GET', 200, 0.01, queries)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--observations', type=int, default=100_000)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--multiprocess', action='store_true', help='режим PROMETHEUS_MULTIPROC_DIR, как у gunicorn')
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.multiprocess:
+        # Каталог задаётся до импорта prometheus_client
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = tempfile.mkdtemp(prefix='metrics-')
+    setup()
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import override_settings
+    from habits.metrics import metrics_registry
+    from habits.models import Habit
+
+    started = time.perf_counter()
+    observe_many(args.observations)
+    per_call = (time.perf_counter() - started) / args.observations
+    print(f'observe_request: {per_call * 1e6:.2f}µs на запрос (3 гистограммы)')
+
+    with rollback():
+        user = get_user_model().objects.create_user(username='bench-metrics')
+        Habit.objects.bulk_create([
+            Habit(user=user, place='Дом', time='09:00', action=f'Привычка {i}', execution_time=60) for i in range(20)
+        ])
+        client = api_client(user)
+        without = [name for name in settings.MIDDLEWARE if name != 'habits.middleware.MetricsMiddleware']
+        for name, middleware in (('с метриками', settings.MIDDLEWARE), ('без метрик', without)):
+            with override_settings(MIDDLEWARE=middleware, METRICS_ENABLED=True):
+                # Цепочка middleware клиента собирается один раз, поэтому пересобирается явно
+                client.handler.load_middleware()
+                client.get('/api/habits/')
+                report(f'GET /api/habits/ {name}', measure(lambda: client.get('/api/habits/'), args.requests))
+
+    if args.multiprocess:
+        # Каждый процесс пишет в свой файл, а реестр /metrics складывает их
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=observe_many, args=(1000,)) for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        total = metrics_registry().get_sample_value(
+            'habit_tracker_http_request_duration_seconds_count',
+            {'view': 'HabitViewSet.list', 'method': 'GET', 'status': '2xx'},
+        )
+        expected = args.observations + args.processes * 1000 + args.requests + 1
+        print(f'сумма по процессам: {total:.0f} (ожидалось {expected})')
+
+
+if __name__ == '__main__':
+    main()
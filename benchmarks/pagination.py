@@ -0,0 +1,63 @@
+"""Задержка первой и глубокой страницы /api/public-habits/: OFFSET против курсора.
+
+    python -m benchmarks.pagination --habits 200000 --page 10000
+"""
+import argparse
+from unittest import mock
+
+from benchmarks.common import analyze, api_client, measure, report, rollback, setup
+
+
+def seed(habits):
+    from django.contrib.auth import get_user_model
+    from habits.models import Habit
+
+    User = get_user_model()
+    user = User.objects.create_user(username='bench-pagination')
+    for start in range(0, habits, 10000):
+        Habit.objects.bulk_create([
+            Habit(user=user, place='Дом', time='09:00', action=f'Привычка {i}', execution_time=60, is_public=True)
+            for i in range(start, min(start + 10000, habits))
+        ])
+    analyze('habits_habit')
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--habits', type=int, default=200_000)
+    parser.add_argument('--page', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from rest_framework.pagination import PageNumberPagination
+    from habits.models import Habit
+    from habits.pagination import KeysetPagination
+    from habits.views import PublicHabitViewSet
+
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    with rollback():
+        client = api_client(seed(args.habits))
+
+        with mock.patch.object(PublicHabitViewSet, 'pagination_class', PageNumberPagination):
+            for page in (1, args.page):
+                durations = measure(lambda: client.get(f'/api/public-habits/?page={page}'), args.repeat)
+                report(f'page number, page {page}', durations)
+
+        # Курсор глубокой страницы строится по последней записи предыдущей страницы,
+        # как если бы клиент дошёл до неё по ссылкам next
+        anchor = Habit.objects.filter(is_public=True).order_by('-created_at', '-id')[(args.page - 1) * page_size - 1]
+        paginator = KeysetPagination()
+        paginator.base_url = 'http://testserver/api/public-habits/'
+        paginator.field = Habit._meta.get_field('created_at')
+        urls = {1: '/api/public-habits/', args.page: paginator.encode_cursor(anchor, reverse=False)}
+        with mock.patch.object(PublicHabitViewSet, 'pagination_class', KeysetPagination):
+            for page, url in urls.items():
+                durations = measure(lambda: client.get(url), args.repeat)
+                report(f'keyset, page {page}', durations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Накладные расходы профилирования на GET /api/habits/: выключено (middleware не подключён),
+включено без выборки, и каждый запрос под cProfile.
+
+    python -m benchmarks.profiling_overhead --habits 50 --requests 300
+"""
+import argparse
+import tempfile
+
+from benchmarks.common import api_client, measure, report, rollback, setup
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--habits', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.test import override_settings
+    from habits.models import Habit
+
+    modes = (
+        ('выключено', {'PROFILING_ENABLED': False}),
+        ('выборка 0%', {'PROFILING_ENABLED': True, 'PROFILING_SAMPLE_RATE': 0}),
+        ('выборка 100%', {'PROFILING_ENABLED': True, 'PROFILING_SAMPLE_RATE': 1}),
+    )
+    with rollback(), tempfile.TemporaryDirectory() as directory:
+        user = get_user_model().objects.create_user(username='bench-profiling')
+        Habit.objects.bulk_create([
+            Habit(user=user, place='Дом', time='09:00', action=f'Привычка {i}', execution_time=60)
+            for i in range(args.habits)
+        ])
+        client = api_client(user)
+        for name, options in modes:
+            # Порог выше любого запроса: измеряется сам захват, без записи на диск
+            with override_settings(PROFILING_THRESHOLD_MS=60_000, PROFILING_DIR=directory, **options):
+                client.handler.load_middleware()
+                client.get('/api/habits/')
+                report(f'GET /api/habits/ {name}', measure(lambda: client.get('/api/habits/'), args.requests))
+
+
+if __name__ == '__main__':
+    main()
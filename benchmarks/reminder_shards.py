@@ -0,0 +1,87 @@
+"""Время тика напоминаний при делении на сегменты в зависимости от числа воркеров.
+
+Каждый воркер — отдельный процесс со своим соединением с БД, как процесс Celery;
+постановка задач отправки заменена заглушкой. Данные удаляются после замера.
+
+    python -m benchmarks.reminder_shards --habits 200000 --due 50000 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+from benchmarks.common import analyze, setup
+from benchmarks.factories import seed_habits, seed_users
+
+PREFIX = 'bench-shards'
+
+
+def init_worker():
+    from habits import tasks
+
+    mock.patch.object(tasks.send_reminder, 'delay').start()
+    mock.patch.object(tasks.send_reminder_batch, 'delay').start()
+
+
+def warm_up(_):
+    from django.db import connection
+
+    connection.ensure_connection()
+
+
+def scan(shard, shards, now):
+    from habits.tasks import scan_shard
+
+    return scan_shard(shard, shards, now)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--habits', type=int, default=200_000)
+    parser.add_argument('--due', type=int, default=50_000, help='привычек, которым пора напомнить в тике')
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from django.utils import timezone
+    from habits.models import Habit, ReminderDelivery
+
+    User = get_user_model()
+    started = time.perf_counter()
+    user_ids = seed_users(args.users, PREFIX)
+    habit_ids = sorted(seed_habits(user_ids, max(args.habits // args.users, 1)))
+    analyze('habits_habit')
+    print(f'seed: {len(habit_ids)} habits in {time.perf_counter() - started:.1f}s')
+
+    habits = Habit.objects.filter(pk__gte=habit_ids[0], pk__lte=habit_ids[-1])
+    hot = habits.filter(pk__lte=habit_ids[min(args.due, len(habit_ids)) - 1])
+    now = timezone.now()
+    try:
+        for workers in args.workers:
+            ReminderDelivery.objects.filter(habit__in=habits).delete()
+            habits.update(next_reminder_at=now + timedelta(hours=6))
+            hot.update(next_reminder_at=now - timedelta(seconds=30))
+            # Соединение не должно достаться дочерним процессам по fork
+            connection.close()
+
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker) as pool:
+                list(pool.map(warm_up, range(workers)))
+                tick_started = time.perf_counter()
+                results = list(pool.map(scan, range(workers), [workers] * workers, [now] * workers))
+                wall = time.perf_counter() - tick_started
+
+            deliveries = sum(result['deliveries'] for result in results)
+            slowest = max(result['duration_ms'] for result in results)
+            print(f'workers={workers}: tick {wall * 1000:.0f}ms, самый долгий сегмент {slowest}ms, напоминаний {deliveries}')
+    finally:
+        User.objects.filter(username__startswith=f'{PREFIX}-').delete()
+
+
+if __name__ == '__main__':
+    main()
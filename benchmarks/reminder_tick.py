@@ -0,0 +1,77 @@
+"""Время одного тика check_and_send_reminders на большом количестве привычек.
+
+    python -m benchmarks.reminder_tick --habits 1000000 --hot 50000
+
+Данные создаются внутри транзакции и откатываются после замера.
+"""
+import argparse
+import random
+import time
+from datetime import timedelta
+from unittest import mock
+
+from benchmarks.common import analyze, report, rollback, setup
+
+
+def seed(habits, hot, ticks, users, window_start):
+    from django.contrib.auth import get_user_model
+    from habits.models import Habit
+
+    User = get_user_model()
+    User.objects.bulk_create([User(username=f'bench-tick-{i}') for i in range(users)], batch_size=5000)
+    user_ids = list(User.objects.filter(username__startswith='bench-tick-').values_list('id', flat=True))
+
+    rng = random.Random(0)
+    batch = []
+    for i in range(habits):
+        if i < hot * ticks:
+            due = window_start + timedelta(minutes=i % ticks)
+        else:
+            due = window_start + timedelta(minutes=rng.randrange(ticks, 24 * 60))
+        batch.append(Habit(
+            user_id=user_ids[i % len(user_ids)],
+            place='Дом',
+            time=due.time(),
+            action='Бенчмарк',
+            execution_time=60,
+            next_reminder_at=due,
+        ))
+        if len(batch) == 10000:
+            Habit.objects.bulk_create(batch)
+            batch = []
+    Habit.objects.bulk_create(batch)
+    analyze('habits_habit')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--habits', type=int, default=1_000_000)
+    parser.add_argument('--hot', type=int, default=50_000, help='привычек на одну «популярную» минуту')
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--ticks', type=int, default=5)
+    args = parser.parse_args()
+
+    setup()
+    from django.utils import timezone
+    from habits import tasks
+
+    window_start = (timezone.now() + timedelta(hours=1)).replace(second=0, microsecond=0)
+
+    with rollback():
+        started = time.perf_counter()
+        seed(args.habits, args.hot, args.ticks, args.users, window_start)
+        print(f'seed: {args.habits} habits in {time.perf_counter() - started:.1f}s')
+
+        durations = []
+        with mock.patch('habits.tasks.dispatch_reminders'):
+            for tick in range(args.ticks):
+                now = window_start + timedelta(minutes=tick, seconds=1)
+                with mock.patch('habits.scheduling.timezone.now', return_value=now):
+                    started = time.perf_counter()
+                    tasks.check_and_send_reminders()
+                    durations.append(time.perf_counter() - started)
+        report(f'tick ({args.hot} due of {args.habits})', durations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+"""Набор нагрузочных замеров API и конвейера напоминаний с результатами в JSON.
+
+    python -m benchmarks.suite --users 1000 --habits-per-user 10 --logs-per-habit 20 --output results.json
+    python -m benchmarks.compare baseline.json results.json --threshold 0.1
+
+Данные засеваются внутри транзакции и откатываются после замеров.
+"""
+import argparse
+import json
+import subprocess
+import time
+from datetime import timedelta
+from unittest import mock
+
+from benchmarks.common import analyze, rollback, setup, summarize
+from benchmarks.factories import PASSWORD, seed_habits, seed_logs, seed_users
+
+SCENARIOS = {}
+PREFIX = 'bench-suite'
+
+
+def scenario(name):
+    def register(fn):
+        SCENARIOS[name] = fn
+        return fn
+    return register
+
+
+class FakeBot:
+    # Вместо Telegram: сообщения только считаются
+    def __init__(self):
+        self.sent = 0
+
+    def send_message(self, chat_id, text):
+        self.sent += 1
+
+    def send_many(self, messages):
+        self.sent += len(messages)
+        return [None] * len(messages)
+
+
+class Context:
+    def __init__(self, args, user_ids, now):
+        from django.contrib.auth import get_user_model
+        from django.test.utils import setup_test_environment
+        from rest_framework.test import APIClient
+        from habits.models import Habit
+        from users.authentication import issue_token
+
+        setup_test_environment()
+        self.args = args
+        self.now = now
+        self.user_ids = user_ids
+        active = get_user_model().objects.filter(pk__in=user_ids[:args.clients])
+        self.clients = {}
+        for user in active:
+            client = APIClient()
+            client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_token(user)}')
+            self.clients[user.pk] = client
+        self.habits = list(Habit.objects.filter(user_id__in=self.clients).order_by('id').values_list('id', 'user_id'))
+        self.anonymous = APIClient()
+
+
+def remote_addr(i):
+    # Каждый запрос входа и регистрации со своего адреса, чтобы не упереться в троттлинг
+    return f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}'
+
+
+@scenario('habits_list')
+def habits_list(ctx):
+    clients = list(ctx.clients.values())
+    return None, lambda i: clients[i % len(clients)].get('/api/habits/')
+
+
+@scenario('public_habits')
+def public_habits(ctx):
+    clients = list(ctx.clients.values())
+    return None, lambda i: clients[i % len(clients)].get('/api/public-habits/')
+
+
+@scenario('complete')
+def complete(ctx):
+    def run(i):
+        habit_id, user_id = ctx.habits[i % len(ctx.habits)]
+        return ctx.clients[user_id].post(f'/api/habits/{habit_id}/complete/')
+    return None, run
+
+
+@scenario('register')
+def register(ctx):
+    def run(i):
+        data = {'username': f'{PREFIX}-new-{i}', 'password': PASSWORD, 'password_confirm': PASSWORD}
+        return ctx.anonymous.post('/api/register/', data, REMOTE_ADDR=remote_addr(i))
+    return None, run
+
+
+@scenario('login')
+def login(ctx):
+    def run(i):
+        data = {'username': f'{PREFIX}-{i % len(ctx.user_ids)}', 'password': PASSWORD}
+        return ctx.anonymous.post('/api/login/', data, REMOTE_ADDR=remote_addr(i))
+    return None, run
+
+
+@scenario('reminders')
+def reminders(ctx):
+    # Тик check_and_send_reminders: выборка, постановка задач (eager) и отправка фейковому боту
+    from habits.models import Habit
+
+    habit_ids = list(Habit.objects.order_by('id').values_list('id', flat=True))
+    due = ctx.args.due_reminders
+
+    def prepare(i):
+        start = i * due % max(len(habit_ids) - due, 1)
+        # Свой слот на каждый тик, иначе журнал доставки отбросит повтор
+        slot = ctx.now - timedelta(seconds=30, microseconds=i)
+        Habit.objects.filter(pk__in=habit_ids[start:start + due]).update(next_reminder_at=slot)
+
+    def run(i):
+        from habits import tasks
+        with mock.patch('habits.scheduling.timezone.now', return_value=ctx.now):
+            tasks.check_and_send_reminders()
+    return prepare, run
+
+
+def run_scenario(name, ctx, requests, warmup):
+    prepare, run = SCENARIOS[name](ctx)
+    durations, errors = [], 0
+    for i in range(warmup + requests):
+        if prepare is not None:
+            prepare(i)
+        started = time.perf_counter()
+        response = run(i)
+        duration = time.perf_counter() - started
+        if i < warmup:
+            continue
+        durations.append(duration)
+        if response is not None and response.status_code >= 400:
+            errors += 1
+    items = ctx.args.due_reminders if name == 'reminders' else 1
+    return dict(summarize(durations, items=items), errors=errors)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--habits-per-user', type=int, default=10)
+    parser.add_argument('--logs-per-habit', type=int, default=20)
+    parser.add_argument('--clients', type=int, default=50, help='пользователей, от имени которых идут запросы')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--due-reminders', type=int, default=500, help='напоминаний за один тик')
+    parser.add_argument('--scenarios', nargs='+', choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.db import connection
+    from django.utils import timezone
+    from habit_tracker.celery import app
+
+    # Задачи выполняются в том же процессе, а бот ничего не отправляет
+    app.conf.task_always_eager = True
+    now = timezone.now()
+    results = {}
+    with rollback(), mock.patch('habits.tasks.get_sender', return_value=FakeBot()):
+        started = time.perf_counter()
+        user_ids = seed_users(args.users, PREFIX)
+        habit_ids = seed_habits(user_ids, args.habits_per_user)
+        logs = seed_logs(habit_ids, args.logs_per_habit, now)
+        analyze('users_user', 'habits_habit', 'habits_habitlog')
+        print(f'seed: {len(user_ids)} users, {len(habit_ids)} habits, {logs} logs in {time.perf_counter() - started:.1f}s')
+
+        ctx = Context(args, user_ids, now)
+        for name in args.scenarios:
+            results[name] = run_scenario(name, ctx, args.requests, args.warmup)
+            result = results[name]
+            print(
+                f'{name}: p50={result["p50_ms"]:.1f}ms p99={result["p99_ms"]:.1f}ms '
+                f'throughput={result["throughput"]:.1f}/s errors={result["errors"]}'
+            )
+
+    if args.output:
+        payload = {
+            'meta': {
+                'commit': git_commit(),
+                'created_at': now.isoformat(),
+                'database': connection.vendor,
+                'reminder_dispatch_mode': settings.REMINDER_DISPATCH_MODE,
+                'params': {key: value for key, value in vars(args).items() if key != 'output'},
+            },
+            'results': results,
+        }
+        with open(args.output, 'w') as output:
+            json.dump(payload, output, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Пропускная способность TelegramSender против локального stub-сервера Bot API.
+
+    python -m benchmarks.telegram_sender --messages 2000 --latency 0.05
+
+Stub отвечает на любой sendMessage успешным ответом после задержки --latency,
+имитируя сетевую задержку до api.telegram.org.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import setup
+
+RESPONSE = json.dumps({
+    'ok': True,
+    'result': {'message_id': 1, 'date': 0, 'chat': {'id': 1, 'type': 'private'}, 'text': 'ok'},
+}).encode()
+
+
+def start_stub_server(latency):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if latency:
+                time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(RESPONSE)))
+            self.end_headers()
+            self.wfile.write(RESPONSE)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    server = Server(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    setup()
+    from habits.telegram_sender import TelegramSender
+
+    server = start_stub_server(args.latency)
+    base_url = f'http://127.0.0.1:{server.server_address[1]}/bot'
+    messages = [(0, 1, f'Напоминание {i}') for i in range(args.messages)]
+
+    for concurrency in args.concurrency:
+        sender = TelegramSender('123:stub', base_url=base_url, concurrency=concurrency)
+        try:
+            started = time.perf_counter()
+            errors = [error for error in sender.send_many(messages) if error is not None]
+            elapsed = time.perf_counter() - started
+        finally:
+            sender.close()
+        print(f'concurrency={concurrency}: {args.messages / elapsed:.0f} msg/s ({len(errors)} errors)')
+        if errors:
+            print(f'  first error: {errors[0]!r}')
+
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
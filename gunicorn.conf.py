@@ -0,0 +1,30 @@
+import os
+import shutil
+
+bind = '0.0.0.0:8000'
+workers = int(os.getenv('GUNICORN_WORKERS', '3'))
+
+if os.getenv('SERVER_MODE', 'wsgi') == 'asgi':
+    # Uvicorn-воркеры: чтение привычек идёт асинхронными представлениями
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    wsgi_app = 'habit_tracker.asgi:application'
+else:
+    # gthread: пока один поток воркера считает хэш пароля в пуле, остальные
+    # потоки продолжают обслуживать запросы API
+    worker_class = 'gthread'
+    threads = int(os.getenv('GUNICORN_THREADS', '8'))
+    wsgi_app = 'habit_tracker.wsgi:application'
+
+
+def on_starting(server):
+    # Файлы метрик прошлого запуска удаляются до старта воркеров
+    path = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,10 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'habit_tracker.settings')
+# Для запуска без gunicorn.conf.py (uvicorn habit_tracker.asgi:application): режим
+# определяет асинхронное чтение привычек и отключение постоянных соединений, см. settings.py
+os.environ.setdefault('SERVER_MODE', 'asgi')
+
+application = get_asgi_application()
@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,6 +28,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'habits.middleware.MetricsMiddleware',
+    'habits.middleware.ProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -57,6 +60,20 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'habit_tracker.wsgi.application'
 
+# wsgi — gthread-воркеры gunicorn, asgi — uvicorn-воркеры и habit_tracker.asgi (см. gunicorn.conf.py)
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
+# Постоянные соединения для gunicorn и воркеров Celery: Celery закрывает устаревшие
+# соединения вокруг каждой задачи по тем же правилам, что Django вокруг запроса.
+# DB_CONN_MAX_AGE — время жизни в секундах (0 — соединение на запрос, none — без ограничения),
+# перед повторным использованием соединение проверяется (DB_CONN_HEALTH_CHECKS).
+# Под ASGI ORM работает в потоке, который создаётся на каждый запрос, и постоянные
+# соединения копились бы без закрытия, поэтому там они всегда выключены, а пулом служит pgbouncer.
+# DB_POOL_MODE=pgbouncer — подключение через пулер в режиме transaction: серверные
+# курсоры выключены, а подготовленных выражений psycopg2 не использует
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', 'direct')
+DB_CONN_MAX_AGE = '0' if SERVER_MODE == 'asgi' else os.getenv('DB_CONN_MAX_AGE', '60')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -65,9 +82,29 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'db'),
         'PORT': os.getenv('DB_PORT', '5432'),
+        'CONN_MAX_AGE': None if DB_CONN_MAX_AGE.lower() == 'none' else int(DB_CONN_MAX_AGE),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True').lower() == 'true',
+        'DISABLE_SERVER_SIDE_CURSORS': DB_POOL_MODE == 'pgbouncer',
     }
 }
 
+# Стоимость PBKDF2 настраивается; хэши со старым числом итераций
+# обновляются при следующем входе пользователя
+PASSWORD_HASHERS = [
+    'users.hashers.ConfigurablePBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv('PASSWORD_PBKDF2_ITERATIONS', '600000'))
+# Хэширование при входе и регистрации идёт в ограниченном пуле потоков:
+# одновременно не больше WORKERS хэшей и QUEUE ожидающих, остальным 503
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', '2'))
+PASSWORD_HASHING_QUEUE = int(os.getenv('PASSWORD_HASHING_QUEUE', '4'))
+AUTHENTICATION_BACKENDS = ['users.hashing.HashingPoolBackend']
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -93,15 +130,74 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'users.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 5,
+    'DEFAULT_PAGINATION_CLASS': 'habits.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', '5')),
+    # Адрес клиента берётся из X-Forwarded-For, дописанного последним из NUM_PROXIES
+    # прокси (nginx); более ранние адреса в заголовке задаёт сам клиент
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', '1')),
+    'DEFAULT_THROTTLE_RATES': {
+        'export': os.getenv('EXPORT_THROTTLE_RATE', '10/hour'),
+        'login_ip': os.getenv('LOGIN_IP_THROTTLE_RATE', '20/min'),
+        'login_username': os.getenv('LOGIN_USERNAME_THROTTLE_RATE', '5/min'),
+        'register': os.getenv('REGISTER_THROTTLE_RATE', '10/hour'),
+    },
 }
 
+# Первый ключ подписывает новые токены, остальные принимаются при проверке (ротация)
+AUTH_TOKEN_KEYS = [key for key in os.getenv('AUTH_TOKEN_KEYS', '').split(',') if key] or [SECRET_KEY]
+AUTH_TOKEN_TTL = int(os.getenv('AUTH_TOKEN_TTL', str(60 * 60 * 24)))
+AUTH_PRINCIPAL_CACHE_TTL = int(os.getenv('AUTH_PRINCIPAL_CACHE_TTL', '300'))
+AUTH_PRINCIPAL_LOCAL_TTL = int(os.getenv('AUTH_PRINCIPAL_LOCAL_TTL', '5'))
+
+# Метрики Prometheus на /metrics выключены по умолчанию; включённый эндпоинт отвечает
+# только с заголовком Authorization: Bearer METRICS_TOKEN, а без токена закрыт для всех.
+# METRICS_CELERY_PORT — порт метрик воркера Celery (0 — выключено)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False').lower() == 'true'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_CELERY_PORT = int(os.getenv('METRICS_CELERY_PORT', '0'))
+
+# Выборочное профилирование запросов и тиков напоминаний: из доли PROFILING_SAMPLE_RATE
+# сохраняются профили медленнее PROFILING_THRESHOLD_MS, в PROFILING_DIR хранятся
+# последние PROFILING_MAX_FILES. Выключенный ProfilingMiddleware не подключается
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0.05'))
+PROFILING_THRESHOLD_MS = int(os.getenv('PROFILING_THRESHOLD_MS', '500'))
+PROFILING_DIR = os.getenv('PROFILING_DIR', '/tmp/habit-tracker-profiles')
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', '200'))
+
+# Асинхронные list/retrieve привычек; под ASGI включены всегда
+ASYNC_READ_API = SERVER_MODE == 'asgi' or os.getenv('ASYNC_READ_API', 'False').lower() == 'true'
+
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '100'))
+BULK_COMPLETE_MAX_ITEMS = int(os.getenv('BULK_COMPLETE_MAX_ITEMS', '500'))
+BULK_COMPLETE_BATCH_SIZE = int(os.getenv('BULK_COMPLETE_BATCH_SIZE', '500'))
+HABIT_IMPORT_MAX_ITEMS = int(os.getenv('HABIT_IMPORT_MAX_ITEMS', '1000'))
+HABIT_IMPORT_BATCH_SIZE = int(os.getenv('HABIT_IMPORT_BATCH_SIZE', '1000'))
+
+CACHE_URL = os.getenv('CACHE_URL', '')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+PUBLIC_FEED_CACHE_TIMEOUT = int(os.getenv('PUBLIC_FEED_CACHE_TIMEOUT', '300'))
+
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
     "http://127.0.0.1:3000",
@@ -112,8 +208,56 @@ CORS_ALLOW_CREDENTIALS = True
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'check-and-send-reminders': {
+        'task': 'habits.tasks.check_and_send_reminders',
+        'schedule': 60.0,
+    },
+    'maintain-habitlog-partitions': {
+        'task': 'habits.tasks.maintain_habitlog_partitions',
+        'schedule': crontab(hour=3, minute=0),
+    },
+    'build-adherence-report': {
+        'task': 'habits.tasks.build_adherence_report_task',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'recover-reminder-deliveries': {
+        'task': 'habits.tasks.recover_reminder_deliveries',
+        'schedule': 120.0,
+    },
+    'prune-reminder-deliveries': {
+        'task': 'habits.tasks.prune_reminder_deliveries',
+        'schedule': crontab(hour=3, minute=30),
+    },
+}
 
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID', '')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', '')
+TELEGRAM_SEND_CONCURRENCY = int(os.getenv('TELEGRAM_SEND_CONCURRENCY', '20'))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', '30'))
+# Redis с общим для всех воркеров ведром TELEGRAM_GLOBAL_RATE; пусто — ведро в каждом процессе
+TELEGRAM_RATE_REDIS_URL = os.getenv('TELEGRAM_RATE_REDIS_URL', CELERY_BROKER_URL)
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', '1'))
+TELEGRAM_MAX_RETRIES = int(os.getenv('TELEGRAM_MAX_RETRIES', '3'))
+
+REMINDER_DISPATCH_MODE = os.getenv('REMINDER_DISPATCH_MODE', 'single')
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', '500'))
+REMINDER_CATCHUP_MINUTES = int(os.getenv('REMINDER_CATCHUP_MINUTES', '60'))
+REMINDER_SCHEDULER = os.getenv('REMINDER_SCHEDULER', 'beat')
+REMINDER_SCHEDULER_HORIZON_HOURS = int(os.getenv('REMINDER_SCHEDULER_HORIZON_HOURS', '6'))
+REMINDER_UPDATES_REDIS_URL = os.getenv('REMINDER_UPDATES_REDIS_URL', CELERY_BROKER_URL)
+REMINDER_UPDATES_CHANNEL = 'habits:reminder-updates'
+# Тик делится на столько сегментов по остатку от id привычки (аккорд Celery)
+REMINDER_SCAN_SHARDS = int(os.getenv('REMINDER_SCAN_SHARDS', '1'))
+REMINDER_DELIVERY_MAX_RETRIES = int(os.getenv('REMINDER_DELIVERY_MAX_RETRIES', '3'))
+REMINDER_DELIVERY_RETRY_DELAY = int(os.getenv('REMINDER_DELIVERY_RETRY_DELAY', '60'))
+REMINDER_DELIVERY_RETENTION_DAYS = int(os.getenv('REMINDER_DELIVERY_RETENTION_DAYS', '30'))
+# Через столько секунд «отправляется» и «ожидает» считаются зависшими
+REMINDER_DELIVERY_SENDING_TIMEOUT = int(os.getenv('REMINDER_DELIVERY_SENDING_TIMEOUT', '300'))
+
+HABITLOG_PARTITIONS_AHEAD = int(os.getenv('HABITLOG_PARTITIONS_AHEAD', '3'))
+HABITLOG_RETENTION_MONTHS = int(os.getenv('HABITLOG_RETENTION_MONTHS', '24'))
+HABITLOG_RETENTION_ACTION = os.getenv('HABITLOG_RETENTION_ACTION', 'detach')
 
 AUTH_USER_MODEL = 'users.User' 
\ No newline at end of file
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Habit, HabitLog
+from .models import AdherenceReport, AdherenceReportRow, Habit, HabitLog, HabitStats, ReminderDelivery
 
 
 @admin.register(Habit)
@@ -7,7 +7,7 @@ class HabitAdmin(admin.ModelAdmin):
     list_display = ['action', 'user', 'place', 'time', 'is_pleasant', 'is_public', 'periodicity', 'created_at']
     list_filter = ['is_pleasant', 'is_public', 'periodicity', 'created_at']
     search_fields = ['action', 'place', 'user__username']
-    readonly_fields = ['created_at']
+    readonly_fields = ['created_at', 'next_reminder_at']
     
     fieldsets = (
         ('Основная информация', {
@@ -20,13 +20,17 @@ class HabitAdmin(admin.ModelAdmin):
             'fields': ('reward', 'related_habit')
         }),
         ('Периодичность', {
-            'fields': ('periodicity',)
+            'fields': ('periodicity', 'next_reminder_at')
         }),
         ('Дата создания', {
             'fields': ('created_at',),
             'classes': ('collapse',)
         }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        # Форма уже вызвала full_clean с правилами привычки
+        obj.save(clean=False)
 
 
 @admin.register(HabitLog)
@@ -34,4 +38,39 @@ class HabitLogAdmin(admin.ModelAdmin):
     list_display = ['habit', 'completed_at']
     list_filter = ['completed_at']
     search_fields = ['habit__action', 'habit__user__username']
-    readonly_fields = ['completed_at'] 
\ No newline at end of file
+    readonly_fields = ['completed_at']
+    ordering = ['-completed_at'] 
+
+
+@admin.register(HabitStats)
+class HabitStatsAdmin(admin.ModelAdmin):
+    list_display = ['habit', 'current_streak', 'longest_streak', 'total_completions', 'last_completed_on']
+    search_fields = ['habit__action', 'habit__user__username']
+    readonly_fields = ['last_completed_on', 'current_streak', 'longest_streak', 'total_completions']
+
+
+class AdherenceReportRowInline(admin.TabularInline):
+    model = AdherenceReportRow
+    extra = 0
+    can_delete = False
+    readonly_fields = [
+        'periodicity', 'habits', 'completions', 'adherence', 'on_time_ratio',
+        'mean_gap_days', 'mean_longest_streak', 'mean_current_streak',
+    ]
+
+
+@admin.register(AdherenceReport)
+class AdherenceReportAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'habits', 'logs', 'duration_ms']
+    readonly_fields = ['created_at', 'habits', 'logs', 'duration_ms']
+    inlines = [AdherenceReportRowInline]
+
+
+@admin.register(ReminderDelivery)
+class ReminderDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['habit', 'due_slot', 'status', 'attempts', 'lag_ms', 'started_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['habit__action', 'habit__user__username']
+    ordering = ['-claimed_at']
+    list_select_related = ['habit']
+    readonly_fields = ['habit', 'due_slot', 'status', 'attempts', 'claimed_at', 'started_at', 'sent_at', 'lag_ms']
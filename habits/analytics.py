@@ -0,0 +1,160 @@
+import time
+from datetime import datetime
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .iteration import iter_rows
+from .models import AdherenceReport, AdherenceReportRow, Habit, HabitLog
+from .scheduling import get_zone
+
+SECONDS_PER_DAY = 86400
+# День упаковывается в младшие биты ключа (привычка, день) для np.unique
+DAY_BITS = 20
+LOAD_CHUNK_SIZE = 100_000
+
+
+def local_days(epoch, zone_index, zone_names):
+    # Смещение пояса вычисляется один раз на каждый встречающийся час UTC:
+    # переходы на летнее/зимнее время происходят на границе часа
+    hours = epoch // 3600
+    offsets = np.zeros(len(epoch), dtype=np.int64)
+    for code, name in enumerate(zone_names):
+        mask = zone_index == code
+        if not mask.any():
+            continue
+        zone = get_zone(name)
+        unique_hours, inverse = np.unique(hours[mask], return_inverse=True)
+        hour_offsets = np.array(
+            [datetime.fromtimestamp(int(hour) * 3600, zone).utcoffset().total_seconds() for hour in unique_hours],
+            dtype=np.int64,
+        )
+        offsets[mask] = hour_offsets[inverse]
+    return (epoch + offsets) // SECONDS_PER_DAY
+
+
+def load_habits(now):
+    rows = list(Habit.objects.order_by('id').values_list('id', 'periodicity', 'created_at', 'user__timezone'))
+    zone_names = sorted({row[3] for row in rows})
+    codes = {name: code for code, name in enumerate(zone_names)}
+
+    ids = np.fromiter((row[0] for row in rows), np.int64, len(rows))
+    periodicity = np.fromiter((row[1] for row in rows), np.int64, len(rows))
+    created = np.fromiter((int(row[2].timestamp()) for row in rows), np.int64, len(rows))
+    zone_index = np.fromiter((codes[row[3]] for row in rows), np.int64, len(rows))
+
+    start_day = local_days(created, zone_index, zone_names)
+    today = local_days(np.full(len(rows), int(now.timestamp()), dtype=np.int64), zone_index, zone_names)
+    return ids, periodicity, start_day, today, zone_index, zone_names
+
+
+def load_logs(habit_ids, habit_zone_index, zone_names, chunk_size=LOAD_CHUNK_SIZE):
+    # Логи читаются пачками и сразу складываются в массивы
+    rows = iter_rows(HabitLog.objects.all(), ['habit_id', 'completed_at'], chunk_size)
+    habits, epochs = [], []
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        habits.append(np.fromiter((row[0] for row in chunk), np.int64, len(chunk)))
+        epochs.append(np.fromiter((int(row[1].timestamp()) for row in chunk), np.int64, len(chunk)))
+
+    if not habits:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    log_ids = np.concatenate(habits)
+    epoch = np.concatenate(epochs)
+
+    # Логи привычек, созданных после выборки привычек, отбрасываются
+    position = np.searchsorted(habit_ids, log_ids)
+    known = position < len(habit_ids)
+    known[known] = habit_ids[position[known]] == log_ids[known]
+    position, epoch = position[known], epoch[known]
+    return position, local_days(epoch, habit_zone_index[position], zone_names)
+
+
+def analyse(periodicity, start_day, today, log_habit, log_day):
+    habit_count = len(periodicity)
+    keys = np.unique(log_habit.astype(np.int64) << DAY_BITS | log_day.astype(np.int64))
+    habit = keys >> DAY_BITS
+    day = keys & ((1 << DAY_BITS) - 1)
+
+    completions = np.bincount(habit, minlength=habit_count)
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = habit[1:] != habit[:-1]
+    gaps = np.diff(day, prepend=day[:1])
+    gaps[first] = 0
+    on_time = ~first & (gaps <= periodicity[habit])
+
+    # Серия продолжается, пока выполнения идут не реже периодичности
+    run_start = ~on_time
+    run_id = np.cumsum(run_start) - 1
+    run_length = np.bincount(run_id)
+    run_habit = habit[run_start]
+
+    longest = np.zeros(habit_count, dtype=np.int64)
+    current = np.zeros(habit_count, dtype=np.int64)
+    if len(keys):
+        habit_first_run = np.flatnonzero(np.r_[True, run_habit[1:] != run_habit[:-1]])
+        longest[run_habit[habit_first_run]] = np.maximum.reduceat(run_length, habit_first_run)
+
+        last = np.r_[first[1:], True]
+        last_habit = habit[last]
+        alive = today[last_habit] - day[last] <= periodicity[last_habit]
+        current[last_habit[alive]] = run_length[run_id[last]][alive]
+
+    intervals = np.maximum(completions - 1, 0)
+    on_time_count = np.bincount(habit, weights=on_time, minlength=habit_count)
+    gap_total = np.bincount(habit, weights=gaps, minlength=habit_count)
+    expected = np.maximum((today - start_day) // periodicity + 1, 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'completions': completions,
+            'longest_streak': longest,
+            'current_streak': current,
+            'on_time_ratio': np.where(intervals > 0, on_time_count / intervals, np.nan),
+            'mean_gap_days': np.where(intervals > 0, gap_total / intervals, np.nan),
+            'adherence': np.minimum(completions / expected, 1.0),
+        }
+
+
+def nan_mean(values):
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else None
+
+
+def summarize(periodicity, stats):
+    rows = []
+    for value in np.unique(periodicity):
+        selected = periodicity == value
+        rows.append({
+            'periodicity': int(value),
+            'habits': int(selected.sum()),
+            'completions': int(stats['completions'][selected].sum()),
+            'adherence': float(stats['adherence'][selected].mean()),
+            'on_time_ratio': nan_mean(stats['on_time_ratio'][selected]),
+            'mean_gap_days': nan_mean(stats['mean_gap_days'][selected]),
+            'mean_longest_streak': float(stats['longest_streak'][selected].mean()),
+            'mean_current_streak': float(stats['current_streak'][selected].mean()),
+        })
+    return rows
+
+
+def build_adherence_report(now=None, chunk_size=LOAD_CHUNK_SIZE):
+    now = now or timezone.now()
+    started = time.perf_counter()
+    habit_ids, periodicity, start_day, today, zone_index, zone_names = load_habits(now)
+    log_habit, log_day = load_logs(habit_ids, zone_index, zone_names, chunk_size)
+    rows = summarize(periodicity, analyse(periodicity, start_day, today, log_habit, log_day))
+    duration = time.perf_counter() - started
+
+    with transaction.atomic():
+        report = AdherenceReport.objects.create(
+            habits=len(habit_ids),
+            logs=len(log_habit),
+            duration_ms=int(duration * 1000),
+        )
+        AdherenceReportRow.objects.bulk_create([AdherenceReportRow(report=report, **row) for row in rows])
+    return report
@@ -3,4 +3,12 @@ from django.apps import AppConfig
 
 class HabitsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'habits' 
\ No newline at end of file
+    name = 'habits'
+
+    def ready(self):
+        from django.conf import settings
+        from . import signals  # noqa: F401
+
+        if settings.METRICS_ENABLED:
+            from .metrics import connect_celery_signals
+            connect_celery_signals()
@@ -0,0 +1,62 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework.response import Response
+
+ASYNC_ACTIONS = ('list', 'retrieve')
+
+
+class AsyncReadMixin:
+    # Асинхронные list/retrieve для ASGI: строки читаются async ORM,
+    # а фильтры, пагинация и сериализатор те же, что у синхронных действий
+    async def alist(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.paginator is None:
+            return Response(self.get_serializer([obj async for obj in queryset], many=True).data)
+        page = self.paginator.page_queryset(queryset, request, view=self)
+        page = self.paginator.set_page([obj async for obj in page])
+        return self.get_paginated_response(self.get_serializer(page, many=True).data)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(request, instance)
+        return Response(self.get_serializer(instance).data)
+
+
+def async_view(viewset, actions, **initkwargs):
+    # DRF 3.14 не умеет асинхронные представления, поэтому GET-действия из
+    # ASYNC_ACTIONS проходят цикл dispatch() здесь, а остальные методы
+    # уходят в обычное синхронное представление того же viewset
+    sync_view = viewset.as_view(actions, **initkwargs)
+
+    async def view(request, *args, **kwargs):
+        action = actions.get(request.method.lower())
+        if action not in ASYNC_ACTIONS:
+            return await sync_to_async(sync_view)(request, *args, **kwargs)
+
+        self = viewset(**initkwargs)
+        self.action_map = actions
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            # Аутентификация и права синхронные: токен может потребовать запрос к БД
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            response = await getattr(self, f'a{action}')(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    view.csrf_exempt = True
+    # Для меток метрик, как у представлений DRF
+    view.cls = viewset
+    view.actions = actions
+    return view
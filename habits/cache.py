@@ -0,0 +1,69 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+FEED_VERSION_KEY = 'public-feed:version'
+FEED_HITS_KEY = 'public-feed:hits'
+FEED_MISSES_KEY = 'public-feed:misses'
+
+
+def _incr(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        return cache.incr(key)
+
+
+def feed_version():
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        cache.add(FEED_VERSION_KEY, 1, timeout=None)
+        version = cache.get(FEED_VERSION_KEY, 1)
+    return version
+
+
+def invalidate_public_feed():
+    # Версия повышается сразу и ещё раз после коммита: страница, закэшированная
+    # конкурентным запросом до коммита, не переживёт второго повышения
+    _incr(FEED_VERSION_KEY)
+    transaction.on_commit(lambda: _incr(FEED_VERSION_KEY))
+
+
+def feed_cache_key(request):
+    params = sorted(request.query_params.lists())
+    raw = json.dumps([request.get_host(), request.path, params])
+    return f'public-feed:v{feed_version()}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def make_etag(data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True, ensure_ascii=False)
+    return '"%s"' % hashlib.sha1(payload.encode()).hexdigest()
+
+
+def get_cached_feed(key):
+    entry = cache.get(key)
+    _incr(FEED_MISSES_KEY if entry is None else FEED_HITS_KEY)
+    return entry
+
+
+def set_cached_feed(key, data):
+    entry = {'data': data, 'etag': make_etag(data)}
+    cache.set(key, entry, timeout=settings.PUBLIC_FEED_CACHE_TIMEOUT)
+    return entry
+
+
+def feed_cache_stats():
+    hits = cache.get(FEED_HITS_KEY, 0)
+    misses = cache.get(FEED_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+        'version': feed_version(),
+    }
@@ -0,0 +1,124 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Habit, HabitCompletionKey, HabitLog
+from .partitions import retention_cutoff
+from .scheduling import get_zone, next_reminder_at
+from .serializers import BulkCompletionItemSerializer
+from .signals import reminder_rescheduled
+from .stats import record_completions
+
+# Допустимое расхождение часов клиента и сервера для completed_at из будущего
+CLOCK_SKEW = timedelta(minutes=5)
+
+
+def complete_habits(user, items, now=None):
+    now = now or timezone.now()
+    results = [{'index': index, 'status': None} for index in range(len(items))]
+    cutoff = retention_cutoff(now)
+
+    valid = []
+    for result, item in zip(results, items):
+        serializer = BulkCompletionItemSerializer(data=item)
+        if not serializer.is_valid():
+            result.update(status='invalid', errors=serializer.errors)
+            continue
+        data = serializer.validated_data
+        data.setdefault('completed_at', now)
+        data.setdefault('idempotency_key', None)
+        result.update(habit_id=data['habit_id'], idempotency_key=data['idempotency_key'])
+        if data['completed_at'] > now + CLOCK_SKEW:
+            result.update(status='invalid', errors={'completed_at': ['Дата выполнения не может быть в будущем']})
+            continue
+        if cutoff is not None and data['completed_at'] < cutoff:
+            result.update(status='invalid', errors={'completed_at': ['Дата выполнения старше срока хранения логов']})
+            continue
+        valid.append((result, data))
+
+    # Владение всеми привычками проверяется одним запросом
+    habit_ids = {data['habit_id'] for _, data in valid}
+    habits = Habit.objects.filter(user=user, pk__in=habit_ids).only('id', 'time', 'periodicity', 'next_reminder_at').in_bulk()
+
+    seen = {}
+    for result, data in valid:
+        if data['habit_id'] not in habits:
+            result['status'] = 'not_found'
+            continue
+        key = (data['habit_id'], data['idempotency_key'])
+        if data['idempotency_key'] is not None:
+            if key in seen:
+                result['status'] = 'duplicate'
+                continue
+            seen[key] = data['completed_at']
+
+    with transaction.atomic():
+        # Повтор того же запроса, в том числе параллельный, не захватит уже
+        # занятый ключ и не создаст второй лог
+        claimed = claim_completion_keys(seen)
+        inserted = []
+        for result, data in valid:
+            if result['status'] is not None:
+                continue
+            if data['idempotency_key'] is not None and (data['habit_id'], data['idempotency_key']) not in claimed:
+                result['status'] = 'duplicate'
+                continue
+            inserted.append((result, HabitLog(habit_id=data['habit_id'], completed_at=data['completed_at'], idempotency_key=data['idempotency_key'])))
+        # Вставка без ignore_conflicts: каждая строка либо записана, либо откатывает
+        # всю транзакцию, поэтому «создано» и перенос напоминаний считаются
+        # только по записанным логам
+        logs = [log for _, log in inserted]
+        HabitLog.objects.bulk_create(logs, batch_size=settings.BULK_COMPLETE_BATCH_SIZE)
+        for result, _ in inserted:
+            result['status'] = 'created'
+        zone = get_zone(user.timezone)
+        rescheduled = reschedule_completed(habits, logs, zone)
+        # Агрегаты получают только записанные логи, поэтому повтор их не сдвигает
+        record_completions(logs, {habit.pk: habit.periodicity for habit in habits.values()}, zone)
+
+    for habit_id in rescheduled:
+        reminder_rescheduled.send(sender=Habit, habit_id=habit_id)
+    return results
+
+
+def claim_completion_keys(keys):
+    # keys: {(habit_id, idempotency_key): completed_at}. Вставка с ON CONFLICT DO NOTHING
+    # не сообщает, какие строки вставлены, поэтому свои находятся по токену
+    if not keys:
+        return set()
+    token = uuid.uuid4()
+    HabitCompletionKey.objects.bulk_create(
+        [
+            HabitCompletionKey(habit_id=habit_id, idempotency_key=key, completed_at=completed_at, claim_token=token)
+            for (habit_id, key), completed_at in keys.items()
+        ],
+        ignore_conflicts=True,
+        batch_size=settings.BULK_COMPLETE_BATCH_SIZE,
+    )
+    habit_ids = {habit_id for habit_id, _ in keys}
+    return set(
+        HabitCompletionKey.objects.filter(habit_id__in=habit_ids, claim_token=token)
+        .values_list('habit_id', 'idempotency_key')
+    )
+
+
+def reschedule_completed(habits, logs, zone):
+    latest = {}
+    for log in logs:
+        if log.habit_id not in latest or log.completed_at > latest[log.habit_id]:
+            latest[log.habit_id] = log.completed_at
+
+    changed = []
+    for habit_id, completed_at in latest.items():
+        habit = habits[habit_id]
+        due = next_reminder_at(habit.time, habit.periodicity, completed_at, completed_at, zone)
+        # Выполнение, синхронизированное с опозданием, не должно сдвигать
+        # напоминание раньше уже учтённого более позднего выполнения
+        if habit.next_reminder_at is None or due > habit.next_reminder_at:
+            habit.next_reminder_at = due
+            changed.append(habit)
+    Habit.objects.bulk_update(changed, ['next_reminder_at'], batch_size=settings.BULK_COMPLETE_BATCH_SIZE)
+    return [habit.pk for habit in changed]
@@ -0,0 +1,138 @@
+import logging
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from telegram.error import RetryAfter
+
+from .ratelimit import SharedTokenBucket, TokenBucket
+from .redis_clients import get_redis
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+TELEGRAM_GLOBAL_RATE_KEY = "habits:telegram-global-rate"
+
+
+def build_reminder_text(habit):
+    text = f"Время выполнить: {habit.action}\n"
+    text += f"Место: {habit.place}\n"
+    text += f"Время: {habit.time}\n"
+    text += f"Время на выполнение: {habit.execution_time} секунд\n"
+
+    if habit.reward:
+        text += f"Вознаграждение: {habit.reward}\n"
+    elif habit.related_habit:
+        text += f"Связанная привычка: {habit.related_habit.action}\n"
+
+    return text
+
+
+def build_reminder_message(habit):
+    return "🔔 Напоминание о привычке!\n\n" + build_reminder_text(habit)
+
+
+def combine_reminders(texts):
+    if len(texts) == 1:
+        header = "🔔 Напоминание о привычке!\n\n"
+    else:
+        header = "🔔 Напоминание о привычках!\n\n"
+
+    messages = []
+    current = header
+    for text in texts:
+        if current != header and len(current) + len(text) + 1 > TELEGRAM_MESSAGE_LIMIT:
+            messages.append(current)
+            current = header
+        current += text if current == header else "\n" + text
+    messages.append(current)
+    return messages
+
+
+def group_reminders(habits):
+    texts = defaultdict(list)
+    for habit in habits:
+        chat_id = habit.user.telegram_chat_id
+        if not chat_id:
+            logger.info("Пользователь %d не настроил Telegram", habit.user_id)
+            continue
+        texts[chat_id].append(build_reminder_text(habit))
+    return {chat_id: combine_reminders(chat_texts) for chat_id, chat_texts in texts.items()}
+
+
+def telegram_global_bucket():
+    # Лимит Telegram общий для всех воркеров, которые шлют от имени бота
+    rate = settings.TELEGRAM_GLOBAL_RATE
+    if not settings.TELEGRAM_RATE_REDIS_URL:
+        return TokenBucket(rate)
+    return SharedTokenBucket(get_redis(settings.TELEGRAM_RATE_REDIS_URL), TELEGRAM_GLOBAL_RATE_KEY, rate)
+
+
+class ReminderDispatcher:
+    def __init__(self, bot, global_rate=None, chat_rate=None, max_retries=None,
+                 clock=time.monotonic, sleep=time.sleep, global_bucket=None):
+        self.bot = bot
+        self.clock = clock
+        self.sleep = sleep
+        self.chat_rate = chat_rate or settings.TELEGRAM_CHAT_RATE
+        self.max_retries = settings.TELEGRAM_MAX_RETRIES if max_retries is None else max_retries
+        # Ведро процесса подходит, только если отправляет один процесс
+        self.global_bucket = global_bucket or TokenBucket(global_rate or settings.TELEGRAM_GLOBAL_RATE, clock=clock)
+        self.chat_buckets = {}
+        # Чаты, в которые не удалось доставить хотя бы одно сообщение
+        self.failed_chats = set()
+
+    def _chat_bucket(self, chat_id):
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1, clock=self.clock)
+        return self.chat_buckets[chat_id]
+
+    def send(self, chat_id, text):
+        chat_bucket = self._chat_bucket(chat_id)
+        for attempt in range(self.max_retries + 1):
+            wait = max(self.global_bucket.reserve(), chat_bucket.reserve())
+            if wait:
+                self.sleep(wait)
+            try:
+                self.bot.send_message(chat_id=chat_id, text=text)
+                return True
+            except RetryAfter as exc:
+                logger.warning("Telegram попросил подождать %s секунд (чат %s, попытка %d)", exc.retry_after, chat_id, attempt + 1)
+                chat_bucket.pause(exc.retry_after)
+                self.global_bucket.pause(exc.retry_after)
+        logger.error("Не удалось отправить напоминание в чат %s", chat_id)
+        self.failed_chats.add(chat_id)
+        return False
+
+    def _reserve(self, chat_id):
+        return max(self.global_bucket.reserve(), self._chat_bucket(chat_id).reserve())
+
+    def deliver(self, grouped):
+        if not hasattr(self.bot, "send_many"):
+            return sum(self.send(chat_id, text) for chat_id, messages in grouped.items() for text in messages)
+
+        pending = [(chat_id, text) for chat_id, messages in grouped.items() for text in messages]
+        sent = 0
+        for attempt in range(self.max_retries + 1):
+            if not pending:
+                break
+            scheduled = [(self._reserve(chat_id), chat_id, text) for chat_id, text in pending]
+            results = self.bot.send_many(scheduled)
+
+            pending = []
+            for (_, chat_id, text), error in zip(scheduled, results):
+                if error is None:
+                    sent += 1
+                elif isinstance(error, RetryAfter):
+                    logger.warning("Telegram попросил подождать %s секунд (чат %s, попытка %d)", error.retry_after, chat_id, attempt + 1)
+                    self._chat_bucket(chat_id).pause(error.retry_after)
+                    self.global_bucket.pause(error.retry_after)
+                    pending.append((chat_id, text))
+                else:
+                    logger.error("Ошибка отправки в чат %s: %s", chat_id, error)
+                    self.failed_chats.add(chat_id)
+
+        for chat_id, _ in pending:
+            logger.error("Не удалось отправить напоминание в чат %s", chat_id)
+            self.failed_chats.add(chat_id)
+        return sent
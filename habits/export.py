@@ -0,0 +1,91 @@
+import csv
+import io
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .iteration import iter_rows
+from .models import Habit, HabitLog
+
+EXPORT_CHUNK_SIZE = 2000
+DATASETS = {
+    'habits': (Habit, [
+        'id', 'place', 'time', 'action', 'is_pleasant', 'related_habit_id', 'periodicity',
+        'reward', 'execution_time', 'is_public', 'created_at',
+    ]),
+    'logs': (HabitLog, ['id', 'habit_id', 'completed_at', 'idempotency_key']),
+}
+OUTPUTS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def export_queryset(dataset, user=None):
+    model, columns = DATASETS[dataset]
+    queryset = model.objects.all()
+    if user is not None:
+        queryset = queryset.filter(**{'user' if model is Habit else 'habit__user': user})
+    return queryset, columns
+
+
+def csv_chunks(columns, rows, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(columns, rows, chunk_size):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    lines = []
+    for row in rows:
+        lines.append(encoder.encode(dict(zip(columns, row))))
+        if len(lines) >= chunk_size:
+            yield ('\n'.join(lines) + '\n').encode()
+            lines = []
+    if lines:
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(dataset, output, user=None, compress=False, chunk_size=EXPORT_CHUNK_SIZE):
+    queryset, columns = export_queryset(dataset, user)
+    encode = csv_chunks if output == 'csv' else ndjson_chunks
+    # В памяти одновременно находится не больше chunk_size строк
+    chunks = encode(columns, iter_rows(queryset, columns, chunk_size, order=['pk']), chunk_size)
+    return gzip_chunks(chunks) if compress else chunks
+
+
+async def async_chunks(chunks):
+    # Под ASGI StreamingHttpResponse прочитал бы синхронный генератор целиком
+    # (sync_to_async(list)) до первого байта, поэтому чанки берутся по одному
+    chunks = iter(chunks)
+    try:
+        while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+            yield chunk
+    finally:
+        # Клиент мог отключиться посреди выгрузки: курсор закрывается в том же потоке
+        await sync_to_async(getattr(chunks, 'close', lambda: None))()
+
+
+def export_filename(dataset, output, compress=False):
+    extension = OUTPUTS[output][1]
+    return f'{dataset}.{extension}.gz' if compress else f'{dataset}.{extension}'
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import invalidate_public_feed
+from .models import Habit
+from .rules import check_habit, habit_values
+from .scheduling import get_zone, next_reminder_at
+from .serializers import HabitImportSerializer
+from .signals import reminder_rescheduled
+
+
+def import_habits(user, items, now=None):
+    now = now or timezone.now()
+    zone = get_zone(user.timezone)
+    field_validator = HabitImportSerializer()
+    results = [{'index': index, 'status': None} for index in range(len(items))]
+
+    parsed = []
+    for result, item in zip(results, items):
+        try:
+            parsed.append((result, field_validator.run_validation(item)))
+        except serializers.ValidationError as error:
+            result.update(status='invalid', errors=error.detail)
+
+    # Все связанные привычки пакета загружаются одним запросом
+    related_ids = {data['related_habit_id'] for _, data in parsed if data.get('related_habit_id')}
+    related = {}
+    if related_ids:
+        related = dict(Habit.objects.filter(user=user, pk__in=related_ids).values_list('id', 'is_pleasant'))
+
+    habits = []
+    for result, data in parsed:
+        related_id = data.get('related_habit_id')
+        if related_id and related_id not in related:
+            result.update(status='invalid', errors={'related_habit': ['Связанная привычка не найдена']})
+            continue
+        errors = check_habit(habit_values(data), related.get(related_id))
+        if errors:
+            result.update(status='invalid', errors=errors)
+            continue
+        habit = Habit(user=user, **data)
+        habit.next_reminder_at = next_reminder_at(habit.time, habit.periodicity, now, zone=zone)
+        habits.append((result, habit))
+
+    # bulk_create не вызывает save() и сигналы, поэтому расписание посчитано
+    # выше, а ленту и планировщик нужно уведомить отдельно
+    with transaction.atomic():
+        created = Habit.objects.bulk_create([habit for _, habit in habits], batch_size=settings.HABIT_IMPORT_BATCH_SIZE)
+        if any(habit.is_public for habit in created):
+            invalidate_public_feed()
+        for result, habit in habits:
+            result.update(status='created', id=habit.pk)
+            reminder_rescheduled.send(sender=Habit, habit_id=habit.pk)
+    return results
@@ -0,0 +1,55 @@
+from itertools import islice
+
+from django.db import connections
+from django.db.models import Q
+
+
+def server_side_cursors(using='default'):
+    return not connections[using].settings_dict.get('DISABLE_SERVER_SIDE_CURSORS')
+
+
+def iter_rows(queryset, fields, chunk_size, order=None):
+    # Строки values_list(*fields) пачками по chunk_size. В PostgreSQL iterator()
+    # читает их серверным курсором; за pgbouncer в режиме transaction серверных
+    # курсоров нет, а обычный курсор psycopg2 загрузил бы всю выборку, поэтому
+    # пачки читаются отдельными запросами по ключу order (order=None — любой порядок)
+    if server_side_cursors(queryset.db):
+        if order is not None:
+            queryset = queryset.order_by(*order)
+        return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+    return keyset_rows(queryset, fields, chunk_size, tuple(order or ()))
+
+
+def keyset_rows(queryset, fields, chunk_size, order):
+    # pk в конце ключа делает порядок однозначным
+    if 'pk' not in order:
+        order += ('pk',)
+    columns = list(order) + [field for field in fields if field not in order]
+    positions = [columns.index(field) for field in fields]
+    queryset = queryset.order_by(*order).values_list(*columns)
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(after(order, last))
+        rows = list(page[:chunk_size])
+        for row in rows:
+            yield tuple(row[position] for position in positions)
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][:len(order)]
+
+
+def after(order, values):
+    # Строки строго после values в лексикографическом порядке полей order
+    condition = Q()
+    for index, field in enumerate(order):
+        step = Q(**{f'{field}__gt': values[index]})
+        for previous, value in zip(order[:index], values[:index]):
+            step &= Q(**{previous: value})
+        condition |= step
+    return condition
+
+
+def batched(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
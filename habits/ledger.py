@@ -0,0 +1,110 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Avg, Count, F, Q
+from django.utils import timezone
+
+from .models import ReminderDelivery
+
+CLAIM_BATCH_SIZE = 1000
+LAG_PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def claim_deliveries(slots, now=None):
+    # slots: список (habit_id, due_slot). Вставка с ON CONFLICT DO NOTHING не
+    # сообщает, какие строки вставлены, поэтому свои строки находятся по токену
+    if not slots:
+        return []
+    now = now or timezone.now()
+    token = uuid.uuid4()
+    ReminderDelivery.objects.bulk_create(
+        [ReminderDelivery(habit_id=habit_id, due_slot=due, claim_token=token, claimed_at=now) for habit_id, due in slots],
+        ignore_conflicts=True,
+        batch_size=CLAIM_BATCH_SIZE,
+    )
+    habit_ids = {habit_id for habit_id, _ in slots}
+    return list(ReminderDelivery.objects.filter(habit_id__in=habit_ids, claim_token=token).order_by('id').values_list('id', flat=True))
+
+
+def start_deliveries(delivery_ids):
+    # Отправляет тот, чей UPDATE перевёл доставку в «отправляется»: повторно
+    # доставленная задача Celery уже отправленную или отправляемую доставку не найдёт
+    token = uuid.uuid4()
+    ReminderDelivery.objects.filter(
+        pk__in=delivery_ids, status__in=[ReminderDelivery.PENDING, ReminderDelivery.FAILED],
+    ).update(status=ReminderDelivery.SENDING, claim_token=token, attempts=F('attempts') + 1, started_at=timezone.now())
+    return list(
+        ReminderDelivery.objects.filter(pk__in=delivery_ids, claim_token=token)
+        .select_related('habit__user', 'habit__related_habit')
+        .order_by('habit__time', 'habit_id')
+    )
+
+
+def finish_deliveries(deliveries, status, now=None):
+    if not deliveries:
+        return
+    now = now or timezone.now()
+    for delivery in deliveries:
+        delivery.status = status
+        if status == ReminderDelivery.SENT:
+            delivery.sent_at = now
+            delivery.lag_ms = max(int((now - delivery.due_slot).total_seconds() * 1000), 0)
+    ReminderDelivery.objects.bulk_update(deliveries, ['status', 'sent_at', 'lag_ms'])
+
+
+def recover_deliveries(now=None):
+    # Доставка остаётся «отправляется», если воркер упал посреди отправки, и
+    # «ожидает», если её задачу не удалось поставить в очередь или брокер её
+    # потерял. Такие строки старше таймаута снова уходят в отправку, пока
+    # напоминание не устарело и попытки не исчерпаны. Таймаут должен быть больше
+    # самой долгой отправки пачки, иначе живая отправка будет повторена
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.REMINDER_DELIVERY_SENDING_TIMEOUT)
+    deliveries = ReminderDelivery.objects.filter(attempts__lte=settings.REMINDER_DELIVERY_MAX_RETRIES)
+    deliveries.filter(status=ReminderDelivery.SENDING, started_at__lt=stale).update(status=ReminderDelivery.FAILED)
+    deliveries.filter(
+        status__in=[ReminderDelivery.PENDING, ReminderDelivery.FAILED],
+        due_slot__lt=now - timedelta(minutes=settings.REMINDER_CATCHUP_MINUTES),
+    ).update(status=ReminderDelivery.SKIPPED)
+    # Неудачная доставка, которую ещё ждёт повтор Celery, моложе таймаута;
+    # если повтор всё же придёт, start_deliveries отдаст её только одному
+    return list(
+        deliveries.filter(
+            Q(status=ReminderDelivery.PENDING, claimed_at__lt=stale)
+            | Q(status=ReminderDelivery.FAILED, started_at__lt=stale)
+        ).order_by('id').values_list('id', flat=True)
+    )
+
+
+def prune_deliveries(now=None):
+    now = now or timezone.now()
+    cutoff = now - timedelta(days=settings.REMINDER_DELIVERY_RETENTION_DAYS)
+    deleted, _ = ReminderDelivery.objects.filter(claimed_at__lt=cutoff).delete()
+    return deleted
+
+
+def delivery_stats(minutes=60, now=None):
+    now = now or timezone.now()
+    window = ReminderDelivery.objects.filter(claimed_at__gte=now - timedelta(minutes=minutes)).order_by()
+    statuses = dict(window.values_list('status').annotate(count=Count('id')))
+    attempts = window.exclude(status=ReminderDelivery.PENDING).aggregate(
+        mean=Avg('attempts'), retried=Count('id', filter=Q(attempts__gt=1)),
+    )
+
+    # Процентили задержки берутся по смещению в отсортированной выборке:
+    # по запросу на процентиль без выгрузки всех строк
+    sent = statuses.get(ReminderDelivery.SENT, 0)
+    lags = window.filter(status=ReminderDelivery.SENT).order_by('lag_ms').values_list('lag_ms', flat=True)
+    lag_ms = {}
+    for fraction in LAG_PERCENTILES:
+        lag_ms[f'p{int(fraction * 100)}'] = lags[min(int(sent * fraction), sent - 1)] if sent else None
+
+    return {
+        'minutes': minutes,
+        'statuses': {status: statuses.get(status, 0) for status, _ in ReminderDelivery.STATUS_CHOICES},
+        'sent_per_minute': round(sent / minutes, 2),
+        'lag_ms': lag_ms,
+        'mean_attempts': round(attempts['mean'], 2) if attempts['mean'] is not None else None,
+        'retried': attempts['retried'],
+    }
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from habits.iteration import iter_rows
+from habits.models import HabitLog, HabitStats
+from habits.scheduling import get_zone
+from habits.stats import STATS_FIELDS, record_day
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику привычек по логам выполнения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        logs = iter_rows(
+            HabitLog.objects.all(),
+            ['habit_id', 'completed_at', 'habit__periodicity', 'habit__user__timezone'],
+            chunk_size,
+            order=['habit_id', 'completed_at'],
+        )
+
+        pending = []
+        current = None
+        total = 0
+        # Логи идут по привычкам подряд, поэтому в памяти держится только
+        # статистика одной привычки и пачка готовых строк
+        for habit_id, completed_at, periodicity, zone_name in logs:
+            if current is None or current.habit_id != habit_id:
+                current = HabitStats(habit_id=habit_id)
+                pending.append(current)
+                if len(pending) > chunk_size:
+                    self.flush(pending[:-1])
+                    total += len(pending) - 1
+                    pending = pending[-1:]
+            record_day(current, timezone.localdate(completed_at, get_zone(zone_name)), periodicity)
+
+        self.flush(pending)
+        total += len(pending)
+        removed, _ = HabitStats.objects.filter(habit__habitlog__isnull=True).delete()
+        self.stdout.write(self.style.SUCCESS(f'Пересчитана статистика {total} привычек, удалено устаревших записей: {removed}'))
+
+    def flush(self, rows):
+        HabitStats.objects.bulk_create(rows, update_conflicts=True, unique_fields=['habit'], update_fields=STATS_FIELDS)
@@ -0,0 +1,41 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from habits.export import DATASETS, EXPORT_CHUNK_SIZE, OUTPUTS, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка привычек или логов в CSV/NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(DATASETS))
+        parser.add_argument('--output', choices=list(OUTPUTS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Сжимать выгрузку gzip на лету')
+        parser.add_argument('--user', help='Выгрузить данные только этого пользователя')
+        parser.add_argument('--file', default='-', help='Файл для записи, по умолчанию stdout')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Пользователь {options['user']} не найден")
+
+        chunks = stream_export(
+            options['dataset'], options['output'], user=user,
+            compress=options['gzip'], chunk_size=options['chunk_size'],
+        )
+        if options['file'] == '-':
+            self.write(sys.stdout.buffer, chunks)
+        else:
+            with open(options['file'], 'wb') as target:
+                self.write(target, chunks)
+
+    def write(self, target, chunks):
+        for chunk in chunks:
+            target.write(chunk)
+        target.flush()
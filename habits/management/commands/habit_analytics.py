@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from habits.analytics import LOAD_CHUNK_SIZE, build_adherence_report
+
+
+def percent(value):
+    return '—' if value is None else f'{value:.1%}'
+
+
+class Command(BaseCommand):
+    help = 'Отчёт о соблюдении привычек по всем пользователям в разрезе периодичности'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=LOAD_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        report = build_adherence_report(chunk_size=options['chunk_size'])
+        self.stdout.write(f'Привычек: {report.habits}, логов: {report.logs}, расчёт: {report.duration_ms} мс')
+        for row in report.rows.all():
+            self.stdout.write(
+                f'{row.get_periodicity_display()}: привычек {row.habits}, '
+                f'выполнено {percent(row.adherence)}, в срок {percent(row.on_time_ratio)}, '
+                f'средняя лучшая серия {row.mean_longest_streak:.1f}'
+            )
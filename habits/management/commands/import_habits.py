@@ -0,0 +1,50 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from habits.importing import import_habits
+
+
+def read_rows(path):
+    with open(path, encoding='utf-8', newline='') as source:
+        if path.endswith('.csv'):
+            # Пустые ячейки CSV означают отсутствие значения
+            for row in csv.DictReader(source):
+                yield {key: value if value != '' else None for key, value in row.items()}
+        else:
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+
+
+class Command(BaseCommand):
+    help = 'Импорт привычек пользователя из CSV или NDJSON пакетами'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .csv или .ndjson')
+        parser.add_argument('--user', required=True, help='Пользователь, которому принадлежат привычки')
+        parser.add_argument('--batch-size', type=int, default=settings.HABIT_IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f"Пользователь {options['user']} не найден")
+
+        rows = read_rows(options['path'])
+        offset = created = 0
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            for result in import_habits(user, batch):
+                if result['status'] == 'created':
+                    created += 1
+                else:
+                    self.stderr.write(f"Строка {offset + result['index'] + 1}: {json.dumps(result['errors'], ensure_ascii=False)}")
+            offset += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'Импортировано привычек: {created} из {offset}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from habits.cache import feed_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Статистика кэша публичной ленты привычек'
+
+    def handle(self, *args, **options):
+        stats = feed_cache_stats()
+        self.stdout.write(f"Попадания: {stats['hits']}")
+        self.stdout.write(f"Промахи: {stats['misses']}")
+        self.stdout.write(f"Доля попаданий: {stats['hit_rate']:.1%}")
+        self.stdout.write(f"Версия ленты: {stats['version']}")
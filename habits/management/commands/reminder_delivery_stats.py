@@ -0,0 +1,25 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from habits.ledger import delivery_stats
+
+
+class Command(BaseCommand):
+    help = 'Статистика доставки напоминаний: статусы, скорость отправки и процентили задержки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--minutes', type=int, default=60, help='Окно в минутах')
+        parser.add_argument('--json', action='store_true', help='Вывести результат в JSON')
+
+    def handle(self, *args, **options):
+        stats = delivery_stats(options['minutes'])
+        if options['json']:
+            self.stdout.write(json.dumps(stats))
+            return
+
+        self.stdout.write(f'За {stats["minutes"]} мин: ' + ', '.join(f'{status} {count}' for status, count in stats['statuses'].items()))
+        self.stdout.write(f'Отправлено в минуту: {stats["sent_per_minute"]}')
+        lags = ', '.join(f'{name} {"—" if value is None else f"{value} мс"}' for name, value in stats['lag_ms'].items())
+        self.stdout.write(f'Задержка: {lags}')
+        self.stdout.write(f'Попыток в среднем: {stats["mean_attempts"] or "—"}, с повторами: {stats["retried"]}')
@@ -0,0 +1,45 @@
+import time
+
+import redis
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from habits.reminder_scheduler import ReminderScheduler
+from habits.tasks import dispatch_reminders
+
+
+class Command(BaseCommand):
+    help = 'Планировщик напоминаний на колесе таймеров (REMINDER_SCHEDULER=wheel)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0, help='Период проверки колеса в секундах')
+
+    def handle(self, *args, **options):
+        if settings.REMINDER_SCHEDULER != 'wheel':
+            raise CommandError('Планировщик работает только при REMINDER_SCHEDULER=wheel')
+
+        scheduler = ReminderScheduler(fire=dispatch_reminders)
+        pubsub = redis.Redis.from_url(settings.REMINDER_UPDATES_REDIS_URL).pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(settings.REMINDER_UPDATES_CHANNEL)
+
+        # Подписка оформляется до загрузки, чтобы не потерять изменения, сделанные во время неё
+        scheduler.load()
+        self.stdout.write(f'Загружено напоминаний: {len(scheduler.wheel)}')
+
+        next_check = time.monotonic()
+        while True:
+            message = pubsub.get_message(timeout=max(0.0, next_check - time.monotonic()))
+            if message is not None:
+                scheduler.apply_update(int(message['data']))
+            if time.monotonic() < next_check:
+                continue
+
+            # Процесс живёт долго, поэтому соединение проверяется и обновляется по
+            # CONN_MAX_AGE так же, как между запросами веб-приложения
+            close_old_connections()
+            fired = scheduler.run_pending()
+            if fired:
+                self.stdout.write(f'Отправлено напоминаний: {len(fired)}')
+            scheduler.refresh()
+            next_check = time.monotonic() + options['interval']
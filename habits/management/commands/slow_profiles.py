@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from habits.profiling import load_profile, load_profiles, top_offenders
+
+
+class Command(BaseCommand):
+    help = 'Медленные запросы и задачи из кольцевого буфера профилей: худшие по имени или подробный профиль'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--kind', choices=['request', 'task'], help='Только запросы или только задачи')
+        parser.add_argument('--limit', type=int, default=10, help='Сколько строк вывести')
+        parser.add_argument('--show', metavar='ID', help='Показать профиль с этим id')
+
+    def handle(self, *args, **options):
+        if options['show']:
+            try:
+                profile = load_profile(options['show'])
+            except FileNotFoundError:
+                raise CommandError(f'Профиль {options["show"]} не найден')
+            self.render(profile, options['limit'])
+            return
+
+        rows = top_offenders(load_profiles(options['kind']), options['limit'])
+        if not rows:
+            self.stdout.write('Профилей нет')
+            return
+        for row in rows:
+            self.stdout.write(
+                f'{row["max_ms"]:>10.1f} мс  {row["kind"]:<7} {row["name"]}  '
+                f'(профилей {row["count"]}, в среднем {row["mean_ms"]:.1f} мс, худший {row["slowest"]})'
+            )
+
+    def render(self, profile, limit):
+        queries = profile['queries']
+        self.stdout.write(f'{profile["kind"]} {profile["name"]}: {profile["duration_ms"]:.1f} мс')
+        if profile.get('view'):
+            self.stdout.write(f'Представление {profile["view"]}, статус {profile["status"]}')
+        if profile.get('error'):
+            self.stdout.write(f'Ошибка: {profile["error"]}')
+        self.stdout.write(
+            f'SQL: {queries["count"]} запросов, {queries["total_ms"]:.1f} мс; '
+            f'сериализаторы: {profile["serializer_ms"]:.1f} мс'
+        )
+
+        self.stdout.write('\nЗапросы к БД по суммарному времени:')
+        for query in queries['top'][:limit]:
+            self.stdout.write(f'{query["total_ms"]:>10.1f} мс  x{query["count"]:<5} {query["sql"][:200]}')
+
+        self.stdout.write('\nФункции по накопленному времени:')
+        for function in profile['functions'][:limit]:
+            self.stdout.write(
+                f'{function["cumtime_ms"]:>10.1f} мс  {function["tottime_ms"]:>8.1f} мс  '
+                f'x{function["calls"]:<7} {function["function"]}'
+            )
@@ -0,0 +1,138 @@
+import hmac
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess, start_http_server
+
+# С PROMETHEUS_MULTIPROC_DIR каждый процесс gunicorn и Celery пишет значения
+# в свои mmap-файлы в этом каталоге, а /metrics суммирует их по всем процессам
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+REQUEST_LATENCY = Histogram(
+    'habit_tracker_http_request_duration_seconds', 'Время обработки HTTP-запроса',
+    ['view', 'method', 'status'], buckets=LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    'habit_tracker_http_request_db_queries', 'Число запросов к БД за HTTP-запрос',
+    ['view'], buckets=QUERY_BUCKETS,
+)
+REQUEST_DB_TIME = Histogram(
+    'habit_tracker_http_request_db_duration_seconds', 'Время запросов к БД за HTTP-запрос',
+    ['view'], buckets=LATENCY_BUCKETS,
+)
+TASK_DURATION = Histogram(
+    'habit_tracker_celery_task_duration_seconds', 'Время выполнения задачи Celery',
+    ['task', 'state'], buckets=LATENCY_BUCKETS,
+)
+TASK_QUEUE_LAG = Histogram(
+    'habit_tracker_celery_task_queue_lag_seconds', 'Время задачи Celery в очереди до начала выполнения',
+    ['task'], buckets=LATENCY_BUCKETS,
+)
+TELEGRAM_LATENCY = Histogram(
+    'habit_tracker_telegram_send_duration_seconds', 'Время отправки сообщения в Telegram',
+    buckets=LATENCY_BUCKETS,
+)
+TELEGRAM_ERRORS = Counter(
+    'habit_tracker_telegram_send_errors', 'Ошибки отправки сообщений в Telegram',
+    ['error'],
+)
+
+_task_started = {}
+
+
+def view_label(view_func, method):
+    # Для DRF — «Класс.действие» (HabitViewSet.list), для @api_view — имя функции
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        return f'{cls.__name__}.{actions.get(method.lower(), method.lower())}'
+    return cls.__name__
+
+
+class QueryStats:
+    # Обёртка execute_wrapper: считает запросы к БД и их время
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def observe_request(view, method, status, duration, queries=None):
+    REQUEST_LATENCY.labels(view, method, f'{status // 100}xx').observe(duration)
+    if queries is not None:
+        REQUEST_DB_QUERIES.labels(view).observe(queries.count)
+        REQUEST_DB_TIME.labels(view).observe(queries.duration)
+
+
+def metrics_registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def reset_multiprocess_dir():
+    # Главный процесс Celery очищает каталог до запуска дочерних процессов
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if not path:
+        return
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def metrics_view(request):
+    # Метрики раскрывают маршруты и нагрузку, поэтому без токена эндпоинт закрыт
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    token = settings.METRICS_TOKEN
+    if not token or not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(generate_latest(metrics_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def task_published(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault('published_at', time.time())
+
+
+def task_started(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+    published = task.request.get('published_at') or (task.request.headers or {}).get('published_at')
+    if published:
+        TASK_QUEUE_LAG.labels(task.name).observe(max(time.time() - published, 0))
+
+
+def task_finished(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        TASK_DURATION.labels(task.name, (state or 'unknown').lower()).observe(time.perf_counter() - started)
+
+
+def celery_worker_started(**kwargs):
+    reset_multiprocess_dir()
+    if settings.METRICS_CELERY_PORT:
+        start_http_server(settings.METRICS_CELERY_PORT, registry=metrics_registry())
+
+
+def connect_celery_signals():
+    from celery import signals
+
+    signals.before_task_publish.connect(task_published, weak=False)
+    signals.task_prerun.connect(task_started, weak=False)
+    signals.task_postrun.connect(task_finished, weak=False)
+    signals.worker_init.connect(celery_worker_started, weak=False)
@@ -0,0 +1,69 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .metrics import QueryStats, observe_request, view_label
+from .profiling import capture
+
+
+class MetricsMiddleware:
+    # Время запроса по представлению и действию DRF, число и время запросов к БД
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        queries = QueryStats()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        observe_request(self.view(request), request.method, response.status_code, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        # Под ASGI запросы к БД идут в потоках sync_to_async, поэтому считается только время
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        observe_request(self.view(request), request.method, response.status_code, time.perf_counter() - started)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = view_label(view_func, request.method)
+
+    def view(self, request):
+        return getattr(request, 'metrics_view', 'unmatched')
+
+
+class ProfilingMiddleware:
+    # Профилирует долю PROFILING_SAMPLE_RATE запросов и сохраняет те, что медленнее
+    # PROFILING_THRESHOLD_MS. Только синхронный: cProfile привязан к потоку,
+    # а под ASGI корутины разных запросов делят один цикл событий
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        with capture('request', f'{request.method} {request.path}') as entry:
+            response = self.get_response(request)
+            entry.update(view=getattr(request, 'metrics_view', None), status=response.status_code)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Метрики могут быть выключены, а имя представления нужно профилю
+        request.metrics_view = view_label(view_func, request.method)
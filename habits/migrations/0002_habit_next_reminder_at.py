@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:00
+
+from datetime import datetime, timedelta, timezone
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_next_reminder_at(apps, schema_editor):
+    Habit = apps.get_model('habits', 'Habit')
+    now = datetime.now(timezone.utc)
+    window_start = now.replace(second=0, microsecond=0)
+
+    habits = list(Habit.objects.annotate(last_completed_at=Max('habitlog__completed_at')))
+    for habit in habits:
+        due = datetime.combine(now.date(), habit.time, tzinfo=timezone.utc)
+        if due < window_start:
+            due += timedelta(days=1)
+        if habit.last_completed_at is not None:
+            earliest_day = habit.last_completed_at.date() + timedelta(days=habit.periodicity)
+            due = max(due, datetime.combine(earliest_day, habit.time, tzinfo=timezone.utc))
+        habit.next_reminder_at = due
+    Habit.objects.bulk_update(habits, ['next_reminder_at'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habit',
+            name='next_reminder_at',
+            field=models.DateTimeField(blank=True, db_index=True, editable=False, null=True, verbose_name='Следующее напоминание'),
+        ),
+        migrations.RunPython(fill_next_reminder_at, migrations.RunPython.noop),
+    ]
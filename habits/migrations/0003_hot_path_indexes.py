@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('habits', '0002_habit_next_reminder_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', '-created_at'], name='habit_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', 'time'], name='habit_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-created_at'], name='habit_public_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habitlog',
+            index=models.Index(fields=['habit', '-completed_at'], name='habitlog_habit_recent_idx'),
+        ),
+        # Индексы по внешним ключам покрываются составными индексами выше
+        migrations.AlterField(
+            model_name='habit',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AlterField(
+            model_name='habitlog',
+            name='habit',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='habits.habit', verbose_name='Привычка'),
+        ),
+    ]
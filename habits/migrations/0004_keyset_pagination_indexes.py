@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0003_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='habit',
+            name='habit_user_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='habit',
+            name='habit_user_time_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='habit',
+            name='habit_public_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='habit_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(fields=['user', 'time', 'id'], name='habit_user_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='habit',
+            index=models.Index(condition=models.Q(('is_public', True)), fields=['-created_at', '-id'], name='habit_public_created_idx'),
+        ),
+    ]
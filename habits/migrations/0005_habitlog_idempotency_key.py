@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:13
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0004_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='habitlog',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True, verbose_name='Ключ идемпотентности'),
+        ),
+        migrations.AlterField(
+            model_name='habitlog',
+            name='completed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата выполнения'),
+        ),
+        migrations.AddConstraint(
+            model_name='habitlog',
+            constraint=models.UniqueConstraint(fields=('habit', 'idempotency_key'), name='habitlog_habit_idempotency_key_uniq'),
+        ),
+    ]
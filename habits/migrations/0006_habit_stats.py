@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0005_habitlog_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitStats',
+            fields=[
+                ('habit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='habits.habit', verbose_name='Привычка')),
+                ('last_completed_on', models.DateField(blank=True, null=True, verbose_name='Последний день выполнения')),
+                ('current_streak', models.PositiveIntegerField(default=0, verbose_name='Текущая серия')),
+                ('longest_streak', models.PositiveIntegerField(default=0, verbose_name='Самая длинная серия')),
+                ('total_completions', models.PositiveIntegerField(default=0, verbose_name='Всего выполнений')),
+                ('days_mask', models.BinaryField(default=bytes, verbose_name='Дни выполнения')),
+            ],
+            options={
+                'verbose_name': 'Статистика привычки',
+                'verbose_name_plural': 'Статистика привычек',
+            },
+        ),
+    ]
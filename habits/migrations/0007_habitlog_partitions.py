@@ -0,0 +1,110 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:19
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def month_after(month, count=1):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_habitlog(apps, schema_editor):
+    # Только PostgreSQL: таблица пересоздаётся секционированной по месяцам
+    # completed_at, существующие логи переносятся в партиции своих месяцев.
+    # Дальнейшие партиции создаёт задача maintain_habitlog_partitions
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT min(completed_at) FROM habits_habitlog')
+        first = cursor.fetchone()[0] or datetime.now(timezone.utc)
+        now = datetime.now(timezone.utc)
+        month = datetime(first.year, first.month, 1, tzinfo=timezone.utc)
+        last = month_after(datetime(now.year, now.month, 1, tzinfo=timezone.utc), settings.HABITLOG_PARTITIONS_AHEAD)
+
+        cursor.execute('ALTER TABLE habits_habitlog RENAME TO habits_habitlog_old')
+        cursor.execute('ALTER INDEX habits_habitlog_pkey RENAME TO habits_habitlog_old_pkey')
+        cursor.execute('ALTER INDEX habitlog_habit_recent_idx RENAME TO habitlog_habit_recent_old_idx')
+        cursor.execute('ALTER INDEX habitlog_habit_idempotency_key_uniq RENAME TO habitlog_habit_idempotency_key_old_uniq')
+        cursor.execute("""
+            CREATE TABLE habits_habitlog (
+                id bigint NOT NULL,
+                completed_at timestamp with time zone NOT NULL,
+                idempotency_key varchar(64) NULL,
+                habit_id bigint NOT NULL,
+                CONSTRAINT habits_habitlog_pkey PRIMARY KEY (id, completed_at),
+                CONSTRAINT habitlog_habit_idempotency_key_uniq UNIQUE (habit_id, idempotency_key, completed_at),
+                CONSTRAINT habits_habitlog_habit_id_fk_habits_habit_id FOREIGN KEY (habit_id)
+                    REFERENCES habits_habit (id) DEFERRABLE INITIALLY DEFERRED
+            ) PARTITION BY RANGE (completed_at)
+        """)
+        cursor.execute('CREATE INDEX habitlog_habit_recent_idx ON habits_habitlog (habit_id, completed_at DESC)')
+
+        # Сюда попадают выполнения с датой вне созданных месячных партиций
+        cursor.execute('CREATE TABLE habits_habitlog_default PARTITION OF habits_habitlog DEFAULT')
+        while month <= last:
+            cursor.execute(
+                f"CREATE TABLE habits_habitlog_p{month:%Y%m} PARTITION OF habits_habitlog "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_after(month).isoformat()}')"
+            )
+            month = month_after(month)
+
+        cursor.execute(
+            'INSERT INTO habits_habitlog (id, completed_at, idempotency_key, habit_id) '
+            'SELECT id, completed_at, idempotency_key, habit_id FROM habits_habitlog_old'
+        )
+        cursor.execute('DROP TABLE habits_habitlog_old')
+
+        # Партиционированной таблице в PostgreSQL до 17 нельзя иметь identity-колонку
+        cursor.execute('CREATE SEQUENCE habits_habitlog_id_seq OWNED BY habits_habitlog.id')
+        cursor.execute("SELECT setval('habits_habitlog_id_seq', COALESCE(max(id), 0) + 1, false) FROM habits_habitlog")
+        cursor.execute("ALTER TABLE habits_habitlog ALTER COLUMN id SET DEFAULT nextval('habits_habitlog_id_seq')")
+        cursor.execute('ANALYZE habits_habitlog')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0006_habit_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitLogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('completions', models.PositiveIntegerField(verbose_name='Выполнений')),
+            ],
+            options={
+                'verbose_name': 'Дневная сводка выполнений',
+                'verbose_name_plural': 'Дневные сводки выполнений',
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='habitlog',
+            options={'verbose_name': 'Лог привычки', 'verbose_name_plural': 'Логи привычек'},
+        ),
+        migrations.RemoveConstraint(
+            model_name='habitlog',
+            name='habitlog_habit_idempotency_key_uniq',
+        ),
+        migrations.AddConstraint(
+            model_name='habitlog',
+            constraint=models.UniqueConstraint(fields=('habit', 'idempotency_key', 'completed_at'), name='habitlog_habit_idempotency_key_uniq'),
+        ),
+        migrations.AddField(
+            model_name='habitlogrollup',
+            name='habit',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='habits.habit', verbose_name='Привычка'),
+        ),
+        migrations.AddConstraint(
+            model_name='habitlogrollup',
+            constraint=models.UniqueConstraint(fields=('habit', 'day'), name='habitlogrollup_habit_day_uniq'),
+        ),
+        migrations.RunPython(partition_habitlog, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0007_habitlog_partitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdherenceReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('habits', models.PositiveIntegerField(verbose_name='Привычек')),
+                ('logs', models.PositiveBigIntegerField(verbose_name='Логов')),
+                ('duration_ms', models.PositiveIntegerField(verbose_name='Время расчёта (мс)')),
+            ],
+            options={
+                'verbose_name': 'Отчёт о соблюдении привычек',
+                'verbose_name_plural': 'Отчёты о соблюдении привычек',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AdherenceReportRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodicity', models.IntegerField(choices=[(1, 'Ежедневно'), (2, 'Каждые 2 дня'), (3, 'Каждые 3 дня'), (4, 'Каждые 4 дня'), (5, 'Каждые 5 дней'), (6, 'Каждые 6 дней'), (7, 'Еженедельно')], verbose_name='Периодичность')),
+                ('habits', models.PositiveIntegerField(verbose_name='Привычек')),
+                ('completions', models.PositiveBigIntegerField(verbose_name='Дней с выполнением')),
+                ('adherence', models.FloatField(verbose_name='Доля выполнений от ожидаемых')),
+                ('on_time_ratio', models.FloatField(null=True, verbose_name='Доля выполнений в срок')),
+                ('mean_gap_days', models.FloatField(null=True, verbose_name='Средний интервал (дни)')),
+                ('mean_longest_streak', models.FloatField(verbose_name='Средняя самая длинная серия')),
+                ('mean_current_streak', models.FloatField(verbose_name='Средняя текущая серия')),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rows', to='habits.adherencereport', verbose_name='Отчёт')),
+            ],
+            options={
+                'verbose_name': 'Строка отчёта о соблюдении',
+                'verbose_name_plural': 'Строки отчёта о соблюдении',
+                'ordering': ['report', 'periodicity'],
+            },
+        ),
+    ]
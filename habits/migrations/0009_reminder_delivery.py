@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:35
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0008_adherence_report'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_slot', models.DateTimeField(verbose_name='Время напоминания')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает отправки'), ('sending', 'Отправляется'), ('sent', 'Отправлено'), ('failed', 'Ошибка отправки'), ('skipped', 'Пропущено')], default='pending', max_length=16, verbose_name='Статус')),
+                ('claim_token', models.UUIDField(editable=False, null=True, verbose_name='Токен захвата')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки')),
+                ('claimed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Дата захвата')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Дата отправки')),
+                ('lag_ms', models.PositiveIntegerField(blank=True, null=True, verbose_name='Задержка (мс)')),
+                ('habit', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='habits.habit', verbose_name='Привычка')),
+            ],
+            options={
+                'verbose_name': 'Доставка напоминания',
+                'verbose_name_plural': 'Доставки напоминаний',
+                'indexes': [models.Index(fields=['claimed_at'], name='reminderdelivery_claimed_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='reminderdelivery',
+            constraint=models.UniqueConstraint(fields=('habit', 'due_slot'), name='reminderdelivery_habit_slot_uniq'),
+        ),
+    ]
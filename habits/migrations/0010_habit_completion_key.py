@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:51
+
+from django.db import migrations, models
+from django.db.models import Min
+import django.db.models.deletion
+
+
+def fill_completion_keys(apps, schema_editor):
+    HabitLog = apps.get_model('habits', 'HabitLog')
+    HabitCompletionKey = apps.get_model('habits', 'HabitCompletionKey')
+    rows = (
+        HabitLog.objects.filter(idempotency_key__isnull=False)
+        .values('habit_id', 'idempotency_key')
+        .annotate(completed_at=Min('completed_at'))
+        .order_by()
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=5000):
+        batch.append(HabitCompletionKey(**row))
+        if len(batch) >= 5000:
+            HabitCompletionKey.objects.bulk_create(batch)
+            batch = []
+    HabitCompletionKey.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0009_reminder_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HabitCompletionKey',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotency_key', models.CharField(max_length=64, verbose_name='Ключ идемпотентности')),
+                ('completed_at', models.DateTimeField(verbose_name='Дата выполнения')),
+                ('claim_token', models.UUIDField(editable=False, null=True, verbose_name='Токен захвата')),
+                ('habit', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='habits.habit', verbose_name='Привычка')),
+            ],
+            options={
+                'verbose_name': 'Ключ идемпотентности выполнения',
+                'verbose_name_plural': 'Ключи идемпотентности выполнений',
+                'indexes': [models.Index(fields=['completed_at'], name='habitcompletionkey_done_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='habitcompletionkey',
+            constraint=models.UniqueConstraint(fields=('habit', 'idempotency_key'), name='habitcompletionkey_habit_key_uniq'),
+        ),
+        migrations.RunPython(fill_completion_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0010_habit_completion_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminderdelivery',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Начало отправки'),
+        ),
+    ]
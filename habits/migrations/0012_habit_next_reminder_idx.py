@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('habits', '0011_reminderdelivery_started_at'),
+    ]
+
+    # Индекс db_index получает имя с хешем; он переименовывается, а не
+    # пересоздаётся, чтобы не строить его заново на большой таблице
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RenameIndex(
+                    model_name='habit',
+                    new_name='habit_next_reminder_idx',
+                    old_fields=('next_reminder_at',),
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='habit',
+                    name='next_reminder_at',
+                    field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Следующее напоминание'),
+                ),
+                migrations.AddIndex(
+                    model_name='habit',
+                    index=models.Index(fields=['next_reminder_at'], name='habit_next_reminder_idx'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.core.exceptions import FieldDoesNotExist
+
+READ_ACTIONS = ('list', 'retrieve')
+
+
+def serializer_query_plan(serializer, model):
+    # Возвращает (select_related, only) для полей, которые сериализатор отдаёт
+    # наружу; None вместо only, если какое-то поле не отображается в колонку
+    related = set()
+    columns = {model._meta.pk.name}
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            return related, None
+
+        parts = field.source.split('.')
+        current = model
+        for depth, part in enumerate(parts):
+            try:
+                model_field = current._meta.get_field(part)
+            except FieldDoesNotExist:
+                return related, None
+            path = '__'.join(parts[:depth + 1])
+            columns.add(path)
+            if depth < len(parts) - 1:
+                if not model_field.is_relation or model_field.many_to_many or model_field.one_to_many:
+                    return related, None
+                related.add(path)
+                current = model_field.related_model
+    return related, columns
+
+
+class SerializerQuerySetMixin:
+    # Для чтения строит select_related/only по объявленным полям сериализатора,
+    # чтобы список не делал по запросу на строку и не тянул лишние колонки
+    def optimize_queryset(self, queryset):
+        if self.action not in READ_ACTIONS:
+            return queryset
+        related, columns = serializer_query_plan(self.get_serializer_class()(), queryset.model)
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        if columns is not None:
+            queryset = queryset.only(*sorted(columns))
+        return queryset
@@ -3,6 +3,8 @@ from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from .rules import check_habit, habit_values
+
 
 class Habit(models.Model):
     PERIODICITY_CHOICES = [
@@ -15,7 +17,7 @@ class Habit(models.Model):
         (7, 'Еженедельно'),
     ]
     
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, verbose_name='Пользователь')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False, verbose_name='Пользователь')
     place = models.CharField(max_length=200, verbose_name='Место')
     time = models.TimeField(verbose_name='Время')
     action = models.CharField(max_length=500, verbose_name='Действие')
@@ -26,46 +28,232 @@ class Habit(models.Model):
     execution_time = models.IntegerField(verbose_name='Время выполнения (секунды)')
     is_public = models.BooleanField(default=False, verbose_name='Публичная привычка')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    next_reminder_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Следующее напоминание')
     
     class Meta:
         verbose_name = 'Привычка'
         verbose_name_plural = 'Привычки'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='habit_user_created_idx'),
+            models.Index(fields=['user', 'time', 'id'], name='habit_user_time_idx'),
+            models.Index(fields=['-created_at', '-id'], name='habit_public_created_idx', condition=models.Q(is_public=True)),
+            models.Index(fields=['next_reminder_at'], name='habit_next_reminder_idx'),
+        ]
     
     def clean(self):
         super().clean()
+        related_pleasant = self.related_habit.is_pleasant if self.related_habit_id else None
+        errors = check_habit(habit_values({}, self), related_pleasant)
+        if errors:
+            raise ValidationError(errors)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_schedule = (instance.__dict__.get('time'), instance.__dict__.get('periodicity'))
+        instance._loaded_is_public = instance.__dict__.get('is_public')
+        return instance
+    
+    @property
+    def was_public(self):
+        return bool(getattr(self, '_loaded_is_public', False))
+    
+    def _schedule_changed(self):
+        return getattr(self, '_loaded_schedule', None) != (self.time, self.periodicity)
+    
+    @property
+    def reminder_zone(self):
+        from .scheduling import get_zone
         
-        if self.reward and self.related_habit:
-            raise ValidationError('Нельзя одновременно указывать вознаграждение и связанную привычку')
-        
-        if self.execution_time > 120:
-            raise ValidationError('Время выполнения не должно превышать 120 секунд')
-        
-        if self.related_habit and not self.related_habit.is_pleasant:
-            raise ValidationError('В связанные привычки можно добавлять только приятные привычки')
+        return get_zone(self.user.timezone)
+    
+    def schedule_next_reminder(self, now=None):
+        from .scheduling import next_reminder_at, recent_completions
         
-        if self.is_pleasant and (self.reward or self.related_habit):
-            raise ValidationError('У приятной привычки не может быть вознаграждения или связанной привычки')
+        now = now or timezone.now()
+        last_completed_at = None
+        if not self._state.adding:
+            recent = recent_completions(self.habitlog_set.all(), now, self.periodicity)
+            last_completed_at = recent.order_by('-completed_at').values_list('completed_at', flat=True).first()
+        self.next_reminder_at = next_reminder_at(self.time, self.periodicity, now, last_completed_at, self.reminder_zone)
+    
+    def mark_completed(self, completed_at):
+        from .scheduling import next_reminder_at
+        from .signals import reminder_rescheduled
         
-        if self.periodicity > 7:
-            raise ValidationError('Нельзя выполнять привычку реже, чем 1 раз в 7 дней')
+        self.next_reminder_at = next_reminder_at(self.time, self.periodicity, completed_at, completed_at, self.reminder_zone)
+        Habit.objects.filter(pk=self.pk).update(next_reminder_at=self.next_reminder_at)
+        reminder_rescheduled.send(sender=Habit, habit_id=self.pk)
     
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, clean=True, **kwargs):
+        # clean=False для путей, которые уже проверили правила (сериализатор, админка)
+        if clean:
+            self.full_clean()
+        if self._state.adding or self._schedule_changed():
+            self.schedule_next_reminder()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'next_reminder_at'}
         super().save(*args, **kwargs)
+        self._loaded_schedule = (self.time, self.periodicity)
+        self._loaded_is_public = self.is_public
     
     def __str__(self):
         return f"{self.action} в {self.time} в {self.place}"
 
 
 class HabitLog(models.Model):
-    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, verbose_name='Привычка')
-    completed_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата выполнения')
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, db_index=False, verbose_name='Привычка')
+    completed_at = models.DateTimeField(default=timezone.now, verbose_name='Дата выполнения')
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, verbose_name='Ключ идемпотентности')
     
     class Meta:
         verbose_name = 'Лог привычки'
         verbose_name_plural = 'Логи привычек'
-        ordering = ['-completed_at']
+        indexes = [
+            models.Index(fields=['habit', '-completed_at'], name='habitlog_habit_recent_idx'),
+        ]
+        constraints = [
+            # В PostgreSQL таблица секционирована по completed_at, а уникальный
+            # индекс секционированной таблицы обязан включать ключ секционирования,
+            # поэтому повторы по ключу отсекает HabitCompletionKey, а этот индекс —
+            # только точную копию лога
+            models.UniqueConstraint(fields=['habit', 'idempotency_key', 'completed_at'], name='habitlog_habit_idempotency_key_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.habit.action} - {self.completed_at}"
+
+
+class HabitCompletionKey(models.Model):
+    # Ключи идемпотентности выполнений в несекционированной таблице с уникальным
+    # (habit, idempotency_key). Ключ захватывается в одной транзакции с записью лога,
+    # и повтор без явного completed_at не создаёт второй лог
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, db_index=False, verbose_name='Привычка')
+    idempotency_key = models.CharField(max_length=64, verbose_name='Ключ идемпотентности')
+    completed_at = models.DateTimeField(verbose_name='Дата выполнения')
+    claim_token = models.UUIDField(null=True, editable=False, verbose_name='Токен захвата')
+    
+    class Meta:
+        verbose_name = 'Ключ идемпотентности выполнения'
+        verbose_name_plural = 'Ключи идемпотентности выполнений'
+        indexes = [
+            models.Index(fields=['completed_at'], name='habitcompletionkey_done_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['habit', 'idempotency_key'], name='habitcompletionkey_habit_key_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.habit_id} - {self.idempotency_key}"
+
+
+class HabitLogRollup(models.Model):
+    # Дневные количества выполнений из логов, вышедших за срок хранения
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, db_index=False, verbose_name='Привычка')
+    day = models.DateField(verbose_name='День')
+    completions = models.PositiveIntegerField(verbose_name='Выполнений')
+    
+    class Meta:
+        verbose_name = 'Дневная сводка выполнений'
+        verbose_name_plural = 'Дневные сводки выполнений'
+        constraints = [
+            models.UniqueConstraint(fields=['habit', 'day'], name='habitlogrollup_habit_day_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.habit.action} - {self.day}: {self.completions}" 
+
+class HabitStats(models.Model):
+    # Агрегаты для статистики обновляются при каждом выполнении, поэтому
+    # серии и доли выполнения не пересчитываются по логам при чтении.
+    # days_mask: бит i означает выполнение за last_completed_on минус i дней
+    habit = models.OneToOneField(Habit, on_delete=models.CASCADE, primary_key=True, related_name='stats', verbose_name='Привычка')
+    last_completed_on = models.DateField(null=True, blank=True, verbose_name='Последний день выполнения')
+    current_streak = models.PositiveIntegerField(default=0, verbose_name='Текущая серия')
+    longest_streak = models.PositiveIntegerField(default=0, verbose_name='Самая длинная серия')
+    total_completions = models.PositiveIntegerField(default=0, verbose_name='Всего выполнений')
+    days_mask = models.BinaryField(default=bytes, editable=False, verbose_name='Дни выполнения')
+    
+    class Meta:
+        verbose_name = 'Статистика привычки'
+        verbose_name_plural = 'Статистика привычек'
+    
+    def __str__(self):
+        return f"{self.habit.action}: серия {self.current_streak}"
+
+
+class AdherenceReport(models.Model):
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
+    habits = models.PositiveIntegerField(verbose_name='Привычек')
+    logs = models.PositiveBigIntegerField(verbose_name='Логов')
+    duration_ms = models.PositiveIntegerField(verbose_name='Время расчёта (мс)')
+    
+    class Meta:
+        verbose_name = 'Отчёт о соблюдении привычек'
+        verbose_name_plural = 'Отчёты о соблюдении привычек'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Отчёт от {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class AdherenceReportRow(models.Model):
+    report = models.ForeignKey(AdherenceReport, on_delete=models.CASCADE, related_name='rows', verbose_name='Отчёт')
+    periodicity = models.IntegerField(choices=Habit.PERIODICITY_CHOICES, verbose_name='Периодичность')
+    habits = models.PositiveIntegerField(verbose_name='Привычек')
+    completions = models.PositiveBigIntegerField(verbose_name='Дней с выполнением')
+    adherence = models.FloatField(verbose_name='Доля выполнений от ожидаемых')
+    on_time_ratio = models.FloatField(null=True, verbose_name='Доля выполнений в срок')
+    mean_gap_days = models.FloatField(null=True, verbose_name='Средний интервал (дни)')
+    mean_longest_streak = models.FloatField(verbose_name='Средняя самая длинная серия')
+    mean_current_streak = models.FloatField(verbose_name='Средняя текущая серия')
+    
+    class Meta:
+        verbose_name = 'Строка отчёта о соблюдении'
+        verbose_name_plural = 'Строки отчёта о соблюдении'
+        ordering = ['report', 'periodicity']
+    
+    def __str__(self):
+        return f"{self.report}: {self.get_periodicity_display()}"
+
+
+class ReminderDelivery(models.Model):
+    # Журнал доставки: строка на напоминание (привычка, due_slot). Вставка с
+    # ON CONFLICT DO NOTHING забирает напоминание ровно один раз, даже если
+    # тики beat пересекаются или работают beat и планировщик на колесе
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+    STATUS_CHOICES = [
+        (PENDING, 'Ожидает отправки'),
+        (SENDING, 'Отправляется'),
+        (SENT, 'Отправлено'),
+        (FAILED, 'Ошибка отправки'),
+        (SKIPPED, 'Пропущено'),
+    ]
+    
+    habit = models.ForeignKey(Habit, on_delete=models.CASCADE, db_index=False, verbose_name='Привычка')
+    due_slot = models.DateTimeField(verbose_name='Время напоминания')
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING, verbose_name='Статус')
+    claim_token = models.UUIDField(null=True, editable=False, verbose_name='Токен захвата')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Попыток отправки')
+    claimed_at = models.DateTimeField(default=timezone.now, verbose_name='Дата захвата')
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name='Начало отправки')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Дата отправки')
+    lag_ms = models.PositiveIntegerField(null=True, blank=True, verbose_name='Задержка (мс)')
+    
+    class Meta:
+        verbose_name = 'Доставка напоминания'
+        verbose_name_plural = 'Доставки напоминаний'
+        indexes = [
+            models.Index(fields=['claimed_at'], name='reminderdelivery_claimed_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['habit', 'due_slot'], name='reminderdelivery_habit_slot_uniq'),
+        ]
     
     def __str__(self):
-        return f"{self.habit.action} - {self.completed_at}" 
\ No newline at end of file
+        return f"{self.habit_id} - {self.due_slot}: {self.get_status_display()}"
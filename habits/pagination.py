@@ -0,0 +1,123 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # Страница выбирается условием (поле, id) < (значение, id) по индексу,
+    # без COUNT(*) и OFFSET, поэтому глубокие страницы не медленнее первой
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = '-created_at'
+    invalid_cursor_message = 'Некорректный курсор'
+
+    def get_page_size(self, request):
+        page_size = api_settings.PAGE_SIZE
+        if self.page_size_query_param in request.query_params:
+            try:
+                page_size = int(request.query_params[self.page_size_query_param])
+            except ValueError:
+                pass
+        return max(1, min(page_size, settings.API_MAX_PAGE_SIZE))
+
+    def get_ordering(self, request, queryset, view):
+        for backend in getattr(view, 'filter_backends', []):
+            if issubclass(backend, OrderingFilter):
+                ordering = backend().get_ordering(request, queryset, view)
+                if ordering:
+                    return ordering[0]
+        return self.ordering
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            value, pk, reverse = json.loads(urlsafe_b64decode(encoded.encode()))
+            return self.field.to_python(value), int(pk), bool(reverse)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj, reverse):
+        value = self.field.value_to_string(obj)
+        encoded = urlsafe_b64encode(json.dumps([value, obj.pk, reverse]).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def page_queryset(self, queryset, request, view=None):
+        # Срез страницы без выполнения запроса: его читает и синхронный,
+        # и асинхронный путь
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+
+        ordering = self.get_ordering(request, queryset, view)
+        descending = ordering.startswith('-')
+        self.field = queryset.model._meta.get_field(ordering.lstrip('-'))
+        name = self.field.name
+
+        cursor = self.decode_cursor(request)
+        reverse = cursor is not None and cursor[2]
+        if descending != reverse:
+            queryset = queryset.order_by(f'-{name}', '-pk')
+            lookup = 'lt'
+        else:
+            queryset = queryset.order_by(name, 'pk')
+            lookup = 'gt'
+
+        if cursor is not None:
+            value, pk = cursor[0], cursor[1]
+            # (поле, id) < (value, pk) в виде, где граница по полю берётся из индекса
+            queryset = queryset.filter(**{f'{name}__{lookup}e': value}).filter(
+                Q(**{f'{name}__{lookup}': value}) | Q(**{f'pk__{lookup}': pk})
+            )
+
+        self.cursor = cursor
+        self.reverse = reverse
+        return queryset[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request, view)))
+
+    def set_page(self, results):
+        cursor, reverse = self.cursor, self.reverse
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_link = None
+        self.previous_link = None
+        if results:
+            if has_more or reverse:
+                self.next_link = self.encode_cursor(results[-1], reverse=False)
+            if cursor is not None and (has_more or not reverse):
+                self.previous_link = self.encode_cursor(results[0], reverse=True)
+        elif cursor is not None:
+            self.previous_link = remove_query_param(self.base_url, self.cursor_query_param)
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.next_link),
+            ('previous', self.previous_link),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,145 @@
+import logging
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .iteration import batched, iter_rows, server_side_cursors
+from .models import Habit, HabitCompletionKey, HabitLog, HabitLogRollup
+
+logger = logging.getLogger(__name__)
+
+TABLE = HabitLog._meta.db_table
+ROLLUP_BATCH_SIZE = 5000
+# Без серверного курсора сводка считается по группам привычек: до 31 дня на привычку
+ROLLUP_HABITS_PER_QUERY = ROLLUP_BATCH_SIZE // 31
+BOUND_RE = re.compile(r"FROM \('([^']+)'\) TO \('([^']+)'\)")
+
+
+def month_start(moment):
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [TABLE])
+        return cursor.fetchone() is not None
+
+
+def list_partitions():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = %s::regclass ORDER BY c.relname',
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        if bound == 'DEFAULT':
+            continue
+        start, end = BOUND_RE.search(bound).groups()
+        partitions.append((name, datetime.fromisoformat(start), datetime.fromisoformat(end)))
+    return partitions
+
+
+def create_partition(month):
+    name = partition_name(month)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+        )
+    return name
+
+
+def ensure_partitions(now=None):
+    # Партиции создаются заранее: вставка в диапазон без партиции завершится ошибкой
+    if not is_partitioned():
+        return []
+    current = month_start(now or timezone.now())
+    return [create_partition(add_months(current, offset)) for offset in range(settings.HABITLOG_PARTITIONS_AHEAD + 1)]
+
+
+def retention_cutoff(now=None):
+    if not settings.HABITLOG_RETENTION_MONTHS:
+        return None
+    return add_months(month_start(now or timezone.now()), -settings.HABITLOG_RETENTION_MONTHS)
+
+
+def rollup_logs(start, end):
+    # Дни считаются по UTC, поэтому граница партиции не делит день между сводками
+    logs = HabitLog.objects.filter(completed_at__lt=end)
+    if start is not None:
+        logs = logs.filter(completed_at__gte=start)
+    rows = (
+        logs.annotate(day=TruncDate('completed_at', tzinfo=dt_timezone.utc))
+        .values('habit_id', 'day')
+        .annotate(completions=Count('id'))
+        .order_by()
+    )
+    batch = []
+    for row in rollup_rows(rows):
+        batch.append(HabitLogRollup(habit_id=row['habit_id'], day=row['day'], completions=row['completions']))
+        if len(batch) >= ROLLUP_BATCH_SIZE:
+            save_rollups(batch)
+            batch = []
+    save_rollups(batch)
+
+
+def rollup_rows(rows):
+    if server_side_cursors():
+        yield from rows.iterator(chunk_size=ROLLUP_BATCH_SIZE)
+        return
+    habit_ids = iter_rows(Habit.objects.all(), ['id'], ROLLUP_BATCH_SIZE)
+    for chunk in batched(habit_ids, ROLLUP_HABITS_PER_QUERY):
+        yield from rows.filter(habit_id__in=[habit_id for habit_id, in chunk])
+
+
+def save_rollups(rollups):
+    HabitLogRollup.objects.bulk_create(rollups, update_conflicts=True, unique_fields=['habit', 'day'], update_fields=['completions'])
+
+
+def apply_retention(now=None):
+    cutoff = retention_cutoff(now)
+    if cutoff is None:
+        return []
+
+    expired = []
+    if is_partitioned():
+        for name, start, end in list_partitions():
+            if end > cutoff:
+                continue
+            with transaction.atomic():
+                rollup_logs(start, end)
+                with connection.cursor() as cursor:
+                    cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+                    if settings.HABITLOG_RETENTION_ACTION == 'drop':
+                        cursor.execute(f'DROP TABLE {name}')
+            logger.info("Партиция %s свёрнута в дневные сводки и %s", name, 'удалена' if settings.HABITLOG_RETENTION_ACTION == 'drop' else 'отсоединена')
+            expired.append(name)
+
+    # Без секционирования, а в PostgreSQL — для строк из партиции по умолчанию
+    with transaction.atomic():
+        rollup_logs(None, cutoff)
+        deleted, _ = HabitLog.objects.filter(completed_at__lt=cutoff).delete()
+        # Выполнения старше срока хранения отклоняются, поэтому их ключи больше не нужны
+        HabitCompletionKey.objects.filter(completed_at__lt=cutoff).delete()
+    if deleted:
+        logger.info("Удалено %d логов старше %s", deleted, cutoff.date())
+    return expired
@@ -0,0 +1,196 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import sysconfig
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+
+# Профили медленных запросов и задач хранятся JSON-файлами в PROFILING_DIR.
+# Имя файла начинается с времени в наносекундах, поэтому самые старые
+# удаляются первыми, когда файлов больше PROFILING_MAX_FILES
+TOP_FUNCTIONS = 40
+TOP_QUERIES = 15
+SERIALIZER_FUNCTIONS = ('to_representation', 'run_validation')
+SERIALIZER_MODULE = os.path.join('rest_framework', 'serializers.py')
+
+_state = threading.local()
+
+
+class QueryLog:
+    # Обёртка execute_wrapper: время каждого запроса по тексту SQL без параметров
+    def __init__(self):
+        self.queries = defaultdict(lambda: [0, 0.0])
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            entry = self.queries[sql]
+            entry[0] += 1
+            entry[1] += time.perf_counter() - started
+
+
+def sampled():
+    return settings.PROFILING_ENABLED and random.random() < settings.PROFILING_SAMPLE_RATE
+
+
+def short_path(filename):
+    for marker in ('site-packages' + os.sep, str(settings.BASE_DIR) + os.sep, sysconfig.get_paths()['stdlib'] + os.sep):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    return filename
+
+
+def profile_functions(profiler):
+    functions = []
+    serializer = {}
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in pstats.Stats(profiler).stats.items():
+        functions.append({
+            'function': f'{short_path(filename)}:{line}({name})',
+            'calls': calls,
+            'tottime_ms': round(tottime * 1000, 3),
+            'cumtime_ms': round(cumtime * 1000, 3),
+        })
+        # Внешний вызов сериализатора включает вложенные, поэтому берётся максимум
+        if name in SERIALIZER_FUNCTIONS and filename.endswith(SERIALIZER_MODULE):
+            serializer[name] = max(serializer.get(name, 0), cumtime)
+    functions.sort(key=lambda function: function['cumtime_ms'], reverse=True)
+    return functions[:TOP_FUNCTIONS], round(sum(serializer.values()) * 1000, 3)
+
+
+def profile_queries(log):
+    queries = [
+        {'sql': sql, 'count': count, 'total_ms': round(duration * 1000, 3)}
+        for sql, (count, duration) in log.queries.items()
+    ]
+    queries.sort(key=lambda query: query['total_ms'], reverse=True)
+    return {
+        'count': sum(query['count'] for query in queries),
+        'total_ms': round(sum(query['total_ms'] for query in queries), 3),
+        'top': queries[:TOP_QUERIES],
+    }
+
+
+@contextmanager
+def capture(kind, name):
+    # Вложенный захват (задача, выполненная внутри профилируемого запроса)
+    # не начинается: в потоке может работать только один профилировщик
+    if getattr(_state, 'active', False):
+        yield {}
+        return
+    entry = {'kind': kind, 'name': name}
+    log = QueryLog()
+    profiler = cProfile.Profile()
+    _state.active = True
+    started = time.perf_counter()
+    try:
+        with connection.execute_wrapper(log):
+            profiler.enable()
+            try:
+                yield entry
+            finally:
+                profiler.disable()
+    except Exception as error:
+        entry['error'] = repr(error)
+        raise
+    finally:
+        _state.active = False
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= settings.PROFILING_THRESHOLD_MS:
+            functions, serializer_ms = profile_functions(profiler)
+            entry.update(
+                recorded_at=time.time(),
+                duration_ms=round(duration_ms, 3),
+                serializer_ms=serializer_ms,
+                queries=profile_queries(log),
+                functions=functions,
+            )
+            save_profile(entry)
+
+
+def profiled_task(fn):
+    # Декоратор под @shared_task: выключенное профилирование стоит одной проверки настройки
+    name = f'{fn.__module__}.{fn.__name__}'
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not sampled():
+            return fn(*args, **kwargs)
+        with capture('task', name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def save_profile(entry):
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    filename = f'{time.time_ns()}-{os.getpid()}-{entry["kind"]}.json'
+    path = os.path.join(directory, filename)
+    with open(path + '.tmp', 'w') as file:
+        json.dump(entry, file, ensure_ascii=False)
+    os.replace(path + '.tmp', path)
+    trim_profiles(directory, settings.PROFILING_MAX_FILES)
+    return filename[:-len('.json')]
+
+
+def profile_ids(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+
+
+def trim_profiles(directory, keep):
+    ids = profile_ids(directory)
+    for profile_id in ids[:max(len(ids) - keep, 0)]:
+        # Соседний процесс мог удалить файл раньше
+        try:
+            os.remove(os.path.join(directory, f'{profile_id}.json'))
+        except FileNotFoundError:
+            pass
+
+
+def load_profile(profile_id):
+    with open(os.path.join(settings.PROFILING_DIR, f'{profile_id}.json')) as file:
+        return dict(json.load(file), id=profile_id)
+
+
+def load_profiles(kind=None):
+    profiles = []
+    for profile_id in profile_ids(settings.PROFILING_DIR):
+        try:
+            profile = load_profile(profile_id)
+        except FileNotFoundError:
+            continue
+        if kind is None or profile['kind'] == kind:
+            profiles.append(profile)
+    return profiles
+
+
+def top_offenders(profiles, limit):
+    groups = defaultdict(list)
+    for profile in profiles:
+        groups[profile['name']].append(profile)
+    rows = []
+    for name, items in groups.items():
+        durations = [item['duration_ms'] for item in items]
+        slowest = max(items, key=lambda item: item['duration_ms'])
+        rows.append({
+            'name': name,
+            'kind': slowest['kind'],
+            'count': len(items),
+            'max_ms': max(durations),
+            'mean_ms': round(sum(durations) / len(durations), 3),
+            'slowest': slowest['id'],
+        })
+    rows.sort(key=lambda row: row['max_ms'], reverse=True)
+    return rows[:limit]
@@ -0,0 +1,86 @@
+import logging
+import time
+
+import redis
+
+logger = logging.getLogger(__name__)
+
+# Пополняет ведро по времени Redis, списывает cost токенов или ставит паузу
+# и возвращает остаток. Число возвращается строкой: Lua отбросил бы дробную часть
+SHARED_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local pause = tonumber(ARGV[4])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+local tokens = tonumber(state[1]) or capacity
+local updated_at = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - updated_at, 0) * rate)
+if pause > 0 then
+    tokens = math.min(tokens, 0) - pause * rate
+end
+tokens = tokens - cost
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 60)
+return tostring(tokens)
+"""
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated_at = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    # Забирает токен и возвращает, сколько секунд нужно подождать перед отправкой
+    def reserve(self):
+        self._refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def pause(self, seconds):
+        self._refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class SharedTokenBucket:
+    # То же ведро в Redis, общее для всех процессов: лимит Telegram действует
+    # на бота, а не на воркер. Время берётся у Redis, чтобы не зависеть от часов
+    # воркеров. Пока Redis недоступен, работает ведро процесса
+    def __init__(self, client, key, rate, capacity=None):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.script = client.register_script(SHARED_BUCKET_SCRIPT)
+        self.local = TokenBucket(rate, capacity)
+
+    def _update(self, cost, pause=0):
+        return float(self.script(keys=[self.key], args=[self.rate, self.capacity, cost, pause]))
+
+    def reserve(self):
+        try:
+            tokens = self._update(1)
+        except redis.RedisError as exc:
+            logger.warning("Общий лимит %s недоступен, действует лимит процесса: %s", self.key, exc)
+            return self.local.reserve()
+        if tokens >= 0:
+            return 0.0
+        return -tokens / self.rate
+
+    def pause(self, seconds):
+        try:
+            self._update(0, seconds)
+        except redis.RedisError as exc:
+            logger.warning("Общий лимит %s недоступен, действует лимит процесса: %s", self.key, exc)
+            self.local.pause(seconds)
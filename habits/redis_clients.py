@@ -0,0 +1,30 @@
+import os
+import threading
+
+import redis
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_redis(url):
+    # Один клиент с пулом соединений на URL в процессе
+    client = _clients.get(url)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(url)
+            if client is None:
+                client = _clients[url] = redis.Redis.from_url(url)
+    return client
+
+
+def _reset_clients():
+    # Соединения пула не переживают fork, поэтому каждый дочерний
+    # процесс (prefork-воркер Celery) открывает свои
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients)
@@ -0,0 +1,98 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+import redis
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .iteration import iter_rows
+from .ledger import claim_deliveries
+from .models import Habit
+from .redis_clients import get_redis
+from .scheduling import advance_reminders, catchup_start, reschedule_missed_reminders
+from .timing_wheel import TimingWheel
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderScheduler:
+    def __init__(self, fire, horizon=None, clock=timezone.now):
+        self.fire = fire
+        self.clock = clock
+        self.horizon = horizon or timedelta(hours=settings.REMINDER_SCHEDULER_HORIZON_HOURS)
+        self.wheel = None
+        self.loaded_until = None
+
+    def load(self):
+        now = self.clock()
+        self.wheel = TimingWheel(start=now)
+        reschedule_missed_reminders(catchup_start(now.replace(second=0, microsecond=0)))
+        self._load_range(None, now + self.horizon)
+        logger.info("В колесо загружено %d напоминаний", len(self.wheel))
+
+    def _load_range(self, start, end):
+        habits = Habit.objects.filter(next_reminder_at__lt=end).order_by()
+        if start is not None:
+            habits = habits.filter(next_reminder_at__gte=start)
+        for habit_id, due in iter_rows(habits, ['id', 'next_reminder_at'], 5000):
+            self.wheel.add(habit_id, due)
+        self.loaded_until = end
+
+    def refresh(self):
+        end = self.clock() + self.horizon
+        if end - self.loaded_until >= self.horizon / 2:
+            self._load_range(self.loaded_until, end)
+
+    def apply_update(self, habit_id):
+        due = Habit.objects.filter(pk=habit_id).values_list('next_reminder_at', flat=True).first()
+        if due is None or due >= self.loaded_until:
+            self.wheel.remove(habit_id)
+        else:
+            self.wheel.add(habit_id, due)
+
+    def claim(self, expired):
+        by_due = defaultdict(list)
+        for habit_id, due in expired:
+            by_due[due].append(habit_id)
+
+        claimed = []
+        for due, habit_ids in by_due.items():
+            with transaction.atomic():
+                # Сравнение с ожидаемым next_reminder_at гарантирует, что каждое
+                # напоминание будет забрано ровно один раз, даже если параллельно
+                # работает beat-тик или другой экземпляр планировщика
+                habits = Habit.objects.select_for_update(skip_locked=True).filter(pk__in=habit_ids, next_reminder_at=due)
+                ids = list(habits.values_list('id', flat=True))
+                if ids:
+                    advance_reminders(Habit.objects.filter(pk__in=ids), due)
+            claimed.extend((habit_id, due) for habit_id in ids)
+
+        # Забранные привычки возвращаются в колесо со следующим временем, а те,
+        # что успели перенести (выполнение, правка), — с актуальным, даже если
+        # уведомление об этом потерялось
+        expired_ids = [habit_id for habit_id, _ in expired]
+        current = Habit.objects.filter(pk__in=expired_ids, next_reminder_at__lt=self.loaded_until)
+        for habit_id, due in current.values_list('id', 'next_reminder_at'):
+            self.wheel.add(habit_id, due)
+        return claimed
+
+    def run_pending(self):
+        expired = self.wheel.advance(self.clock())
+        if not expired:
+            return []
+        delivery_ids = claim_deliveries(self.claim(expired))
+        if delivery_ids:
+            self.fire(delivery_ids)
+        return delivery_ids
+
+
+def publish_reminder_update(habit_id):
+    if settings.REMINDER_SCHEDULER != 'wheel':
+        return
+    try:
+        get_redis(settings.REMINDER_UPDATES_REDIS_URL).publish(settings.REMINDER_UPDATES_CHANNEL, habit_id)
+    except redis.RedisError:
+        # Планировщик всё равно сверится с БД при следующей подгрузке окна
+        logger.exception("Не удалось опубликовать изменение привычки %d", habit_id)
@@ -0,0 +1,74 @@
+from collections import namedtuple
+
+# Правила привычки над обычным словарем значений. related_habit в словаре —
+# id связанной привычки, а признак is_pleasant связанных привычек передаётся
+# отдельно уже загруженным, поэтому проверка сама в БД не ходит.
+# Одни и те же правила применяют модель, сериализатор, админка и импорт.
+Rule = namedtuple('Rule', ['fields', 'message', 'violated'])
+
+HABIT_RULES = (
+    Rule(
+        ('reward', 'related_habit'),
+        'Нельзя одновременно указывать вознаграждение и связанную привычку',
+        lambda habit, related_pleasant: bool(habit['reward'] and habit['related_habit']),
+    ),
+    Rule(
+        ('execution_time',),
+        'Время выполнения не должно превышать 120 секунд',
+        lambda habit, related_pleasant: habit['execution_time'] is not None and habit['execution_time'] > 120,
+    ),
+    Rule(
+        ('related_habit',),
+        'В связанные привычки можно добавлять только приятные привычки',
+        lambda habit, related_pleasant: bool(habit['related_habit']) and not related_pleasant,
+    ),
+    Rule(
+        ('is_pleasant',),
+        'У приятной привычки не может быть вознаграждения или связанной привычки',
+        lambda habit, related_pleasant: bool(habit['is_pleasant'] and (habit['reward'] or habit['related_habit'])),
+    ),
+    Rule(
+        ('periodicity',),
+        'Нельзя выполнять привычку реже, чем 1 раз в 7 дней',
+        lambda habit, related_pleasant: habit['periodicity'] > 7,
+    ),
+)
+
+RULE_DEFAULTS = {
+    'reward': None,
+    'related_habit': None,
+    'execution_time': None,
+    'is_pleasant': False,
+    'periodicity': 1,
+}
+
+
+def habit_values(data, instance=None):
+    # Частичное обновление проверяется вместе с текущими значениями привычки
+    values = dict(RULE_DEFAULTS)
+    if instance is not None:
+        values.update({
+            'reward': instance.reward,
+            'related_habit': instance.related_habit_id,
+            'execution_time': instance.execution_time,
+            'is_pleasant': instance.is_pleasant,
+            'periodicity': instance.periodicity,
+        })
+    for field in RULE_DEFAULTS:
+        if field in data:
+            values[field] = data[field]
+        elif field == 'related_habit' and 'related_habit_id' in data:
+            values[field] = data['related_habit_id']
+    related = values['related_habit']
+    if related is not None and not isinstance(related, int):
+        values['related_habit'] = related.pk
+    return values
+
+
+def check_habit(values, related_pleasant=None):
+    errors = {}
+    for rule in HABIT_RULES:
+        if rule.violated(values, related_pleasant):
+            for field in rule.fields:
+                errors.setdefault(field, []).append(rule.message)
+    return errors
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Habit, HabitLog
+
+REMINDER_WINDOW = timedelta(minutes=1)
+MAX_PERIODICITY = max(value for value, _ in Habit.PERIODICITY_CHOICES)
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    return ZoneInfo(name) if name else dt_timezone.utc
+
+
+def local_occurrence(day, habit_time, zone):
+    # Несуществующее при переходе на летнее время локальное время (02:30)
+    # сдвигается вперёд, неоднозначное при переходе на зимнее берётся первым
+    return datetime.combine(day, habit_time, tzinfo=zone).astimezone(dt_timezone.utc)
+
+
+def next_reminder_at(habit_time, periodicity, now=None, last_completed_at=None, zone=dt_timezone.utc):
+    now = now or timezone.now()
+    window_start = now.replace(second=0, microsecond=0)
+
+    today = now.astimezone(zone).date()
+    due = local_occurrence(today, habit_time, zone)
+    if due < window_start:
+        due = local_occurrence(today + timedelta(days=1), habit_time, zone)
+
+    if last_completed_at is not None:
+        earliest_day = last_completed_at.astimezone(zone).date() + timedelta(days=periodicity)
+        due = max(due, local_occurrence(earliest_day, habit_time, zone))
+
+    return due
+
+
+def recent_completions(logs, now, periodicity=MAX_PERIODICITY):
+    # Выполнение старше периодичности (плюс сутки на разницу часовых поясов) на
+    # следующее напоминание не влияет, а выполнений из будущего API не принимает.
+    # Окно с обеих сторон позволяет PostgreSQL отбросить все партиции, кроме
+    # свежих, включая партицию по умолчанию
+    return logs.filter(completed_at__gte=now - timedelta(days=periodicity + 1), completed_at__lt=now + timedelta(days=1))
+
+
+def zones_with_transition(zone_names, moment):
+    shifted = set()
+    for name in zone_names:
+        zone = get_zone(name)
+        offsets = {(moment + timedelta(days=days)).astimezone(zone).utcoffset() for days in (-1, 0, 1)}
+        if len(offsets) > 1:
+            shifted.add(name)
+    return shifted
+
+
+def advance_reminders(due, moment):
+    # Для часовых поясов без перехода на летнее/зимнее время рядом с moment
+    # то же локальное время завтра наступает ровно через сутки, поэтому
+    # их привычки сдвигаются одним UPDATE без пересчёта по строкам.
+    # Пересчёт в Python нужен только поясам, у которых смещение меняется.
+    zone_names = set(due.values_list('user__timezone', flat=True).distinct())
+    shifted = zones_with_transition(zone_names, moment)
+
+    stable = due.exclude(user__timezone__in=shifted) if shifted else due
+    stable.update(next_reminder_at=F('next_reminder_at') + timedelta(days=1))
+
+    if shifted:
+        habits = list(
+            due.filter(user__timezone__in=shifted)
+            .select_related('user')
+            .only('id', 'time', 'next_reminder_at', 'user__timezone')
+        )
+        for habit in habits:
+            zone = get_zone(habit.user.timezone)
+            next_day = habit.next_reminder_at.astimezone(zone).date() + timedelta(days=1)
+            habit.next_reminder_at = local_occurrence(next_day, habit.time, zone)
+        Habit.objects.bulk_update(habits, ['next_reminder_at'], batch_size=1000)
+
+
+def in_shard(queryset, shard=0, shards=1):
+    # Привычки делятся между сегментами тика по остатку от id
+    if shards <= 1:
+        return queryset
+    return queryset.alias(shard=F('id') % shards).filter(shard=shard)
+
+
+def reschedule_missed_reminders(window_start, shard=0, shards=1):
+    missed = list(
+        in_shard(Habit.objects.filter(next_reminder_at__lt=window_start), shard, shards)
+        .select_related('user')
+        .order_by()
+        .only('id', 'time', 'periodicity', 'next_reminder_at', 'user__timezone')
+    )
+    for habit in missed:
+        habit.next_reminder_at = next_reminder_at(habit.time, habit.periodicity, window_start, zone=get_zone(habit.user.timezone))
+    Habit.objects.bulk_update(missed, ['next_reminder_at'], batch_size=1000)
+    return len(missed)
+
+
+def reschedule_user_habits(user, now=None):
+    now = now or timezone.now()
+    zone = get_zone(user.timezone)
+    last_completed = (
+        recent_completions(HabitLog.objects.filter(habit=OuterRef('pk')), now)
+        .order_by('-completed_at').values('completed_at')[:1]
+    )
+    habits = list(Habit.objects.filter(user=user).annotate(last_completed_at=Subquery(last_completed)))
+    for habit in habits:
+        habit.next_reminder_at = next_reminder_at(habit.time, habit.periodicity, now, habit.last_completed_at, zone)
+    Habit.objects.bulk_update(habits, ['next_reminder_at'])
+    return habits
+
+
+def catchup_start(window_start):
+    return window_start - timedelta(minutes=settings.REMINDER_CATCHUP_MINUTES)
+
+
+def claim_due_habits(now=None, shard=0, shards=1):
+    now = now or timezone.now()
+    window_start = now.replace(second=0, microsecond=0)
+    # Напоминания, пропущенные из-за опоздавшего или пропущенного тика,
+    # доставляются один раз, если они не старше REMINDER_CATCHUP_MINUTES
+    earliest = catchup_start(window_start)
+
+    reschedule_missed_reminders(earliest, shard, shards)
+
+    due = in_shard(Habit.objects.filter(
+        next_reminder_at__gte=earliest,
+        next_reminder_at__lt=window_start + REMINDER_WINDOW,
+    ), shard, shards).order_by()
+    # Возвращаются пары (привычка, время напоминания) для журнала доставки
+    slots = list(due.values_list('id', 'next_reminder_at'))
+
+    # Пока напоминание не выполнено, оно повторяется каждый день в то же время
+    if slots:
+        advance_reminders(due, window_start)
+    return slots
@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import Habit, HabitLog
+from .rules import check_habit, habit_values
 
 
 class HabitSerializer(serializers.ModelSerializer):
@@ -15,24 +17,26 @@ class HabitSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'created_at']
     
     def validate(self, attrs):
-        if attrs.get('reward') and attrs.get('related_habit'):
-            raise serializers.ValidationError({'reward': 'Нельзя одновременно указывать вознаграждение и связанную привычку', 'related_habit': 'Нельзя одновременно указывать вознаграждение и связанную привычку'})
-        
-        if attrs.get('execution_time', 0) > 120:
-            raise serializers.ValidationError({'execution_time': 'Время выполнения не должно превышать 120 секунд'})
-        
-        if attrs.get('related_habit'):
-            related_habit = attrs['related_habit']
-            if not related_habit.is_pleasant:
-                raise serializers.ValidationError({'related_habit': 'В связанные привычки можно добавлять только приятные привычки'})
-        
-        if attrs.get('is_pleasant', False) and (attrs.get('reward') or attrs.get('related_habit')):
-            raise serializers.ValidationError({'is_pleasant': 'У приятной привычки не может быть вознаграждения или связанной привычки'})
-        
-        if attrs.get('periodicity', 1) > 7:
-            raise serializers.ValidationError({'periodicity': 'Нельзя выполнять привычку реже, чем 1 раз в 7 дней'})
-        
+        # Правила проверяются здесь один раз, поэтому сохранение идёт без full_clean
+        if 'related_habit' in attrs:
+            related = attrs['related_habit']
+        else:
+            related = self.instance.related_habit if self.instance is not None and self.instance.related_habit_id else None
+        errors = check_habit(habit_values(attrs, self.instance), related.is_pleasant if related else None)
+        if errors:
+            raise serializers.ValidationError(errors)
         return attrs
+    
+    def create(self, validated_data):
+        habit = Habit(**validated_data)
+        habit.save(clean=False)
+        return habit
+    
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(clean=False)
+        return instance
 
 
 class HabitLogSerializer(serializers.ModelSerializer):
@@ -42,6 +46,34 @@ class HabitLogSerializer(serializers.ModelSerializer):
         read_only_fields = ['completed_at']
 
 
+class BulkCompletionItemSerializer(serializers.Serializer):
+    habit_id = serializers.IntegerField(min_value=1)
+    completed_at = serializers.DateTimeField(required=False)
+    idempotency_key = serializers.CharField(max_length=64, required=False)
+
+
+class BulkCompletionSerializer(serializers.Serializer):
+    # Элементы проверяются по отдельности, чтобы ошибка в одном не отклоняла весь пакет
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=settings.BULK_COMPLETE_MAX_ITEMS)
+
+
+class HabitImportSerializer(serializers.ModelSerializer):
+    # Связанная привычка принимается как id: объекты подгружаются одним
+    # запросом на весь пакет, а не PrimaryKeyRelatedField на каждую строку
+    related_habit = serializers.IntegerField(source='related_habit_id', required=False, allow_null=True)
+    
+    class Meta:
+        model = Habit
+        fields = [
+            'place', 'time', 'action', 'is_pleasant', 'related_habit',
+            'periodicity', 'reward', 'execution_time', 'is_public'
+        ]
+
+
+class BulkImportSerializer(serializers.Serializer):
+    items = serializers.ListField(child=serializers.DictField(), allow_empty=False, max_length=settings.HABIT_IMPORT_MAX_ITEMS)
+
+
 class PublicHabitSerializer(serializers.ModelSerializer):
     user = serializers.ReadOnlyField(source='user.username')
     
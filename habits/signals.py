@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .cache import invalidate_public_feed
+from .models import Habit
+from .reminder_scheduler import publish_reminder_update
+from .scheduling import reschedule_user_habits
+
+reminder_rescheduled = Signal()
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def habit_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publish_reminder_update(instance.pk))
+
+
+@receiver(post_save, sender=Habit)
+@receiver(post_delete, sender=Habit)
+def public_habit_changed(sender, instance, **kwargs):
+    if instance.is_public or instance.was_public:
+        invalidate_public_feed()
+
+
+@receiver(reminder_rescheduled)
+def habit_rescheduled(sender, habit_id, **kwargs):
+    transaction.on_commit(lambda: publish_reminder_update(habit_id))
+
+
+@receiver(post_save, sender=get_user_model())
+def user_timezone_changed(sender, instance, created, **kwargs):
+    if created or not instance.timezone_changed():
+        return
+    for habit in reschedule_user_habits(instance):
+        reminder_rescheduled.send(sender=Habit, habit_id=habit.pk)
+    instance._loaded_timezone = instance.timezone
@@ -0,0 +1,105 @@
+import math
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import HabitStats
+
+MASK_DAYS = 365
+FULL_MASK = (1 << MASK_DAYS) - 1
+RATE_WINDOWS = (7, 30, 365)
+STATS_FIELDS = ['last_completed_on', 'current_streak', 'longest_streak', 'total_completions', 'days_mask']
+
+
+def load_mask(stats):
+    return int.from_bytes(bytes(stats.days_mask), 'big')
+
+
+def dump_mask(mask):
+    return mask.to_bytes((MASK_DAYS + 7) // 8, 'big')
+
+
+def streak_from_mask(mask, periodicity):
+    # Серия прерывается, если между выполнениями прошло больше periodicity дней
+    streak = gap = 0
+    for offset in range(MASK_DAYS):
+        if mask >> offset & 1:
+            streak += 1
+            gap = 0
+        else:
+            gap += 1
+            if gap >= periodicity:
+                break
+    return streak
+
+
+def record_day(stats, day, periodicity):
+    stats.total_completions += 1
+    mask = load_mask(stats)
+    last = stats.last_completed_on
+
+    if last is None:
+        mask = 1
+        stats.current_streak = 1
+        stats.last_completed_on = day
+    elif day > last:
+        gap = (day - last).days
+        mask = (mask << gap | 1) & FULL_MASK
+        stats.current_streak = stats.current_streak + 1 if gap <= periodicity else 1
+        stats.last_completed_on = day
+    elif day < last:
+        offset = (last - day).days
+        if offset < MASK_DAYS and not mask >> offset & 1:
+            mask |= 1 << offset
+            # Выполнение, синхронизированное с опозданием, может закрыть пропуск
+            # в текущей серии; добавление дня серию только удлиняет
+            stats.current_streak = max(stats.current_streak, streak_from_mask(mask, periodicity))
+
+    stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+    stats.days_mask = dump_mask(mask)
+
+
+def record_completions(logs, periodicities, zone):
+    habit_ids = {log.habit_id for log in logs}
+    if not habit_ids:
+        return
+    with transaction.atomic():
+        HabitStats.objects.bulk_create([HabitStats(habit_id=habit_id) for habit_id in habit_ids], ignore_conflicts=True)
+        rows = HabitStats.objects.select_for_update().filter(habit_id__in=habit_ids).in_bulk()
+        for log in sorted(logs, key=lambda log: log.completed_at):
+            record_day(rows[log.habit_id], timezone.localdate(log.completed_at, zone), periodicities[log.habit_id])
+        HabitStats.objects.bulk_update(rows.values(), STATS_FIELDS)
+
+
+def completion_rate(mask, last, today, started_on, periodicity, days):
+    if last is None:
+        return 0.0
+    active = max(1, min(days, (today - started_on).days + 1))
+    expected = math.ceil(active / periodicity)
+    shift = max(0, (today - last).days)
+    done = bin(mask & ((1 << max(0, days - shift)) - 1)).count('1')
+    return round(min(1.0, done / expected), 3)
+
+
+def habit_stats(habit, stats, zone, today=None):
+    today = today or timezone.localdate(timezone.now(), zone)
+    stats = stats or HabitStats(habit=habit)
+    mask = load_mask(stats)
+    last = stats.last_completed_on
+    started_on = timezone.localdate(habit.created_at, zone)
+
+    current_streak = stats.current_streak
+    if last is None or (today - last).days > habit.periodicity:
+        current_streak = 0
+
+    return {
+        'habit_id': habit.pk,
+        'current_streak': current_streak,
+        'longest_streak': stats.longest_streak,
+        'total_completions': stats.total_completions,
+        'last_completed_on': last,
+        'completion_rate': {
+            str(days): completion_rate(mask, last, today, started_on, habit.periodicity, days)
+            for days in RATE_WINDOWS
+        },
+    }
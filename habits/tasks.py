@@ -1,60 +1,185 @@
 import logging
-import os
+import time
+from collections import defaultdict
+from datetime import datetime
 
-import telegram
-from celery import shared_task
+from celery import chord, shared_task
+from django.conf import settings
 from django.utils import timezone
+from telegram.error import TelegramError
 
-from .models import Habit
+from .analytics import build_adherence_report
+from .delivery import ReminderDispatcher, build_reminder_message, group_reminders, telegram_global_bucket
+from .ledger import claim_deliveries, finish_deliveries, prune_deliveries, recover_deliveries, start_deliveries
+from .models import Habit, ReminderDelivery
+from .partitions import apply_retention, ensure_partitions
+from .profiling import profiled_task
+from .scheduling import claim_due_habits
+from .telegram_sender import get_sender
 
 logger = logging.getLogger(__name__)
 
-bot = telegram.Bot(token=os.getenv("TELEGRAM_BOT_TOKEN"))
 
+@shared_task(bind=True, max_retries=settings.REMINDER_DELIVERY_MAX_RETRIES)
+def send_reminder(self, delivery_id):
+    deliveries = start_deliveries([delivery_id])
+    if not deliveries:
+        logger.info("Доставка %d уже обработана", delivery_id)
+        return
 
-@shared_task
-def send_telegram_reminder(habit_id):
-    qs = Habit.objects.select_related("user", "related_habit")
-    habit = qs.get(pk=habit_id)
-
+    delivery = deliveries[0]
+    habit = delivery.habit
     if not habit.user.telegram_chat_id:
         logger.info("Пользователь %d не настроил Telegram", habit.user_id)
+        finish_deliveries(deliveries, ReminderDelivery.SKIPPED)
         return
 
-    message = "🔔 Напоминание о привычке!\n\n"
-    message += f"Время выполнить: {habit.action}\n"
-    message += f"Место: {habit.place}\n"
-    message += f"Время: {habit.time}\n"
-    message += f"Время на выполнение: {habit.execution_time} секунд\n"
+    try:
+        get_sender().send_message(chat_id=habit.user.telegram_chat_id, text=build_reminder_message(habit))
+    except TelegramError as exc:
+        finish_deliveries(deliveries, ReminderDelivery.FAILED)
+        countdown = getattr(exc, "retry_after", None) or settings.REMINDER_DELIVERY_RETRY_DELAY
+        logger.warning("Не удалось отправить напоминание для привычки %d: %s", habit.id, exc)
+        raise self.retry(exc=exc, countdown=countdown)
+    except Exception:
+        # Без повтора Celery: доставку подберёт recover_reminder_deliveries
+        finish_deliveries(deliveries, ReminderDelivery.FAILED)
+        raise
+    finish_deliveries(deliveries, ReminderDelivery.SENT)
+    logger.info("Напоминание отправлено для привычки %d", habit.id)
 
-    if habit.reward:
-        message += f"Вознаграждение: {habit.reward}\n"
-    elif habit.related_habit:
-        message += f"Связанная привычка: {habit.related_habit.action}\n"
 
-    bot.send_message(chat_id=habit.user.telegram_chat_id, text=message)
-    logger.info("Напоминание отправлено для привычки %d", habit.id)
+@shared_task(bind=True, max_retries=settings.REMINDER_DELIVERY_MAX_RETRIES)
+def send_reminder_batch(self, delivery_ids):
+    deliveries = start_deliveries(delivery_ids)
+    dispatcher = ReminderDispatcher(get_sender(), global_bucket=telegram_global_bucket())
+    try:
+        sent = dispatcher.deliver(group_reminders(delivery.habit for delivery in deliveries))
+    except Exception:
+        # Часть сообщений могла уйти, но какая — неизвестно: пачку целиком
+        # повторит recover_reminder_deliveries
+        finish_deliveries(deliveries, ReminderDelivery.FAILED)
+        raise
+
+    outcome = defaultdict(list)
+    for delivery in deliveries:
+        chat_id = delivery.habit.user.telegram_chat_id
+        if not chat_id:
+            outcome[ReminderDelivery.SKIPPED].append(delivery)
+        elif chat_id in dispatcher.failed_chats:
+            outcome[ReminderDelivery.FAILED].append(delivery)
+        else:
+            outcome[ReminderDelivery.SENT].append(delivery)
+    for status, status_deliveries in outcome.items():
+        finish_deliveries(status_deliveries, status)
+    logger.info("Отправлено %d сообщений для %d напоминаний", sent, len(deliveries))
+
+    failed = [delivery.pk for delivery in outcome[ReminderDelivery.FAILED]]
+    if failed:
+        raise self.retry(args=[failed], countdown=settings.REMINDER_DELIVERY_RETRY_DELAY)
+
+
+@shared_task
+def send_telegram_reminder(habit_id):
+    # Задачи под прежним именем, оставшиеся в брокере после обновления. Напоминание
+    # проходит через журнал доставки со слотом прежнего тика (время привычки
+    # сегодня), поэтому повторная доставка задачи его не продублирует
+    habit_time = Habit.objects.filter(pk=habit_id).values_list("time", flat=True).first()
+    if habit_time is None:
+        return
+    slot = timezone.make_aware(datetime.combine(timezone.localdate(), habit_time))
+    dispatch_reminders(claim_deliveries([(habit_id, slot)]))
+
+
+def dispatch_reminders(delivery_ids):
+    if settings.REMINDER_DISPATCH_MODE == "batch":
+        size = settings.REMINDER_BATCH_SIZE
+        for start in range(0, len(delivery_ids), size):
+            send_reminder_batch.delay(delivery_ids[start:start + size])
+    else:
+        for delivery_id in delivery_ids:
+            send_reminder.delay(delivery_id)
+
+
+def scan_shard(shard, shards, now=None):
+    started = time.perf_counter()
+    slots = claim_due_habits(now, shard, shards)
+    # Пересекающиеся тики получают одни и те же слоты, но журнал отдаёт каждый только одному
+    delivery_ids = claim_deliveries(slots)
+    dispatch_reminders(delivery_ids)
+    return {
+        "shard": shard,
+        "habits": len(slots),
+        "deliveries": len(delivery_ids),
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+    }
 
 
 @shared_task
+@profiled_task
 def check_and_send_reminders():
+    if settings.REMINDER_SCHEDULER == "wheel":
+        logger.info("Напоминания отправляет run_reminder_scheduler, тик пропущен")
+        return
+
+    shards = settings.REMINDER_SCAN_SHARDS
+    if shards <= 1:
+        result = scan_shard(0, 1)
+        logger.info("Проверено %d привычек, к отправке %d напоминаний", result["habits"], result["deliveries"])
+        return
+
+    # Сегменты выполняются параллельно на разных воркерах с общим моментом тика,
+    # итог собирает обратный вызов аккорда
     now = timezone.now()
-    current_time = now.time()
+    header = [scan_reminder_shard.s(shard, shards, now.isoformat()) for shard in range(shards)]
+    chord(header)(collect_reminder_scan.s(now.isoformat()))
+
+
+@shared_task
+@profiled_task
+def scan_reminder_shard(shard, shards, now):
+    return scan_shard(shard, shards, datetime.fromisoformat(now))
 
-    habits = Habit.objects.filter(
-        time__hour=current_time.hour, time__minute=current_time.minute
+
+@shared_task
+def collect_reminder_scan(results, started):
+    wall_ms = int((timezone.now() - datetime.fromisoformat(started)).total_seconds() * 1000)
+    summary = {
+        "shards": len(results),
+        "habits": sum(result["habits"] for result in results),
+        "deliveries": sum(result["deliveries"] for result in results),
+        "slowest_shard_ms": max(result["duration_ms"] for result in results),
+        "wall_ms": wall_ms,
+    }
+    logger.info(
+        "Тик из %d сегментов: проверено %d привычек, к отправке %d напоминаний, самый долгий сегмент %d мс, всего %d мс",
+        summary["shards"], summary["habits"], summary["deliveries"], summary["slowest_shard_ms"], wall_ms,
     )
+    return summary
 
-    for habit in habits:
-        last_log = habit.habitlog_set.order_by("-completed_at").first()
 
-        if not last_log:
-            send_telegram_reminder.delay(habit.id)
-            continue
+@shared_task
+def maintain_habitlog_partitions():
+    created = ensure_partitions()
+    expired = apply_retention()
+    logger.info("Партиции логов: %d на будущие месяцы, %d вышли за срок хранения", len(created), len(expired))
 
-        days_since_last = (now.date() - last_log.completed_at.date()).days
 
-        if days_since_last >= habit.periodicity:
-            send_telegram_reminder.delay(habit.id)
+@shared_task
+def build_adherence_report_task():
+    report = build_adherence_report()
+    logger.info("Отчёт о соблюдении привычек %d: %d привычек, %d логов за %d мс", report.pk, report.habits, report.logs, report.duration_ms)
+
+
+@shared_task
+def recover_reminder_deliveries():
+    delivery_ids = recover_deliveries()
+    if delivery_ids:
+        logger.warning("Повторная отправка %d зависших доставок напоминаний", len(delivery_ids))
+    dispatch_reminders(delivery_ids)
+
 
-    logger.info("Проверено %d привычек", habits.count())
+@shared_task
+def prune_reminder_deliveries():
+    deleted = prune_deliveries()
+    logger.info("Удалено %d записей журнала доставки напоминаний", deleted)
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from .metrics import TELEGRAM_ERRORS, TELEGRAM_LATENCY
+
+logger = logging.getLogger(__name__)
+
+_sender = None
+_sender_lock = threading.Lock()
+
+
+class TelegramSender:
+    def __init__(self, token, base_url=None, concurrency=None, timeout=30):
+        self.concurrency = concurrency or settings.TELEGRAM_SEND_CONCURRENCY
+        self.timeout = timeout
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="telegram-sender", daemon=True)
+        self.thread.start()
+
+        request = HTTPXRequest(connection_pool_size=self.concurrency)
+        bot_kwargs = {"base_url": base_url} if base_url else {}
+        self.bot = Bot(token=token, request=request, **bot_kwargs)
+        self.semaphore = self._run(self._create_semaphore(), self.timeout)
+
+    async def _create_semaphore(self):
+        return asyncio.Semaphore(self.concurrency)
+
+    def _run(self, coroutine, timeout=None):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout)
+
+    async def _send(self, chat_id, text, delay=0):
+        if delay:
+            await asyncio.sleep(delay)
+        async with self.semaphore:
+            started = time.perf_counter()
+            try:
+                return await self.bot.send_message(chat_id=chat_id, text=text)
+            except Exception as exc:
+                TELEGRAM_ERRORS.labels(type(exc).__name__).inc()
+                raise
+            finally:
+                TELEGRAM_LATENCY.observe(time.perf_counter() - started)
+
+    async def _send_many(self, messages):
+        return await asyncio.gather(
+            *(self._send(chat_id, text, delay) for delay, chat_id, text in messages),
+            return_exceptions=True,
+        )
+
+    def send_message(self, chat_id, text):
+        return self._run(self._send(chat_id, text), self.timeout)
+
+    # messages: список (delay, chat_id, text); в ответ None для доставленных и исключение для остальных
+    def send_many(self, messages):
+        if not messages:
+            return []
+        # Время отдельных запросов ограничивают таймауты HTTPXRequest
+        results = self._run(self._send_many(messages))
+        return [result if isinstance(result, BaseException) else None for result in results]
+
+    def close(self):
+        if self.loop.is_running():
+            self._run(self.bot.shutdown(), self.timeout)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(self.timeout)
+
+
+def get_sender():
+    global _sender
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                _sender = TelegramSender(
+                    token=settings.TELEGRAM_BOT_TOKEN,
+                    base_url=settings.TELEGRAM_API_URL or None,
+                )
+    return _sender
+
+
+def _reset_sender():
+    # Цикл событий и пул соединений не переживают fork, поэтому
+    # каждый дочерний процесс (prefork-воркер Celery) создаёт свой
+    global _sender, _sender_lock
+    _sender = None
+    _sender_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_sender)
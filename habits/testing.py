@@ -0,0 +1,31 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def without_server_side_cursors():
+    # Как при DB_POOL_MODE=pgbouncer: iterator() не может читать серверным курсором
+    return mock.patch.dict(connection.settings_dict, {'DISABLE_SERVER_SIDE_CURSORS': True})
+
+
+class QueryCountAssertionsMixin:
+    # Проверяет, что число SQL-запросов эндпоинта фиксировано и не растёт
+    # вместе с количеством строк на странице
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries)
+
+    def assertConstantQueries(self, url, expected, grow, sizes=(1, 5, 20)):
+        counts = []
+        created = 0
+        for size in sizes:
+            grow(size - created)
+            created = size
+            separator = '&' if '?' in url else '?'
+            counts.append(self.count_queries(f'{url}{separator}page_size={size}'))
+        self.assertEqual(counts, [expected] * len(sizes), f'{url}: {counts}')
@@ -1,11 +1,62 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time as time_module
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from io import StringIO
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
+from urllib.parse import parse_qsl
+
+import numpy as np
+import redis
+from prometheus_client import REGISTRY
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.signals import request_finished, request_started
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
+from django.core.exceptions import MiddlewareNotUsed, ValidationError
+from django.db import close_old_connections, connection
 from django.utils import timezone
-from rest_framework.test import APITestCase
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
 from rest_framework import status
-from .models import Habit, HabitLog
+from telegram.error import NetworkError, RetryAfter
+from users.authentication import issue_token
+from .analytics import analyse, build_adherence_report
+from .async_views import async_view
+from .cache import feed_cache_stats
+from .completion import complete_habits
+from .delivery import ReminderDispatcher, combine_reminders
+from .export import stream_export
+from .ledger import claim_deliveries, delivery_stats, recover_deliveries, start_deliveries
+from .metrics import task_finished, task_started
+from .middleware import ProfilingMiddleware
+from .models import Habit, HabitCompletionKey, HabitLog, HabitLogRollup, HabitStats, ReminderDelivery
+from .partitions import apply_retention, create_partition, ensure_partitions, is_partitioned, list_partitions, month_start, partition_name
+from .profiling import load_profiles, save_profile
+from .ratelimit import SharedTokenBucket, TokenBucket
+from .rules import check_habit, habit_values
+from .reminder_scheduler import ReminderScheduler, publish_reminder_update
+from .telegram_sender import TelegramSender
+from .testing import QueryCountAssertionsMixin, without_server_side_cursors
+from .throttling import ExportRateThrottle
+from . import redis_clients, tasks
+from .tasks import send_reminder, send_reminder_batch
+from .timing_wheel import TimingWheel
+from .views import HabitViewSet, PublicHabitViewSet
+from .scheduling import claim_due_habits, get_zone, next_reminder_at, reschedule_user_habits
 from .serializers import HabitSerializer
+from .signals import reminder_rescheduled
 
 User = get_user_model()
 
@@ -231,6 +282,9 @@ class HabitAPITest(APITestCase):
         response = self.client.post(f'/api/habits/{self.habit.id}/complete/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(HabitLog.objects.count(), 1)
+        
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.next_reminder_at.date(), timezone.now().date() + timedelta(days=1))
     
     def test_public_habits_list(self):
         self.habit.is_public = True
@@ -238,4 +292,1400 @@ class HabitAPITest(APITestCase):
         
         response = self.client.get('/api/public-habits/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data['results']), 1) 
\ No newline at end of file
+        self.assertEqual(len(response.data['results']), 1) 
+
+
+class ReminderScheduleTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='testuser',
+            password='testpass123'
+        )
+        self.now = datetime(2025, 6, 23, 8, 30, tzinfo=dt_timezone.utc)
+    
+    def test_next_reminder_without_logs(self):
+        self.assertEqual(next_reminder_at(time(9, 0), 1, self.now), datetime(2025, 6, 23, 9, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(next_reminder_at(time(8, 0), 1, self.now), datetime(2025, 6, 24, 8, 0, tzinfo=dt_timezone.utc))
+    
+    def test_next_reminder_respects_periodicity(self):
+        due = next_reminder_at(time(9, 0), 3, self.now, last_completed_at=self.now)
+        self.assertEqual(due, datetime(2025, 6, 26, 9, 0, tzinfo=dt_timezone.utc))
+    
+    def test_habit_creation_sets_next_reminder(self):
+        habit = Habit.objects.create(
+            user=self.user,
+            place='Дом',
+            time='09:00:00',
+            action='Делать зарядку',
+            execution_time=60
+        )
+        self.assertIsNotNone(habit.next_reminder_at)
+        self.assertEqual(habit.next_reminder_at.time(), time(9, 0))
+    
+    def test_claim_due_habits(self):
+        due = Habit.objects.create(user=self.user, place='Дом', time='08:30:00', action='Зарядка', execution_time=60)
+        later = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Вода', execution_time=30)
+        Habit.objects.filter(pk=due.pk).update(next_reminder_at=self.now)
+        Habit.objects.filter(pk=later.pk).update(next_reminder_at=self.now + timedelta(minutes=30))
+        
+        with self.assertNumQueries(4):
+            self.assertEqual(claim_due_habits(self.now + timedelta(seconds=10)), [(due.pk, self.now)])
+        
+        due.refresh_from_db()
+        self.assertEqual(due.next_reminder_at, self.now + timedelta(days=1))
+        self.assertEqual(claim_due_habits(self.now + timedelta(seconds=20)), [])
+    
+    def test_missed_reminder_is_rolled_forward(self):
+        habit = Habit.objects.create(user=self.user, place='Дом', time='06:00:00', action='Зарядка', execution_time=60)
+        Habit.objects.filter(pk=habit.pk).update(next_reminder_at=self.now - timedelta(days=2, hours=2, minutes=30))
+        
+        self.assertEqual(claim_due_habits(self.now), [])
+        
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at, datetime(2025, 6, 24, 6, 0, tzinfo=dt_timezone.utc))
+    
+    def test_late_tick_catches_up_once(self):
+        habit = Habit.objects.create(user=self.user, place='Дом', time='08:00:00', action='Зарядка', execution_time=60)
+        Habit.objects.filter(pk=habit.pk).update(next_reminder_at=self.now - timedelta(minutes=30))
+        
+        self.assertEqual(claim_due_habits(self.now), [(habit.pk, self.now - timedelta(minutes=30))])
+        self.assertEqual(claim_due_habits(self.now + timedelta(minutes=1)), [])
+
+
+class TimezoneScheduleTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123', timezone='Europe/Berlin')
+    
+    def test_reminder_uses_local_time(self):
+        now = datetime(2025, 6, 23, 5, 0, tzinfo=dt_timezone.utc)
+        due = next_reminder_at(time(9, 0), 1, now, zone=get_zone('Europe/Moscow'))
+        self.assertEqual(due, datetime(2025, 6, 23, 6, 0, tzinfo=dt_timezone.utc))
+    
+    def test_periodicity_counts_local_days(self):
+        completed_at = datetime(2025, 6, 22, 22, 30, tzinfo=dt_timezone.utc)
+        due = next_reminder_at(time(9, 0), 1, completed_at, completed_at, zone=get_zone('Europe/Moscow'))
+        self.assertEqual(due, datetime(2025, 6, 24, 6, 0, tzinfo=dt_timezone.utc))
+    
+    def test_tick_advances_across_dst_transition(self):
+        habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60)
+        utc_user = User.objects.create_user(username='utc', password='testpass123')
+        utc_habit = Habit.objects.create(user=utc_user, place='Дом', time='08:00:00', action='Вода', execution_time=30)
+        due = datetime(2025, 3, 29, 8, 0, tzinfo=dt_timezone.utc)
+        Habit.objects.filter(pk__in=[habit.pk, utc_habit.pk]).update(next_reminder_at=due)
+        
+        self.assertEqual(sorted(claim_due_habits(due)), sorted([(habit.pk, due), (utc_habit.pk, due)]))
+        
+        habit.refresh_from_db()
+        utc_habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at, datetime(2025, 3, 30, 7, 0, tzinfo=dt_timezone.utc))
+        self.assertEqual(utc_habit.next_reminder_at, datetime(2025, 3, 30, 8, 0, tzinfo=dt_timezone.utc))
+    
+    def test_recent_completion_delays_reminder(self):
+        habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60, periodicity=7)
+        now = timezone.now()
+        HabitLog.objects.create(habit=habit, completed_at=now - timedelta(days=2))
+        
+        reschedule_user_habits(self.user, now)
+        habit.refresh_from_db()
+        self.assertGreater(habit.next_reminder_at, now + timedelta(days=4))
+        habit.time = time(10, 0)
+        habit.save()
+        self.assertGreater(habit.next_reminder_at, now + timedelta(days=4))
+    
+    def test_nonexistent_local_time_fires_once(self):
+        now = datetime(2025, 3, 29, 12, 0, tzinfo=dt_timezone.utc)
+        due = next_reminder_at(time(2, 30), 1, now, zone=get_zone('Europe/Berlin'))
+        self.assertEqual(due, datetime(2025, 3, 30, 1, 30, tzinfo=dt_timezone.utc))
+    
+    def test_timezone_change_reschedules_habits(self):
+        habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60)
+        self.assertEqual(habit.next_reminder_at.astimezone(get_zone('Europe/Berlin')).time(), time(9, 0))
+        
+        user = User.objects.get(pk=self.user.pk)
+        user.timezone = 'Asia/Tokyo'
+        user.save()
+        
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at.astimezone(get_zone('Asia/Tokyo')).time(), time(9, 0))
+    
+    def test_invalid_timezone(self):
+        self.user.timezone = 'Mars/Olympus'
+        with self.assertRaises(ValidationError):
+            self.user.full_clean()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeBot:
+    def __init__(self, clock, flood_chats=()):
+        self.clock = clock
+        self.flood_chats = set(flood_chats)
+        self.sent = []
+    
+    def send_message(self, chat_id, text):
+        if chat_id in self.flood_chats:
+            self.flood_chats.discard(chat_id)
+            raise RetryAfter(5)
+        self.sent.append((self.clock(), chat_id, text))
+
+
+class FakeSender(FakeBot):
+    def send_many(self, messages):
+        results = []
+        for delay, chat_id, text in messages:
+            try:
+                self.send_message(chat_id, text)
+                results.append(None)
+            except RetryAfter as exc:
+                results.append(exc)
+        return results
+
+
+class ReminderDeliveryTest(TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.user = User.objects.create_user(username='testuser', password='testpass123', telegram_chat_id='100')
+        self.other = User.objects.create_user(username='other', password='testpass123', telegram_chat_id='200')
+        self.silent = User.objects.create_user(username='silent', password='testpass123')
+        self.habits = [
+            Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60),
+            Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Вода', execution_time=30),
+            Habit.objects.create(user=self.other, place='Офис', time='09:00:00', action='Прогулка', execution_time=120),
+            Habit.objects.create(user=self.silent, place='Дом', time='09:00:00', action='Чтение', execution_time=60),
+        ]
+    
+    def dispatcher(self, bot, **kwargs):
+        return ReminderDispatcher(bot, clock=self.clock, sleep=self.clock.sleep, **kwargs)
+    
+    def send_batch(self, bot, queries=None):
+        delivery_ids = claim_deliveries([(habit.pk, timezone.now()) for habit in self.habits])
+        with mock.patch('habits.tasks.get_sender', return_value=bot), override_settings(TELEGRAM_RATE_REDIS_URL=''):
+            if queries is None:
+                send_reminder_batch(delivery_ids)
+            else:
+                with self.assertNumQueries(queries):
+                    send_reminder_batch(delivery_ids)
+        return dict(ReminderDelivery.objects.values_list('habit_id', 'status'))
+    
+    def test_batch_groups_reminders_per_chat(self):
+        bot = FakeBot(self.clock)
+        # Число запросов не зависит от размера пачки
+        statuses = self.send_batch(bot, queries=4)
+        
+        self.assertEqual(len(bot.sent), 2)
+        self.assertEqual(statuses[self.habits[3].pk], ReminderDelivery.SKIPPED)
+        texts = {chat_id: text for _, chat_id, text in bot.sent}
+        self.assertIn('Зарядка', texts['100'])
+        self.assertIn('Вода', texts['100'])
+        self.assertIn('Прогулка', texts['200'])
+    
+    def test_global_rate_is_respected(self):
+        bot = FakeBot(self.clock)
+        dispatcher = self.dispatcher(bot, global_rate=2)
+        for chat_id in range(6):
+            dispatcher.send(chat_id, 'text')
+        
+        self.assertEqual([sent_at for sent_at, _, _ in bot.sent], [0, 0, 0.5, 1.0, 1.5, 2.0])
+    
+    def test_per_chat_rate_is_respected(self):
+        bot = FakeBot(self.clock)
+        dispatcher = self.dispatcher(bot, chat_rate=1)
+        dispatcher.send('100', 'first')
+        dispatcher.send('100', 'second')
+        
+        self.assertEqual(bot.sent[1][0] - bot.sent[0][0], 1.0)
+    
+    def test_retry_after_is_honoured(self):
+        bot = FakeBot(self.clock, flood_chats=['100'])
+        self.assertTrue(self.dispatcher(bot).send('100', 'text'))
+        self.assertGreaterEqual(bot.sent[0][0], 5)
+    
+    def test_concurrent_delivery_retries_flood_errors(self):
+        sender = FakeSender(self.clock, flood_chats=['200'])
+        statuses = self.send_batch(sender)
+        
+        self.assertEqual(sorted(chat_id for _, chat_id, _ in sender.sent), ['100', '200'])
+        self.assertEqual([statuses[habit.pk] for habit in self.habits[:3]], [ReminderDelivery.SENT] * 3)
+    
+    def test_long_batches_are_split(self):
+        messages = combine_reminders(['x' * 1000] * 10)
+        self.assertGreater(len(messages), 1)
+        self.assertTrue(all(len(message) <= 4096 for message in messages))
+    
+    def test_token_bucket_pause(self):
+        bucket = TokenBucket(10, clock=self.clock)
+        bucket.pause(2)
+        self.assertAlmostEqual(bucket.reserve(), 2.1)
+    
+    def test_shared_bucket_waits_for_redis_tokens(self):
+        client = mock.Mock()
+        client.register_script.return_value = script = mock.Mock(return_value='-2.5')
+        bucket = SharedTokenBucket(client, 'rate', 10)
+        self.assertAlmostEqual(bucket.reserve(), 0.25)
+        script.assert_called_once_with(keys=['rate'], args=[10, 10, 1, 0])
+    
+    def test_shared_bucket_falls_back_to_process(self):
+        client = mock.Mock()
+        client.register_script.return_value = mock.Mock(side_effect=redis.ConnectionError('down'))
+        bucket = SharedTokenBucket(client, 'rate', 10)
+        self.assertEqual([bucket.reserve() for _ in range(10)], [0.0] * 10)
+        self.assertGreater(bucket.reserve(), 0)
+
+
+class TelegramStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    received = []
+    
+    def do_POST(self):
+        body = dict(parse_qsl(self.rfile.read(int(self.headers['Content-Length'])).decode()))
+        self.received.append(body)
+        response = json.dumps({
+            'ok': True,
+            'result': {'message_id': 1, 'date': 0, 'chat': {'id': int(body['chat_id']), 'type': 'private'}, 'text': body['text']},
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+    
+    def log_message(self, *args):
+        pass
+
+
+class TelegramSenderTest(TestCase):
+    def setUp(self):
+        TelegramStubHandler.received = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), TelegramStubHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{self.server.server_address[1]}/bot'
+        self.sender = TelegramSender('123:stub', base_url=base_url, concurrency=4)
+    
+    def tearDown(self):
+        self.sender.close()
+        self.server.shutdown()
+        self.server.server_close()
+    
+    def test_send_message(self):
+        message = self.sender.send_message(chat_id=100, text='Привет')
+        self.assertEqual(message.text, 'Привет')
+    
+    def test_send_many(self):
+        results = self.sender.send_many([(0, chat_id, 'Напоминание') for chat_id in range(10)])
+        self.assertEqual(results, [None] * 10)
+        self.assertEqual(len(TelegramStubHandler.received), 10)
+
+
+class TimingWheelTest(TestCase):
+    def test_entries_expire_in_order(self):
+        wheel = TimingWheel(start=0)
+        wheel.add('hour', 3600)
+        wheel.add('minute', 60)
+        wheel.add('day', 86400)
+        wheel.add('week', 7 * 86400)
+        
+        self.assertEqual(wheel.advance(59), [])
+        self.assertEqual(wheel.advance(60), [('minute', 60)])
+        self.assertEqual(wheel.advance(3599), [])
+        self.assertEqual(wheel.advance(86400), [('hour', 3600), ('day', 86400)])
+        self.assertEqual(wheel.advance(7 * 86400), [('week', 7 * 86400)])
+        self.assertEqual(len(wheel), 0)
+    
+    def test_reschedule_and_remove(self):
+        wheel = TimingWheel(start=0)
+        wheel.add(1, 10)
+        wheel.add(2, 20)
+        wheel.add(1, 30)
+        wheel.remove(2)
+        
+        self.assertEqual(wheel.advance(25), [])
+        self.assertEqual(wheel.advance(30), [(1, 30)])
+    
+    def test_past_entries_expire_immediately(self):
+        wheel = TimingWheel(start=100)
+        wheel.add(1, 50)
+        self.assertEqual(wheel.advance(100), [(1, 50)])
+
+
+class ReminderSchedulerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.now = datetime(2025, 6, 23, 8, 0, 30, tzinfo=dt_timezone.utc)
+        self.fired = []
+    
+    def clock(self):
+        return self.now
+    
+    def habit(self, due):
+        habit = Habit.objects.create(user=self.user, place='Дом', time=due.time(), action='Зарядка', execution_time=60)
+        Habit.objects.filter(pk=habit.pk).update(next_reminder_at=due)
+        return habit
+    
+    def fired_habits(self, delivery_ids):
+        return list(ReminderDelivery.objects.filter(pk__in=delivery_ids).values_list('habit_id', flat=True))
+    
+    def scheduler(self):
+        scheduler = ReminderScheduler(fire=self.fired.extend, horizon=timedelta(hours=6), clock=self.clock)
+        scheduler.load()
+        return scheduler
+    
+    def test_fires_when_due(self):
+        habit = self.habit(datetime(2025, 6, 23, 8, 5, tzinfo=dt_timezone.utc))
+        scheduler = self.scheduler()
+        
+        self.now = datetime(2025, 6, 23, 8, 4, 59, tzinfo=dt_timezone.utc)
+        self.assertEqual(scheduler.run_pending(), [])
+        self.now = datetime(2025, 6, 23, 8, 5, tzinfo=dt_timezone.utc)
+        self.assertEqual(self.fired_habits(scheduler.run_pending()), [habit.pk])
+        
+        habit.refresh_from_db()
+        self.assertEqual(habit.next_reminder_at, datetime(2025, 6, 24, 8, 5, tzinfo=dt_timezone.utc))
+    
+    def test_missed_reminders_are_caught_up_once_after_restart(self):
+        habit = self.habit(datetime(2025, 6, 23, 7, 40, tzinfo=dt_timezone.utc))
+        
+        fired = self.scheduler().run_pending()
+        self.assertEqual(self.scheduler().run_pending(), [])
+        self.assertEqual(self.fired, fired)
+        self.assertEqual(list(ReminderDelivery.objects.values_list('id', 'habit_id')), [(fired[0], habit.pk)])
+    
+    def test_incremental_updates(self):
+        habit = self.habit(datetime(2025, 6, 23, 9, 0, tzinfo=dt_timezone.utc))
+        scheduler = self.scheduler()
+        
+        Habit.objects.filter(pk=habit.pk).update(next_reminder_at=datetime(2025, 6, 23, 8, 10, tzinfo=dt_timezone.utc))
+        scheduler.apply_update(habit.pk)
+        created = self.habit(datetime(2025, 6, 23, 8, 10, tzinfo=dt_timezone.utc))
+        scheduler.apply_update(created.pk)
+        deleted = self.habit(datetime(2025, 6, 23, 8, 10, tzinfo=dt_timezone.utc))
+        scheduler.apply_update(deleted.pk)
+        deleted.delete()
+        scheduler.apply_update(deleted.pk)
+        
+        self.now = datetime(2025, 6, 23, 8, 10, tzinfo=dt_timezone.utc)
+        self.assertEqual(sorted(self.fired_habits(scheduler.run_pending())), [habit.pk, created.pk])
+    
+    def test_completed_habit_is_not_fired(self):
+        habit = self.habit(datetime(2025, 6, 23, 8, 10, tzinfo=dt_timezone.utc))
+        scheduler = self.scheduler()
+        habit.mark_completed(self.now)
+        
+        self.now = datetime(2025, 6, 23, 8, 10, tzinfo=dt_timezone.utc)
+        self.assertEqual(scheduler.run_pending(), [])
+    
+    @override_settings(REMINDER_SCHEDULER='wheel')
+    def test_updates_reuse_redis_client(self):
+        with mock.patch.dict(redis_clients._clients, clear=True), mock.patch('redis.Redis.from_url') as from_url:
+            publish_reminder_update(1)
+            publish_reminder_update(2)
+            self.assertEqual(from_url.call_count, 1)
+            self.assertEqual(from_url.return_value.publish.call_count, 2)
+            
+            # После fork дочерний процесс открывает своё соединение
+            redis_clients._reset_clients()
+            publish_reminder_update(3)
+            self.assertEqual(from_url.call_count, 2)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Планы запросов проверяются только на PostgreSQL')
+class QueryPlanTest(TestCase):
+    # Планы проверяются на выборке, похожей на рабочую, без запрета seq scan:
+    # индекс должен выбирать сам планировщик по свежей статистике
+    @classmethod
+    def setUpTestData(cls):
+        users = User.objects.bulk_create([User(username=f'user{i}') for i in range(1000)])
+        now = timezone.now()
+        habits = Habit.objects.bulk_create([
+            Habit(
+                user=users[i % len(users)],
+                place='Дом',
+                time=time(i % 24, i % 60),
+                action=f'Привычка {i}',
+                execution_time=60,
+                is_public=i % 20 == 0,
+                # Напоминания распределены по неделе вперёд
+                next_reminder_at=now + timedelta(seconds=i * 30),
+            )
+            for i in range(20000)
+        ])
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=habits[i % len(habits)], completed_at=now - timedelta(minutes=i))
+            for i in range(100000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE habits_habit')
+            cursor.execute('ANALYZE habits_habitlog')
+        cls.user = users[0]
+        cls.habit = habits[0]
+    
+    def assertUsesIndex(self, plan, index_name):
+        self.assertIn(index_name, plan)
+        self.assertNotIn('Seq Scan', plan)
+        self.assertNotIn('Sort', plan)
+    
+    def list_page(self, viewset):
+        # Первая страница списка так, как её строит представление
+        request = APIRequestFactory().get('/')
+        force_authenticate(request, user=self.user)
+        view = viewset(action_map={'get': 'list'}, args=(), kwargs={}, format_kwarg=None)
+        view.request = view.initialize_request(request)
+        return view.paginator.page_queryset(view.filter_queryset(view.get_queryset()), view.request, view)
+    
+    def test_latest_log_for_habit(self):
+        # Запрос из Habit.schedule_next_reminder; у партиций индекс называется
+        # по имени партиции и колонкам
+        with CaptureQueriesContext(connection) as queries:
+            self.habit.schedule_next_reminder()
+        latest, = [query['sql'] for query in queries if 'habits_habitlog' in query['sql']]
+        index_name = 'habit_id_completed_at_idx' if is_partitioned() else 'habitlog_habit_recent_idx'
+        self.assertUsesIndex(self.explain(latest), index_name)
+    
+    def test_user_habits_list(self):
+        self.assertUsesIndex(self.list_page(HabitViewSet).explain(), 'habit_user_created_idx')
+    
+    def test_public_habits_list(self):
+        self.assertUsesIndex(self.list_page(PublicHabitViewSet).explain(), 'habit_public_created_idx')
+    
+    def test_reminder_scan(self):
+        with CaptureQueriesContext(connection) as queries:
+            slots = claim_due_habits()
+        self.assertTrue(slots)
+        scan, = [query['sql'] for query in queries if query['sql'].startswith('SELECT "habits_habit"."id", "habits_habit"."next_reminder_at" ')]
+        self.assertUsesIndex(self.explain(scan), 'habit_next_reminder_idx')
+    
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+
+class KeysetPaginationTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        created_at = timezone.now()
+        self.habits = []
+        for i in range(12):
+            habit = Habit.objects.create(user=self.user, place='Дом', time=time(i, 0), action=f'Привычка {i}', execution_time=60, is_public=True)
+            # Несколько привычек с одинаковым created_at проверяют сортировку по id
+            Habit.objects.filter(pk=habit.pk).update(created_at=created_at - timedelta(minutes=i // 3))
+            self.habits.append(habit)
+    
+    def collect(self, url):
+        ids = []
+        pages = 0
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+            pages += 1
+        return ids, pages
+    
+    def test_walks_all_pages_without_duplicates(self):
+        ids, pages = self.collect('/api/habits/')
+        expected = list(Habit.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+    
+    def test_ordering_by_time(self):
+        ids, _ = self.collect('/api/public-habits/?ordering=time&page_size=4')
+        self.assertEqual(ids, [habit.pk for habit in self.habits])
+    
+    def test_previous_link(self):
+        first = self.client.get('/api/habits/?page_size=4').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+    
+    def test_page_size_is_capped(self):
+        with self.settings(API_MAX_PAGE_SIZE=10):
+            response = self.client.get('/api/habits/?page_size=1000')
+        self.assertEqual(len(response.data['results']), 10)
+    
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/habits/?cursor=bad')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_deep_page_runs_without_count(self):
+        _, pages = self.collect('/api/habits/?page_size=2')
+        self.assertEqual(pages, 6)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/habits/?page_size=2')
+        self.assertFalse(any('COUNT' in query['sql'] or 'OFFSET' in query['sql'] for query in queries))
+
+
+class PublicFeedCacheTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60, is_public=True)
+    
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get('/api/public-habits/')
+        hits = feed_cache_stats()['hits']
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/public-habits/')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(feed_cache_stats()['hits'], hits + 1)
+    
+    def test_not_modified(self):
+        etag = self.client.get('/api/public-habits/')['ETag']
+        response = self.client.get('/api/public-habits/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+    
+    def test_filters_are_cached_separately(self):
+        self.client.get('/api/public-habits/')
+        response = self.client.get('/api/public-habits/?is_pleasant=true')
+        self.assertEqual(response.data['results'], [])
+    
+    def test_edit_invalidates_feed(self):
+        etag = self.client.get('/api/public-habits/')['ETag']
+        self.habit.action = 'Бег'
+        self.habit.save()
+        
+        response = self.client.get('/api/public-habits/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['action'], 'Бег')
+    
+    def test_unpublish_and_delete_invalidate_feed(self):
+        self.client.get('/api/public-habits/')
+        habit = Habit.objects.get(pk=self.habit.pk)
+        habit.is_public = False
+        habit.save()
+        self.assertEqual(self.client.get('/api/public-habits/').data['results'], [])
+        
+        other = Habit.objects.create(user=self.user, place='Офис', time='10:00:00', action='Вода', execution_time=30, is_public=True)
+        self.assertEqual(len(self.client.get('/api/public-habits/').data['results']), 1)
+        other.delete()
+        self.assertEqual(self.client.get('/api/public-habits/').data['results'], [])
+
+
+class QueryCountTest(QueryCountAssertionsMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.pleasant = Habit.objects.create(user=self.user, place='Дом', time='10:00:00', action='Ванна', is_pleasant=True, execution_time=120)
+    
+    def create_habits(self, count, owner=None):
+        for i in range(count):
+            owner = User.objects.create_user(username=f'owner{User.objects.count()}', password='testpass123') if owner is None else owner
+            Habit.objects.create(
+                user=owner, place='Дом', time='09:00:00', action=f'Привычка {i}',
+                execution_time=60, is_public=True, related_habit=self.pleasant,
+            )
+    
+    def test_habit_list(self):
+        self.assertConstantQueries('/api/habits/', 1, lambda count: self.create_habits(count, self.user))
+    
+    def test_public_habit_list(self):
+        self.assertConstantQueries('/api/public-habits/', 1, self.create_habits)
+    
+    def test_habit_detail(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/habits/{self.pleasant.pk}/')
+        self.assertEqual(response.data['user'], 'testuser')
+    
+    def test_public_habit_detail(self):
+        self.create_habits(1)
+        habit = Habit.objects.filter(is_public=True).first()
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/public-habits/{habit.pk}/')
+        self.assertEqual(response.data['user'], habit.user.username)
+
+
+class BulkCompletionTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60)
+        other = User.objects.create_user(username='other', password='testpass123')
+        self.foreign = Habit.objects.create(user=other, place='Дом', time='09:00:00', action='Чужая', execution_time=60)
+    
+    def complete(self, items):
+        return self.client.post('/api/habits/complete-bulk/', {'items': items}, format='json')
+    
+    def test_statuses(self):
+        response = self.complete([
+            {'habit_id': self.habit.pk, 'idempotency_key': 'a'},
+            {'habit_id': self.habit.pk, 'idempotency_key': 'a'},
+            {'habit_id': self.foreign.pk},
+            {'habit_id': 'x'},
+            {'habit_id': self.habit.pk, 'completed_at': (timezone.now() + timedelta(days=1)).isoformat()},
+        ])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['created', 'duplicate', 'not_found', 'invalid', 'invalid'])
+        self.assertEqual(response.data['summary'], {'created': 1, 'duplicate': 1, 'not_found': 1, 'invalid': 2})
+        self.assertEqual(HabitLog.objects.count(), 1)
+    
+    def test_retry_is_idempotent(self):
+        items = [{'habit_id': self.habit.pk, 'idempotency_key': 'offline-1'}]
+        self.complete(items)
+        response = self.complete(items)
+        self.assertEqual(response.data['results'][0]['status'], 'duplicate')
+        self.assertEqual(HabitLog.objects.count(), 1)
+    
+    def test_replay_at_another_moment_is_duplicate(self):
+        # Без completed_at каждый запрос получает своё время, но ключ общий
+        items = [{'habit_id': self.habit.pk, 'idempotency_key': 'offline-2'}]
+        complete_habits(self.user, items, now=timezone.now() - timedelta(seconds=5))
+        results = complete_habits(self.user, items)
+        self.assertEqual(results[0]['status'], 'duplicate')
+        self.assertEqual(HabitLog.objects.count(), 1)
+        self.assertEqual(HabitCompletionKey.objects.filter(habit=self.habit, idempotency_key='offline-2').count(), 1)
+    
+    def test_lost_claim_is_not_created_or_rescheduled(self):
+        # Параллельный повтор уже захватил ключ, но его лог ещё не виден
+        HabitCompletionKey.objects.create(habit=self.habit, idempotency_key='race', completed_at=timezone.now())
+        scheduled = self.habit.next_reminder_at
+        receiver = mock.Mock()
+        reminder_rescheduled.connect(receiver)
+        self.addCleanup(reminder_rescheduled.disconnect, receiver)
+        
+        response = self.complete([{'habit_id': self.habit.pk, 'idempotency_key': 'race'}])
+        self.assertEqual(response.data['summary'], {'duplicate': 1})
+        self.assertFalse(HabitLog.objects.exists())
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.next_reminder_at, scheduled)
+        receiver.assert_not_called()
+    
+    def test_constant_queries(self):
+        habits = [
+            Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action=f'Привычка {i}', execution_time=60)
+            for i in range(20)
+        ]
+        items = [{'habit_id': habit.pk, 'idempotency_key': str(habit.pk)} for habit in habits]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.complete(items)
+        self.assertEqual(response.data['summary'], {'created': 20})
+        self.assertLessEqual(len(queries), 12)
+    
+    def test_late_completion_keeps_later_reminder(self):
+        self.client.post(f'/api/habits/{self.habit.pk}/complete/')
+        self.habit.refresh_from_db()
+        scheduled = self.habit.next_reminder_at
+        
+        self.complete([{'habit_id': self.habit.pk, 'completed_at': (timezone.now() - timedelta(days=3)).isoformat()}])
+        self.habit.refresh_from_db()
+        self.assertEqual(self.habit.next_reminder_at, scheduled)
+        self.assertEqual(HabitLog.objects.filter(habit=self.habit).count(), 2)
+    
+    def test_too_many_items(self):
+        items = [{'habit_id': self.habit.pk}] * (settings.BULK_COMPLETE_MAX_ITEMS + 1)
+        response = self.complete(items)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class HabitStatsTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60, periodicity=2)
+        Habit.objects.filter(pk=self.habit.pk).update(created_at=timezone.now() - timedelta(days=60))
+        self.now = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+    
+    def complete_days_ago(self, *days):
+        items = [{'habit_id': self.habit.pk, 'completed_at': (self.now - timedelta(days=day)).isoformat()} for day in days]
+        self.client.post('/api/habits/complete-bulk/', {'items': items}, format='json')
+    
+    def test_streaks_respect_periodicity(self):
+        # Разрыв в 3 дня при периодичности 2 прерывает серию
+        self.complete_days_ago(10, 7, 5, 3, 1)
+        response = self.client.get(f'/api/habits/{self.habit.pk}/stats/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['current_streak'], 4)
+        self.assertEqual(response.data['longest_streak'], 4)
+        self.assertEqual(response.data['total_completions'], 5)
+        self.assertEqual(response.data['completion_rate']['7'], 0.75)
+    
+    def test_late_completion_joins_streak(self):
+        self.complete_days_ago(6, 1)
+        self.complete_days_ago(3)
+        response = self.client.get(f'/api/habits/{self.habit.pk}/stats/')
+        self.assertEqual(response.data['current_streak'], 2)
+        self.complete_days_ago(5)
+        response = self.client.get(f'/api/habits/{self.habit.pk}/stats/')
+        self.assertEqual(response.data['current_streak'], 4)
+    
+    def test_broken_streak_reads_as_zero(self):
+        self.complete_days_ago(5)
+        response = self.client.get(f'/api/habits/{self.habit.pk}/stats/')
+        self.assertEqual(response.data['current_streak'], 0)
+        self.assertEqual(response.data['longest_streak'], 1)
+    
+    def test_replayed_batch_keeps_stats(self):
+        items = [
+            {'habit_id': self.habit.pk, 'idempotency_key': f'day-{day}', 'completed_at': (self.now - timedelta(days=day)).isoformat()}
+            for day in (5, 3, 1)
+        ] + [{'habit_id': self.habit.pk, 'idempotency_key': 'today'}]
+        self.client.post('/api/habits/complete-bulk/', {'items': items}, format='json')
+        before = HabitStats.objects.filter(habit=self.habit).values().get()
+        
+        response = self.client.post('/api/habits/complete-bulk/', {'items': items}, format='json')
+        self.assertEqual(response.data['summary'], {'duplicate': 4})
+        self.assertEqual(HabitStats.objects.filter(habit=self.habit).values().get(), before)
+        self.assertEqual(before['total_completions'], 4)
+    
+    def test_complete_updates_stats(self):
+        self.client.post(f'/api/habits/{self.habit.pk}/complete/')
+        self.assertEqual(self.habit.stats.current_streak, 1)
+    
+    def test_stats_list(self):
+        Habit.objects.create(user=self.user, place='Дом', time='10:00:00', action='Вода', execution_time=30)
+        self.complete_days_ago(1)
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/habits/stats/')
+        self.assertEqual(len(response.data['results']), 2)
+        by_habit = {item['habit_id']: item for item in response.data['results']}
+        self.assertEqual(by_habit[self.habit.pk]['total_completions'], 1)
+    
+    def test_backfill_matches_incremental(self):
+        self.complete_days_ago(20, 3, 10, 1, 2, 9)
+        expected = self.client.get(f'/api/habits/{self.habit.pk}/stats/').data
+        HabitStats.objects.all().delete()
+        call_command('backfill_habit_stats', chunk_size=2, stdout=StringIO())
+        self.assertEqual(self.client.get(f'/api/habits/{self.habit.pk}/stats/').data, expected)
+    
+    def test_backfill_without_server_side_cursors(self):
+        other = Habit.objects.create(user=self.user, place='Дом', time='10:00:00', action='Вода', execution_time=30)
+        self.complete_days_ago(20, 3, 10, 1, 2, 9)
+        # Два выполнения с одним временем: ключ пачек включает id
+        same_moment = (self.now - timedelta(days=1)).isoformat()
+        items = [{'habit_id': other.pk, 'completed_at': same_moment}] * 2 + [{'habit_id': other.pk}]
+        self.client.post('/api/habits/complete-bulk/', {'items': items}, format='json')
+        expected = {habit.pk: self.client.get(f'/api/habits/{habit.pk}/stats/').data for habit in (self.habit, other)}
+        HabitStats.objects.all().delete()
+        with without_server_side_cursors():
+            call_command('backfill_habit_stats', chunk_size=2, stdout=StringIO())
+        for habit in (self.habit, other):
+            self.assertEqual(self.client.get(f'/api/habits/{habit.pk}/stats/').data, expected[habit.pk])
+
+
+@override_settings(HABITLOG_RETENTION_MONTHS=12)
+class HabitLogRetentionTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60)
+        self.now = timezone.now()
+    
+    def test_old_logs_rolled_up(self):
+        old = self.now - timedelta(days=500)
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, completed_at=old),
+            HabitLog(habit=self.habit, completed_at=old + timedelta(minutes=5)),
+            HabitLog(habit=self.habit, completed_at=self.now),
+        ])
+        HabitCompletionKey.objects.bulk_create([
+            HabitCompletionKey(habit=self.habit, idempotency_key='old', completed_at=old),
+            HabitCompletionKey(habit=self.habit, idempotency_key='new', completed_at=self.now),
+        ])
+        apply_retention(self.now)
+        self.assertEqual(list(HabitLog.objects.values_list('completed_at', flat=True)), [self.now])
+        self.assertEqual(list(HabitCompletionKey.objects.values_list('idempotency_key', flat=True)), ['new'])
+        rollup = HabitLogRollup.objects.get()
+        self.assertEqual((rollup.habit_id, rollup.day, rollup.completions), (self.habit.pk, old.date(), 2))
+    
+    def test_rollup_without_server_side_cursors(self):
+        old = self.now - timedelta(days=500)
+        other = Habit.objects.create(user=self.user, place='Дом', time='10:00:00', action='Вода', execution_time=30)
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, completed_at=old),
+            HabitLog(habit=other, completed_at=old),
+            HabitLog(habit=other, completed_at=old + timedelta(minutes=5)),
+        ])
+        with without_server_side_cursors(), mock.patch('habits.partitions.ROLLUP_HABITS_PER_QUERY', 1):
+            apply_retention(self.now)
+        self.assertFalse(HabitLog.objects.exists())
+        self.assertEqual(
+            dict(HabitLogRollup.objects.values_list('habit_id', 'completions')),
+            {self.habit.pk: 1, other.pk: 2},
+        )
+    
+    def test_bulk_complete_rejects_expired_dates(self):
+        items = [{'habit_id': self.habit.pk, 'completed_at': (self.now - timedelta(days=500)).isoformat()}]
+        response = self.client.post('/api/habits/complete-bulk/', {'items': items}, format='json')
+        self.assertEqual(response.data['summary'], {'invalid': 1})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Секционирование есть только в PostgreSQL')
+class HabitLogPartitionTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.habit = Habit.objects.create(user=user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60)
+        self.now = timezone.now()
+    
+    def test_partitions_created_ahead(self):
+        created = ensure_partitions(self.now + timedelta(days=400))
+        names = {name for name, _, _ in list_partitions()}
+        self.assertTrue(set(created) <= names)
+        self.assertIn(partition_name(self.now.replace(day=1)), names)
+    
+    def log_plans(self, action):
+        # Планы запросов к логам, которые выполняет action, с подставленными параметрами
+        with CaptureQueriesContext(connection) as queries:
+            action()
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries:
+                if query['sql'].startswith('SELECT') and 'habits_habitlog' in query['sql']:
+                    cursor.execute(f'EXPLAIN {query["sql"]}')
+                    plans.append('\n'.join(row[0] for row in cursor.fetchall()))
+        return plans
+    
+    def test_recent_logs_touch_current_partition(self):
+        month = self.now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        old_month = month_start(self.now - timedelta(days=120))
+        create_partition(old_month)
+        HabitLog.objects.bulk_create([
+            HabitLog(habit=self.habit, completed_at=self.now),
+            HabitLog(habit=self.habit, completed_at=old_month + timedelta(days=1)),
+        ])
+        self.habit.periodicity = 2
+        
+        plans = self.log_plans(self.habit.save) + self.log_plans(lambda: reschedule_user_habits(self.habit.user))
+        self.assertGreaterEqual(len(plans), 2)
+        for plan in plans:
+            self.assertIn(partition_name(month), plan)
+            self.assertNotIn(partition_name(old_month), plan)
+            self.assertNotIn('habits_habitlog_default', plan)
+    
+    @override_settings(HABITLOG_RETENTION_MONTHS=1, HABITLOG_RETENTION_ACTION='drop')
+    def test_expired_partition_dropped(self):
+        ensure_partitions()
+        HabitLog.objects.create(habit=self.habit, completed_at=self.now)
+        expired = apply_retention(self.now + timedelta(days=100))
+        self.assertIn(partition_name(self.now.replace(day=1)), expired)
+        self.assertEqual(HabitLog.objects.count(), 0)
+        self.assertEqual(HabitLogRollup.objects.get().completions, 1)
+
+
+class AdherenceAnalyticsTest(TestCase):
+    def test_analyse_streaks_and_ratios(self):
+        periodicity = np.array([1, 2, 1])
+        start_day = np.array([100, 100, 100])
+        today = np.array([110, 110, 110])
+        # Привычка 0: дни 101, 102, 102 (дубль), 104, 105; привычка 1: 106, 108, 110
+        log_habit = np.array([0, 0, 0, 0, 0, 1, 1, 1])
+        log_day = np.array([101, 102, 102, 104, 105, 106, 108, 110])
+        
+        stats = analyse(periodicity, start_day, today, log_habit, log_day)
+        self.assertEqual(stats['completions'].tolist(), [4, 3, 0])
+        self.assertEqual(stats['longest_streak'].tolist(), [2, 3, 0])
+        self.assertEqual(stats['current_streak'].tolist(), [0, 3, 0])
+        self.assertAlmostEqual(stats['on_time_ratio'][0], 2 / 3)
+        self.assertEqual(stats['on_time_ratio'][1], 1.0)
+        self.assertTrue(np.isnan(stats['on_time_ratio'][2]))
+        self.assertAlmostEqual(stats['adherence'][0], 4 / 11)
+        self.assertEqual(stats['adherence'][1], 0.5)
+    
+    def test_report_by_periodicity(self):
+        user = User.objects.create_user(username='testuser', password='testpass123', timezone='Asia/Tokyo')
+        daily = Habit.objects.create(user=user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60)
+        Habit.objects.create(user=user, place='Дом', time='09:00:00', action='Уборка', execution_time=60, periodicity=7)
+        now = timezone.now()
+        Habit.objects.filter(pk=daily.pk).update(created_at=now - timedelta(days=3))
+        HabitLog.objects.bulk_create([HabitLog(habit=daily, completed_at=now - timedelta(days=day)) for day in range(4)])
+        
+        report = build_adherence_report(now, chunk_size=2)
+        self.assertEqual((report.habits, report.logs), (2, 4))
+        rows = {row.periodicity: row for row in report.rows.all()}
+        self.assertEqual(rows[1].completions, 4)
+        self.assertEqual(rows[1].mean_longest_streak, 4)
+        self.assertEqual(rows[1].on_time_ratio, 1.0)
+        self.assertEqual(rows[7].completions, 0)
+        self.assertIsNone(rows[7].on_time_ratio)
+        
+        with without_server_side_cursors():
+            keyset = build_adherence_report(now, chunk_size=3)
+        self.assertEqual((keyset.habits, keyset.logs), (2, 4))
+        self.assertEqual(
+            list(keyset.rows.values_list('periodicity', 'completions', 'adherence')),
+            list(report.rows.values_list('periodicity', 'completions', 'adherence')),
+        )
+
+
+class ExportTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка, утро', execution_time=60)
+        HabitLog.objects.create(habit=self.habit)
+        other = User.objects.create_user(username='other', password='testpass123')
+        Habit.objects.create(user=other, place='Дом', time='09:00:00', action='Чужая', execution_time=60)
+    
+    def test_csv_export_only_own_habits(self):
+        response = self.client.get('/api/habits/export/', {'dataset': 'habits', 'output': 'csv'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:4], ['id', 'place', 'time', 'action'])
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][3], 'Зарядка, утро')
+    
+    def test_gzip_ndjson_logs(self):
+        response = self.client.get('/api/habits/export/', {'dataset': 'logs', 'output': 'ndjson', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('logs.ndjson.gz', response['Content-Disposition'])
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual([json.loads(line)['habit_id'] for line in lines], [self.habit.pk])
+    
+    def test_unknown_dataset(self):
+        response = self.client.get('/api/habits/export/', {'dataset': 'users'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_export_throttled(self):
+        with mock.patch.dict(ExportRateThrottle.THROTTLE_RATES, {'export': '2/hour'}):
+            codes = [self.client.get('/api/habits/export/').status_code for _ in range(3)]
+        self.assertEqual(codes, [200, 200, 429])
+    
+    def test_asgi_export_streams_chunks(self):
+        HabitLog.objects.bulk_create([HabitLog(habit=self.habit) for _ in range(4500)])
+        produced = []
+        
+        def spy(*args, **kwargs):
+            for chunk in stream_export(*args, **kwargs):
+                produced.append(chunk)
+                yield chunk
+        
+        # Как тестовый клиент Django: соединение с открытой транзакцией теста не закрывается
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        messages = []
+        
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        
+        async def send(message):
+            messages.append((message, len(produced)))
+        
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': '/api/habits/export/', 'root_path': '', 'query_string': b'dataset=logs',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {issue_token(self.user)}'.encode())],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        with mock.patch('habits.views.stream_export', spy):
+            async_to_sync(ASGIHandler())(scope, receive, send)
+        
+        self.assertEqual(messages[0][0]['status'], status.HTTP_200_OK)
+        bodies = [(message['body'], count) for message, count in messages[1:] if message.get('body')]
+        self.assertEqual(len(produced), 3)
+        # Первый чанк уходит клиенту до того, как прочитаны остальные строки
+        self.assertEqual(bodies[0][1], 1)
+        rows = list(csv.reader(io.StringIO(b''.join(body for body, _ in bodies).decode())))
+        self.assertEqual(len(rows), 4502)
+    
+    def test_command_chunks(self):
+        Habit.objects.bulk_create([
+            Habit(user=self.user, place='Дом', time='09:00:00', action=f'Привычка {i}', execution_time=60)
+            for i in range(5)
+        ])
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as target:
+            call_command('export_data', 'habits', output='ndjson', file=target.name, chunk_size=2)
+            lines = open(target.name, encoding='utf-8').read().splitlines()
+        self.assertEqual(len(lines), 7)
+    
+    def test_keyset_chunks_without_server_side_cursors(self):
+        Habit.objects.bulk_create([
+            Habit(user=self.user, place='Дом', time='09:00:00', action=f'Привычка {i}', execution_time=60)
+            for i in range(5)
+        ])
+        expected = list(Habit.objects.order_by('pk').values_list('id', flat=True))
+        with without_server_side_cursors():
+            with CaptureQueriesContext(connection) as queries:
+                lines = b''.join(stream_export('habits', 'ndjson', chunk_size=2)).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], expected)
+        self.assertEqual(len(queries), 4)
+
+
+class HabitImportTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.pleasant = Habit.objects.create(user=self.user, place='Дом', time='10:00:00', action='Ванна', is_pleasant=True, execution_time=120)
+        self.useful = Habit.objects.create(user=self.user, place='Дом', time='10:00:00', action='Зарядка', execution_time=60)
+    
+    def row(self, **overrides):
+        row = {'place': 'Парк', 'time': '08:00:00', 'action': 'Бег', 'execution_time': 60}
+        row.update(overrides)
+        return row
+    
+    def test_rows_validated_in_batch(self):
+        items = [
+            self.row(related_habit=self.pleasant.pk),
+            self.row(reward='Десерт', related_habit=self.pleasant.pk),
+            self.row(related_habit=self.useful.pk),
+            self.row(execution_time=121),
+            self.row(is_pleasant=True, reward='Десерт'),
+            self.row(related_habit=999999),
+            self.row(time='25:00'),
+            self.row(is_public=True),
+        ]
+        # Запрос связанных привычек, вставка и savepoint не зависят от числа строк
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/habits/import/', {'items': items}, format='json')
+        self.assertLessEqual(len(queries), 6)
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['created', 'invalid', 'invalid', 'invalid', 'invalid', 'invalid', 'invalid', 'created'])
+        self.assertIn('reward', response.data['results'][1]['errors'])
+        self.assertIn('related_habit', response.data['results'][2]['errors'])
+        self.assertIn('time', response.data['results'][6]['errors'])
+        
+        habit = Habit.objects.get(pk=response.data['results'][0]['id'])
+        self.assertEqual(habit.related_habit, self.pleasant)
+        self.assertIsNotNone(habit.next_reminder_at)
+    
+    def test_command_reads_csv(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as source:
+            writer = csv.writer(source)
+            writer.writerow(['place', 'time', 'action', 'is_pleasant', 'related_habit', 'reward', 'execution_time'])
+            writer.writerow(['Парк', '08:00:00', 'Бег', 'False', self.pleasant.pk, '', '60'])
+            writer.writerow(['Парк', '08:00:00', 'Бег', 'False', '', '', '500'])
+        self.addCleanup(os.remove, source.name)
+        stderr = StringIO()
+        call_command('import_habits', source.name, user='testuser', batch_size=1, stdout=StringIO(), stderr=stderr)
+        self.assertEqual(Habit.objects.filter(action='Бег').count(), 1)
+        self.assertIn('Строка 2', stderr.getvalue())
+
+
+class HabitRulesTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.pleasant = Habit.objects.create(user=self.user, place='Дом', time='10:00:00', action='Ванна', is_pleasant=True, execution_time=120)
+    
+    def test_all_violations_reported(self):
+        errors = check_habit(habit_values({'reward': 'Чай', 'related_habit': 1, 'is_pleasant': True, 'execution_time': 500, 'periodicity': 9}), False)
+        self.assertEqual(set(errors), {'reward', 'related_habit', 'is_pleasant', 'execution_time', 'periodicity'})
+        self.assertEqual(len(errors['related_habit']), 2)
+    
+    def test_create_fetches_related_habit_once(self):
+        data = {'place': 'Дом', 'time': '09:00:00', 'action': 'Зарядка', 'execution_time': 60, 'related_habit': self.pleasant.pk}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/habits/', data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        selects = [query['sql'] for query in queries if query['sql'].startswith('SELECT') and 'habits_habit' in query['sql']]
+        self.assertEqual(len(selects), 1)
+    
+    def test_partial_update_checks_current_values(self):
+        habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60, reward='Чай')
+        response = self.client.patch(f'/api/habits/{habit.pk}/', {'is_pleasant': True})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('is_pleasant', response.data)
+    
+    def test_model_clean_uses_rules(self):
+        habit = Habit(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60, related_habit=self.pleasant, reward='Чай')
+        with self.assertRaises(ValidationError) as context:
+            habit.full_clean()
+        self.assertIn('reward', context.exception.message_dict)
+
+
+class AsyncReadViewTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.other = User.objects.create_user(username='other', password='testpass123')
+        self.client.force_authenticate(user=self.user)
+        self.factory = APIRequestFactory()
+        for i in range(7):
+            Habit.objects.create(user=self.user, place='Дом', time=time(i, 0), action=f'Привычка {i}', execution_time=60, is_public=True)
+        self.foreign = Habit.objects.create(user=self.other, place='Дом', time='09:00:00', action='Чужая', execution_time=60)
+    
+    def call(self, viewset, actions, request, **kwargs):
+        force_authenticate(request, user=self.user)
+        view = async_view(viewset, actions, basename='habit', detail='pk' in kwargs)
+        response = async_to_sync(view)(request, **kwargs)
+        response.render()
+        return response
+    
+    def test_list_matches_sync_view(self):
+        url = '/api/habits/?page_size=3&ordering=time'
+        while url:
+            response = self.call(HabitViewSet, {'get': 'list'}, self.factory.get(url))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data, self.client.get(url).data)
+            url = response.data['next']
+    
+    def test_retrieve_checks_owner(self):
+        habit = Habit.objects.filter(user=self.user).first()
+        response = self.call(HabitViewSet, {'get': 'retrieve'}, self.factory.get('/'), pk=str(habit.pk))
+        self.assertEqual(response.data['id'], habit.pk)
+        response = self.call(HabitViewSet, {'get': 'retrieve'}, self.factory.get('/'), pk=str(self.foreign.pk))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_write_falls_back_to_sync_view(self):
+        data = {'place': 'Дом', 'time': '09:00:00', 'action': 'Зарядка', 'execution_time': 60}
+        request = self.factory.post('/api/habits/', data, format='json')
+        response = self.call(HabitViewSet, {'get': 'list', 'post': 'create'}, request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+    
+    def test_public_feed_etag(self):
+        first = self.call(PublicHabitViewSet, {'get': 'list'}, self.factory.get('/api/public-habits/'))
+        self.assertEqual(len(first.data['results']), 5)
+        request = self.factory.get('/api/public-habits/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(self.call(PublicHabitViewSet, {'get': 'list'}, request).status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@override_settings(TELEGRAM_RATE_REDIS_URL='')
+class ReminderLedgerTest(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.user = User.objects.create_user(username='testuser', password='testpass123', telegram_chat_id='100')
+        self.silent = User.objects.create_user(username='silent', password='testpass123')
+        self.habit = Habit.objects.create(user=self.user, place='Дом', time='09:00:00', action='Зарядка', execution_time=60)
+        self.quiet = Habit.objects.create(user=self.silent, place='Дом', time='09:00:00', action='Чтение', execution_time=60)
+        self.due = self.now - timedelta(seconds=30)
+        self.bot = FakeSender(FakeClock())
+        patcher = mock.patch('habits.tasks.get_sender', return_value=self.bot)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+    
+    def test_overlapping_ticks_claim_once(self):
+        slots = [(self.habit.pk, self.due), (self.quiet.pk, self.due)]
+        first = claim_deliveries(slots)
+        self.assertEqual(len(first), 2)
+        self.assertEqual(claim_deliveries(slots), [])
+        self.assertEqual(ReminderDelivery.objects.count(), 2)
+    
+    def test_redelivered_task_does_not_resend(self):
+        delivery_id, = claim_deliveries([(self.habit.pk, self.due)])
+        send_reminder(delivery_id)
+        send_reminder(delivery_id)
+        
+        self.assertEqual(len(self.bot.sent), 1)
+        delivery = ReminderDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.attempts), (ReminderDelivery.SENT, 1))
+        self.assertGreaterEqual(delivery.lag_ms, 30000)
+    
+    def test_failed_send_is_retried(self):
+        delivery_id, = claim_deliveries([(self.habit.pk, self.due)])
+        with mock.patch.object(self.bot, 'send_message', side_effect=NetworkError('timeout')):
+            with self.assertRaises(NetworkError):
+                send_reminder(delivery_id)
+        self.assertEqual(ReminderDelivery.objects.get().status, ReminderDelivery.FAILED)
+        
+        send_reminder(delivery_id)
+        delivery = ReminderDelivery.objects.get()
+        self.assertEqual((delivery.status, delivery.attempts), (ReminderDelivery.SENT, 2))
+    
+    def test_unexpected_error_marks_failed(self):
+        delivery_id, = claim_deliveries([(self.habit.pk, self.due)])
+        with mock.patch.object(self.bot, 'send_message', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                send_reminder(delivery_id)
+        self.assertEqual(ReminderDelivery.objects.get().status, ReminderDelivery.FAILED)
+    
+    def test_stuck_deliveries_are_recovered(self):
+        crashed, = claim_deliveries([(self.habit.pk, self.due)])
+        lost, = claim_deliveries([(self.habit.pk, self.due - timedelta(minutes=1))])
+        start_deliveries([crashed])
+        self.assertEqual(recover_deliveries(self.now), [])
+        
+        later = timezone.now() + timedelta(minutes=10)
+        self.assertEqual(recover_deliveries(later), [crashed, lost])
+        for delivery_id in [crashed, lost]:
+            send_reminder(delivery_id)
+            send_reminder(delivery_id)
+        self.assertEqual(len(self.bot.sent), 2)
+        self.assertEqual(recover_deliveries(later), [])
+    
+    def test_legacy_task_goes_through_ledger(self):
+        with mock.patch('habits.tasks.dispatch_reminders') as dispatch:
+            tasks.send_telegram_reminder(self.habit.pk)
+            tasks.send_telegram_reminder(self.habit.pk)
+        delivery = ReminderDelivery.objects.get()
+        self.assertEqual(dispatch.call_args_list, [mock.call([delivery.pk]), mock.call([])])
+    
+    def test_expired_delivery_is_skipped(self):
+        claim_deliveries([(self.habit.pk, self.now - timedelta(hours=2))])
+        self.assertEqual(recover_deliveries(self.now + timedelta(minutes=10)), [])
+        self.assertEqual(ReminderDelivery.objects.get().status, ReminderDelivery.SKIPPED)
+    
+    def test_batch_records_outcome_per_delivery(self):
+        delivery_ids = claim_deliveries([(self.habit.pk, self.due), (self.quiet.pk, self.due)])
+        send_reminder_batch(delivery_ids)
+        
+        statuses = dict(ReminderDelivery.objects.values_list('habit_id', 'status'))
+        self.assertEqual(statuses, {self.habit.pk: ReminderDelivery.SENT, self.quiet.pk: ReminderDelivery.SKIPPED})
+        self.assertEqual(len(self.bot.sent), 1)
+    
+    def test_stats(self):
+        for minutes in range(4):
+            delivery_id, = claim_deliveries([(self.habit.pk, self.due - timedelta(minutes=minutes))])
+            send_reminder(delivery_id)
+        claim_deliveries([(self.quiet.pk, self.due)])
+        
+        stats = delivery_stats(minutes=60)
+        self.assertEqual(stats['statuses'][ReminderDelivery.SENT], 4)
+        self.assertEqual(stats['statuses'][ReminderDelivery.PENDING], 1)
+        self.assertGreaterEqual(stats['lag_ms']['p99'], 3 * 60 * 1000)
+        self.assertEqual(stats['retried'], 0)
+
+
+class ReminderShardTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.now = datetime(2025, 6, 23, 8, 30, 10, tzinfo=dt_timezone.utc)
+        habits = Habit.objects.bulk_create([
+            Habit(user=self.user, place='Дом', time='08:30:00', action=f'Привычка {i}', execution_time=60)
+            for i in range(10)
+        ])
+        self.habit_ids = sorted(habit.pk for habit in habits)
+        Habit.objects.update(next_reminder_at=datetime(2025, 6, 23, 8, 30, tzinfo=dt_timezone.utc))
+    
+    def test_shards_split_due_habits(self):
+        claimed = [
+            {habit_id for habit_id, _ in claim_due_habits(self.now, shard, 3)}
+            for shard in range(3)
+        ]
+        self.assertEqual(sum(len(ids) for ids in claimed), 10)
+        self.assertEqual(sorted(set().union(*claimed)), self.habit_ids)
+        self.assertTrue(all(claimed))
+    
+    @override_settings(REMINDER_SCAN_SHARDS=3)
+    def test_tick_fans_out_to_chord(self):
+        with mock.patch.object(tasks, 'chord') as chord:
+            tasks.check_and_send_reminders()
+        header = chord.call_args.args[0]
+        self.assertEqual([signature.args[:2] for signature in header], [(0, 3), (1, 3), (2, 3)])
+        self.assertEqual(len({signature.args[2] for signature in header}), 1)
+    
+    def test_shard_results_are_collected(self):
+        now = self.now.isoformat()
+        with mock.patch.object(tasks.send_reminder, 'delay'):
+            results = [tasks.scan_reminder_shard(shard, 2, now) for shard in range(2)]
+        summary = tasks.collect_reminder_scan(results, now)
+        self.assertEqual((summary['shards'], summary['habits'], summary['deliveries']), (2, 10, 10))
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_TOKEN='secret')
+class MetricsTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+    
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+    
+    def test_request_latency_per_action(self):
+        self.client.force_authenticate(user=self.user)
+        labels = {'view': 'HabitViewSet.list', 'method': 'GET', 'status': '2xx'}
+        before = self.sample('habit_tracker_http_request_duration_seconds_count', **labels)
+        queries_before = self.sample('habit_tracker_http_request_db_queries_sum', view='HabitViewSet.list')
+        self.client.get('/api/habits/')
+        
+        self.assertEqual(self.sample('habit_tracker_http_request_duration_seconds_count', **labels), before + 1)
+        self.assertGreater(self.sample('habit_tracker_http_request_db_queries_sum', view='HabitViewSet.list'), queries_before)
+    
+    def test_function_views_are_labelled(self):
+        labels = {'view': 'login_view', 'method': 'POST', 'status': '4xx'}
+        before = self.sample('habit_tracker_http_request_duration_seconds_count', **labels)
+        self.client.post('/api/login/', {'username': 'testuser', 'password': 'wrong'})
+        self.assertEqual(self.sample('habit_tracker_http_request_duration_seconds_count', **labels), before + 1)
+    
+    def test_metrics_endpoint(self):
+        self.client.get('/api/habits/')
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(b'habit_tracker_http_request_duration_seconds_bucket', response.content)
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, status.HTTP_403_FORBIDDEN)
+    
+    def test_metrics_closed_by_default(self):
+        with override_settings(METRICS_TOKEN=''):
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer ')
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(METRICS_ENABLED=False):
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+    
+    def test_task_duration_and_queue_lag(self):
+        task = mock.Mock()
+        task.name = 'habits.tasks.check_and_send_reminders'
+        task.request.get.return_value = time_module.time() - 2
+        lag_before = self.sample('habit_tracker_celery_task_queue_lag_seconds_sum', task=task.name)
+        count_before = self.sample('habit_tracker_celery_task_duration_seconds_count', task=task.name, state='success')
+        task_started(task_id='1', task=task)
+        task_finished(task_id='1', task=task, state='SUCCESS')
+        
+        self.assertGreaterEqual(self.sample('habit_tracker_celery_task_queue_lag_seconds_sum', task=task.name) - lag_before, 2)
+        self.assertEqual(self.sample('habit_tracker_celery_task_duration_seconds_count', task=task.name, state='success'), count_before + 1)
+
+
+class ProfilingTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        Habit.objects.create(user=self.user, place='Дом', time=time(8, 0), action='Зарядка', execution_time=60)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        profiling = override_settings(
+            PROFILING_ENABLED=True, PROFILING_SAMPLE_RATE=1, PROFILING_THRESHOLD_MS=0, PROFILING_DIR=directory.name,
+        )
+        profiling.enable()
+        self.addCleanup(profiling.disable)
+    
+    def test_slow_request_is_captured(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get('/api/habits/')
+        
+        profile, = load_profiles('request')
+        self.assertEqual(profile['name'], 'GET /api/habits/')
+        self.assertEqual(profile['view'], 'HabitViewSet.list')
+        self.assertGreater(profile['queries']['count'], 0)
+        self.assertGreater(profile['serializer_ms'], 0)
+        self.assertTrue(profile['functions'])
+    
+    def test_fast_request_is_not_saved(self):
+        self.client.force_authenticate(user=self.user)
+        with override_settings(PROFILING_THRESHOLD_MS=60_000):
+            self.client.get('/api/habits/')
+        self.assertEqual(load_profiles(), [])
+    
+    def test_disabled_middleware_is_not_used(self):
+        with override_settings(PROFILING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                ProfilingMiddleware(lambda request: None)
+    
+    def test_reminder_tick_is_captured(self):
+        tasks.scan_reminder_shard(0, 1, timezone.now().isoformat())
+        with override_settings(PROFILING_ENABLED=False):
+            tasks.scan_reminder_shard(0, 1, timezone.now().isoformat())
+        
+        profile, = load_profiles('task')
+        self.assertEqual(profile['name'], 'habits.tasks.scan_reminder_shard')
+    
+    def test_ring_buffer_keeps_newest(self):
+        with override_settings(PROFILING_MAX_FILES=3):
+            ids = [save_profile({'kind': 'task', 'name': f'task-{index}', 'duration_ms': index}) for index in range(5)]
+        self.assertEqual([profile['id'] for profile in load_profiles()], ids[2:])
+    
+    def test_command_lists_and_renders(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.get('/api/habits/')
+        self.client.get('/api/habits/')
+        
+        out = StringIO()
+        call_command('slow_profiles', stdout=out)
+        self.assertIn('GET /api/habits/  (профилей 2', out.getvalue())
+        
+        profile_id = load_profiles()[0]['id']
+        out = StringIO()
+        call_command('slow_profiles', '--show', profile_id, stdout=out)
+        self.assertIn('Запросы к БД по суммарному времени', out.getvalue())
+        self.assertIn('habit', out.getvalue())
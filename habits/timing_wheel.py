@@ -0,0 +1,77 @@
+import math
+from datetime import datetime
+
+
+# Иерархическое колесо таймеров: уровень 0 хранит записи с точностью до tick
+# секунд, каждый следующий уровень в slots раз грубее. Записи дальше последнего
+# уровня лежат в overflow и переносятся в колесо, когда до них доходит очередь.
+# Время задаётся в секундах или как aware datetime.
+class TimingWheel:
+
+    def __init__(self, start, tick=1, slots=60, levels=3):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.current = self._ticks(start)
+        self.wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.overflow = {}
+        self.expired = {}
+        self.positions = {}
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, key):
+        return key in self.positions
+
+    def _ticks(self, moment):
+        if isinstance(moment, datetime):
+            moment = moment.timestamp()
+        return math.floor(moment / self.tick)
+
+    def _place(self, key, due):
+        tick = self._ticks(due)
+        delta = tick - self.current
+        if delta <= 0:
+            bucket = self.expired
+        else:
+            for level in range(self.levels):
+                if delta < self.slots ** (level + 1):
+                    bucket = self.wheels[level][(tick // self.slots ** level) % self.slots]
+                    break
+            else:
+                bucket = self.overflow
+        bucket[key] = due
+        self.positions[key] = bucket
+
+    def add(self, key, due):
+        self.remove(key)
+        self._place(key, due)
+
+    def remove(self, key):
+        bucket = self.positions.pop(key, None)
+        if bucket is not None:
+            del bucket[key]
+
+    def _cascade(self, bucket):
+        entries = list(bucket.items())
+        bucket.clear()
+        for key, due in entries:
+            self._place(key, due)
+
+    def advance(self, now):
+        target = self._ticks(now)
+        while self.current < target:
+            self.current += 1
+            for level in range(self.levels - 1, 0, -1):
+                if self.current % self.slots ** level == 0:
+                    if level == self.levels - 1:
+                        self._cascade(self.overflow)
+                    self._cascade(self.wheels[level][(self.current // self.slots ** level) % self.slots])
+            self._cascade(self.wheels[0][self.current % self.slots])
+
+        expired = sorted(self.expired.items(), key=lambda item: item[1])
+        for key, _ in expired:
+            del self.positions[key]
+        self.expired = {}
+        return expired
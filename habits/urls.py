@@ -1,11 +1,36 @@
-from django.urls import path, include
+from django.conf import settings
+from django.urls import path, include, re_path
 from rest_framework.routers import DefaultRouter
 from . import views
+from .async_views import async_view
 
 router = DefaultRouter()
 router.register(r'habits', views.HabitViewSet, basename='habit')
 router.register(r'public-habits', views.PublicHabitViewSet, basename='public-habit')
 
-urlpatterns = [
+urlpatterns = []
+
+if settings.ASYNC_READ_API:
+    # Под ASGI список и карточка привычек читаются асинхронно; маршруты стоят
+    # перед роутером и повторяют его адреса и имена. pk только из цифр, чтобы
+    # не перехватывать действия уровня списка вроде habits/export/
+    urlpatterns += [
+        path('habits/', async_view(
+            views.HabitViewSet, {'get': 'list', 'post': 'create'}, basename='habit', detail=False,
+        ), name='habit-list'),
+        re_path(r'^habits/(?P<pk>[0-9]+)/$', async_view(
+            views.HabitViewSet,
+            {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'},
+            basename='habit', detail=True,
+        ), name='habit-detail'),
+        path('public-habits/', async_view(
+            views.PublicHabitViewSet, {'get': 'list'}, basename='public-habit', detail=False,
+        ), name='public-habit-list'),
+        re_path(r'^public-habits/(?P<pk>[0-9]+)/$', async_view(
+            views.PublicHabitViewSet, {'get': 'retrieve'}, basename='public-habit', detail=True,
+        ), name='public-habit-detail'),
+    ]
+
+urlpatterns += [
     path('', include(router.urls)),
-] 
\ No newline at end of file
+]
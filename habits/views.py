@@ -1,15 +1,36 @@
+from collections import Counter
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
-from .models import Habit, HabitLog
-from .serializers import HabitSerializer, PublicHabitSerializer, HabitLogSerializer
+from rest_framework.exceptions import ValidationError
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.http import parse_etags
+from asgiref.sync import sync_to_async
+from .async_views import AsyncReadMixin
+from .completion import complete_habits
+from .importing import import_habits
+from .export import DATASETS, OUTPUTS, async_chunks, export_filename, stream_export
+from .cache import feed_cache_key, get_cached_feed, set_cached_feed
+from .mixins import SerializerQuerySetMixin
+from .models import Habit, HabitLog, HabitStats
+from .scheduling import get_zone
+from .stats import habit_stats, record_completions
+from .serializers import HabitSerializer, PublicHabitSerializer, HabitLogSerializer, BulkCompletionSerializer, BulkImportSerializer
 from .permissions import IsOwnerOrReadOnly, IsOwner
+from .throttling import ExportRateThrottle
+
+
+def bulk_response(results):
+    return {'summary': dict(Counter(result['status'] for result in results)), 'results': results}
 
 
-class HabitViewSet(viewsets.ModelViewSet):
+class HabitViewSet(AsyncReadMixin, SerializerQuerySetMixin, viewsets.ModelViewSet):
     serializer_class = HabitSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
@@ -17,7 +38,7 @@ class HabitViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'time']
     
     def get_queryset(self):
-        return Habit.objects.filter(user=self.request.user)
+        return self.optimize_queryset(Habit.objects.filter(user=self.request.user))
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -25,11 +46,64 @@ class HabitViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsOwner])
     def complete(self, request, pk=None):
         habit = self.get_object()
-        HabitLog.objects.create(habit=habit)
+        with transaction.atomic():
+            log = HabitLog.objects.create(habit=habit)
+            record_completions([log], {habit.pk: habit.periodicity}, habit.reminder_zone)
+        habit.mark_completed(log.completed_at)
         return Response({'message': 'Привычка отмечена как выполненная'}, status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['post'], url_path='complete-bulk', serializer_class=BulkCompletionSerializer)
+    def complete_bulk(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = complete_habits(request.user, serializer.validated_data['items'])
+        return Response(bulk_response(results), status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['post'], url_path='import', serializer_class=BulkImportSerializer)
+    def bulk_import(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = import_habits(request.user, serializer.validated_data['items'])
+        return Response(bulk_response(results), status=status.HTTP_200_OK)
+    
+    @action(detail=False, methods=['get'], throttle_classes=[ExportRateThrottle])
+    def export(self, request):
+        # Параметр называется output, а не format: format зарезервирован DRF
+        dataset = request.query_params.get('dataset', 'habits')
+        output = request.query_params.get('output', 'csv')
+        compress = request.query_params.get('gzip') in ('1', 'true')
+        if dataset not in DATASETS:
+            raise ValidationError({'dataset': f"Допустимые значения: {', '.join(DATASETS)}"})
+        if output not in OUTPUTS:
+            raise ValidationError({'output': f"Допустимые значения: {', '.join(OUTPUTS)}"})
+        
+        chunks = stream_export(dataset, output, user=request.user, compress=compress)
+        if isinstance(request._request, ASGIRequest):
+            chunks = async_chunks(chunks)
+        response = StreamingHttpResponse(
+            chunks,
+            content_type='application/gzip' if compress else OUTPUTS[output][0],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, output, compress)}"'
+        return response
+    
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsOwner])
+    def stats(self, request, pk=None):
+        habit = self.get_object()
+        stats = HabitStats.objects.filter(habit=habit).first()
+        return Response(habit_stats(habit, stats, habit.reminder_zone))
+    
+    @action(detail=False, methods=['get'], url_path='stats')
+    def stats_list(self, request):
+        zone = get_zone(request.user.timezone)
+        queryset = self.filter_queryset(self.get_queryset()).select_related('stats')
+        page = self.paginate_queryset(queryset)
+        habits = page if page is not None else queryset
+        data = [habit_stats(habit, getattr(habit, 'stats', None), zone) for habit in habits]
+        return self.get_paginated_response(data) if page is not None else Response(data)
 
 
-class PublicHabitViewSet(viewsets.ReadOnlyModelViewSet):
+class PublicHabitViewSet(AsyncReadMixin, SerializerQuerySetMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = PublicHabitSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, OrderingFilter]
@@ -37,4 +111,27 @@ class PublicHabitViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ['created_at', 'time']
     
     def get_queryset(self):
-        return Habit.objects.filter(is_public=True) 
\ No newline at end of file
+        return self.optimize_queryset(Habit.objects.filter(is_public=True))
+    
+    def list(self, request, *args, **kwargs):
+        key = feed_cache_key(request)
+        entry = get_cached_feed(key)
+        if entry is None:
+            response = super().list(request, *args, **kwargs)
+            entry = set_cached_feed(key, response.data)
+        return self.feed_response(request, entry)
+    
+    async def alist(self, request, *args, **kwargs):
+        key = await sync_to_async(feed_cache_key)(request)
+        entry = await sync_to_async(get_cached_feed)(key)
+        if entry is None:
+            response = await super().alist(request, *args, **kwargs)
+            entry = await sync_to_async(set_cached_feed)(key, response.data)
+        return self.feed_response(request, entry)
+    
+    def feed_response(self, request, entry):
+        headers = {'ETag': entry['etag']}
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if entry['etag'] in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry['data'], headers=headers)
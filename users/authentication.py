@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+
+TOKEN_SALT = 'users.authentication.token'
+PRINCIPAL_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff',
+    'is_superuser', 'telegram_chat_id', 'timezone', 'token_version',
+)
+LOCAL_CACHE_SIZE = 10000
+
+
+def issue_token(user):
+    # Подписывается первым ключом из AUTH_TOKEN_KEYS; остальные ключи
+    # принимаются при проверке, пока не истекут выданные ими токены
+    keys = settings.AUTH_TOKEN_KEYS
+    return signing.dumps({'uid': user.pk, 'ver': user.token_version}, key=keys[0], salt=TOKEN_SALT)
+
+
+def read_token(token):
+    keys = settings.AUTH_TOKEN_KEYS
+    return signing.loads(token, key=keys[0], fallback_keys=keys[1:], salt=TOKEN_SALT, max_age=settings.AUTH_TOKEN_TTL)
+
+
+class PrincipalCache:
+    # Кэш процесса перед общим кэшем: на горячем пути нет ни запроса к БД,
+    # ни обращения к Redis. Отзыв в других процессах вступает в силу не позже
+    # чем через AUTH_PRINCIPAL_LOCAL_TTL секунд
+    def __init__(self, size=LOCAL_CACHE_SIZE, clock=time.monotonic):
+        self.size = size
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return None
+            expires, fields = entry
+            if expires < self.clock():
+                del self.entries[user_id]
+                return None
+            self.entries.move_to_end(user_id)
+            return fields
+
+    def set(self, user_id, fields):
+        with self.lock:
+            self.entries[user_id] = (self.clock() + settings.AUTH_PRINCIPAL_LOCAL_TTL, fields)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+
+local_principals = PrincipalCache()
+
+
+def principal_cache_key(user_id):
+    return f'auth-principal:{user_id}'
+
+
+def build_principal(fields):
+    # Остальные поля пользователя отложены и загрузятся при обращении,
+    # а save() такого объекта запишет только загруженные поля
+    User = get_user_model()
+    names = [field.attname for field in User._meta.concrete_fields if field.attname in fields]
+    return User.from_db(DEFAULT_DB_ALIAS, names, [fields[name] for name in names])
+
+
+def get_principal(user_id):
+    fields = local_principals.get(user_id)
+    if fields is None:
+        fields = cache.get(principal_cache_key(user_id))
+        if fields is None:
+            fields = get_user_model().objects.filter(pk=user_id).values(*PRINCIPAL_FIELDS).first()
+            if fields is None:
+                return None
+            cache.set(principal_cache_key(user_id), fields, settings.AUTH_PRINCIPAL_CACHE_TTL)
+        local_principals.set(user_id, fields)
+    return build_principal(fields)
+
+
+def forget_principal(user_id):
+    local_principals.delete(user_id)
+    cache.delete(principal_cache_key(user_id))
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        header = get_authorization_header(request).split()
+        if not header or header[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(header) != 2:
+            raise AuthenticationFailed('Некорректный заголовок авторизации')
+
+        try:
+            payload = read_token(header[1].decode())
+        except signing.SignatureExpired:
+            raise AuthenticationFailed('Срок действия токена истёк')
+        except (signing.BadSignature, UnicodeDecodeError):
+            raise AuthenticationFailed('Недействительный токен')
+
+        user = get_principal(payload['uid'])
+        if user is None or not user.is_active or user.token_version != payload['ver']:
+            raise AuthenticationFailed('Токен отозван')
+        return user, payload
+
+    def authenticate_header(self, request):
+        return self.keyword
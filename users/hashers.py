@@ -0,0 +1,10 @@
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class ConfigurablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    # Тот же алгоритм pbkdf2_sha256, но число итераций берётся из настроек.
+    # При его изменении пароль перехэшируется при следующем входе
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS
@@ -0,0 +1,79 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+from rest_framework.exceptions import APIException
+
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+class HashingOverloaded(APIException):
+    status_code = 503
+    default_detail = 'Сервер перегружен, повторите попытку позже'
+    default_code = 'hashing_overloaded'
+
+
+def get_pool():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            workers = settings.PASSWORD_HASHING_WORKERS
+            _pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hashing')
+            _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASHING_QUEUE)
+    return _pool, _slots
+
+
+def run_hashing(fn, *args):
+    # PBKDF2 в hashlib отпускает GIL, поэтому хэширование в пуле не мешает
+    # остальным потокам воркера. Запросы сверх пула и очереди сразу
+    # отклоняются, а не занимают потоки, ожидая своей очереди
+    pool, slots = get_pool()
+    if not slots.acquire(blocking=False):
+        raise HashingOverloaded()
+    try:
+        return pool.submit(fn, *args).result()
+    finally:
+        slots.release()
+
+
+def hash_password(raw_password):
+    return run_hashing(make_password, raw_password)
+
+
+class HashingPoolBackend(ModelBackend):
+    # ModelBackend для authenticate(): поиск пользователя остаётся в потоке
+    # запроса, в пул уходит только хэш. Сигнал user_login_failed и перебор
+    # бэкендов остаются за authenticate()
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        User = get_user_model()
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # Хэш считается и для несуществующего пользователя, как в ModelBackend,
+            # чтобы время ответа не выдавало существующие логины
+            hash_password(password)
+            return None
+
+        if not run_hashing(check_password, password, user.password) or not self.user_can_authenticate(user):
+            return None
+
+        if needs_rehash(user.password):
+            user.password = hash_password(password)
+            user.save(update_fields=['password'])
+        return user
+
+
+def needs_rehash(encoded):
+    # Пароль перехэшируется при смене алгоритма или числа итераций
+    preferred = get_hasher('default')
+    hasher = identify_hasher(encoded)
+    return hasher.algorithm != preferred.algorithm or preferred.must_update(encoded)
@@ -1,10 +1,59 @@
+from functools import lru_cache
+from zoneinfo import available_timezones
+
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F
+
+
+@lru_cache(maxsize=None)
+def timezone_names():
+    # available_timezones() обходит каталог tzdata при каждом вызове
+    return frozenset(available_timezones())
+
+
+def validate_timezone(value):
+    if value not in timezone_names():
+        raise ValidationError(f'Неизвестный часовой пояс: {value}')
 
 
 class User(AbstractUser):
     telegram_chat_id = models.CharField(max_length=100, blank=True, null=True)
+    timezone = models.CharField(max_length=64, default='UTC', validators=[validate_timezone], verbose_name='Часовой пояс')
+    token_version = models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия токенов')
     
     class Meta:
         verbose_name = 'Пользователь'
-        verbose_name_plural = 'Пользователи' 
\ No newline at end of file
+        verbose_name_plural = 'Пользователи'
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_timezone = instance.__dict__.get('timezone')
+        return instance
+    
+    def timezone_changed(self):
+        return getattr(self, '_loaded_timezone', self.timezone) != self.timezone
+    
+    def set_password(self, raw_password):
+        super().set_password(raw_password)
+        self._password_changed = True
+    
+    def save(self, *args, **kwargs):
+        # Смена пароля отзывает выданные токены, как сессии при смене пароля.
+        # Перехэширование при входе пароль не меняет и идёт мимо set_password
+        if getattr(self, '_password_changed', False) and not self._state.adding:
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'token_version'}
+        super().save(*args, **kwargs)
+        self._password_changed = False
+    
+    def revoke_tokens(self):
+        # Все выданные ранее токены содержат старую версию и перестают приниматься
+        from .authentication import forget_principal
+        
+        User.objects.filter(pk=self.pk).update(token_version=F('token_version') + 1)
+        self.refresh_from_db(fields=['token_version'])
+        forget_principal(self.pk)
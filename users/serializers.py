@@ -2,6 +2,8 @@ from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.contrib.auth import authenticate
 
+from .hashing import hash_password
+
 User = get_user_model()
 
 
@@ -11,7 +13,7 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = User
-        fields = ['username', 'email', 'password', 'password_confirm']
+        fields = ['username', 'email', 'timezone', 'password', 'password_confirm']
     
     def validate(self, attrs):
         if attrs['password'] != attrs['password_confirm']:
@@ -20,7 +22,13 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         validated_data.pop('password_confirm')
-        user = User.objects.create_user(**validated_data)
+        password = validated_data.pop('password')
+        # То же, что create_user, но хэш считается в пуле хэширования
+        user = User(**validated_data)
+        user.username = User.normalize_username(user.username)
+        user.email = User.objects.normalize_email(user.email)
+        user.password = hash_password(password)
+        user.save()
         return user
 
 
@@ -29,7 +37,7 @@ class UserLoginSerializer(serializers.Serializer):
     password = serializers.CharField()
     
     def validate(self, attrs):
-        user = authenticate(username=attrs['username'], password=attrs['password'])
+        user = authenticate(self.context.get('request'), username=attrs['username'], password=attrs['password'])
         if not user:
             raise serializers.ValidationError("Неверные учетные данные")
         attrs['user'] = user
@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_principal
+from .models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Кэш сбрасывается и после коммита, чтобы конкурентный запрос не закэшировал
+    # строку, прочитанную до него
+    forget_principal(instance.pk)
+    transaction.on_commit(lambda: forget_principal(instance.pk))
@@ -1,7 +1,14 @@
-from django.test import TestCase
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_login_failed
 from rest_framework.test import APITestCase
 from rest_framework import status
+from .authentication import issue_token, local_principals
+from .hashing import needs_rehash
 from .serializers import UserRegistrationSerializer, UserLoginSerializer
 
 User = get_user_model()
@@ -70,6 +77,9 @@ class UserSerializerTest(TestCase):
 
 
 class UserAPITest(APITestCase):
+    def setUp(self):
+        cache.clear()
+    
     def test_user_registration(self):
         data = {
             'username': 'newuser',
@@ -113,4 +123,154 @@ class UserAPITest(APITestCase):
             'password': 'wrongpassword'
         }
         response = self.client.post('/api/login/', data)
-        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST) 
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST) 
+
+
+class TokenAuthenticationTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_principals.entries.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+    
+    def authorize(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    
+    def test_login_returns_token(self):
+        response = self.client.post('/api/login/', {'username': 'testuser', 'password': 'testpass123'})
+        self.authorize(response.data['token'])
+        self.assertEqual(self.client.get('/api/habits/').status_code, status.HTTP_200_OK)
+        habit = {'place': 'Дом', 'time': '09:00:00', 'action': 'Зарядка', 'execution_time': 60}
+        self.assertEqual(self.client.post('/api/habits/', habit).status_code, status.HTTP_201_CREATED)
+    
+    def test_login_updates_last_login(self):
+        self.assertIsNone(self.user.last_login)
+        self.client.post('/api/login/', {'username': 'testuser', 'password': 'testpass123'})
+        self.user.refresh_from_db()
+        self.assertIsNotNone(self.user.last_login)
+    
+    def test_cached_principal_needs_no_queries(self):
+        self.authorize(issue_token(self.user))
+        self.client.get('/api/habits/')
+        # Остаётся только запрос списка привычек
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/habits/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_logout_revokes_tokens(self):
+        token = issue_token(self.user)
+        self.authorize(token)
+        self.client.get('/api/habits/')
+        self.assertEqual(self.client.post('/api/logout/').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get('/api/habits/').status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_password_change_revokes_tokens(self):
+        self.authorize(issue_token(self.user))
+        self.client.get('/api/habits/')
+        self.user.set_password('newpass456')
+        self.user.save(update_fields=['password'])
+        self.assertEqual(self.client.get('/api/habits/').status_code, status.HTTP_401_UNAUTHORIZED)
+        
+        self.authorize(issue_token(self.user))
+        self.assertEqual(self.client.get('/api/habits/').status_code, status.HTTP_200_OK)
+    
+    def test_deactivated_user_rejected(self):
+        self.authorize(issue_token(self.user))
+        self.client.get('/api/habits/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/habits/').status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_key_rotation(self):
+        with override_settings(AUTH_TOKEN_KEYS=['old-key']):
+            token = issue_token(self.user)
+        self.authorize(token)
+        with override_settings(AUTH_TOKEN_KEYS=['new-key', 'old-key']):
+            self.assertEqual(self.client.get('/api/habits/').status_code, status.HTTP_200_OK)
+        with override_settings(AUTH_TOKEN_KEYS=['new-key']):
+            self.assertEqual(self.client.get('/api/habits/').status_code, status.HTTP_401_UNAUTHORIZED)
+    
+    def test_expired_token(self):
+        self.authorize(issue_token(self.user))
+        with override_settings(AUTH_TOKEN_TTL=-1):
+            response = self.client.get('/api/habits/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+PBKDF2_HASHERS = ['users.hashers.ConfigurablePBKDF2PasswordHasher']
+
+
+class PasswordHashingTest(APITestCase):
+    def setUp(self):
+        cache.clear()
+    
+    @override_settings(PASSWORD_HASHERS=PBKDF2_HASHERS, PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_iterations_from_settings(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+        self.assertFalse(needs_rehash(user.password))
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=2000):
+            self.assertTrue(needs_rehash(user.password))
+    
+    def test_login_rehashes_password(self):
+        with override_settings(PASSWORD_HASHERS=PBKDF2_HASHERS, PASSWORD_PBKDF2_ITERATIONS=1000):
+            User.objects.create_user(username='testuser', password='testpass123')
+        with override_settings(PASSWORD_HASHERS=PBKDF2_HASHERS, PASSWORD_PBKDF2_ITERATIONS=2000):
+            response = self.client.post('/api/login/', {'username': 'testuser', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(User.objects.get().password.startswith('pbkdf2_sha256$2000$'))
+    
+    def test_failed_login_sends_signal(self):
+        User.objects.create_user(username='testuser', password='testpass123')
+        receiver = mock.Mock()
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        response = self.client.post('/api/login/', {'username': 'testuser', 'password': 'wrong'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        receiver.assert_called_once()
+        self.assertEqual(receiver.call_args.kwargs['credentials']['username'], 'testuser')
+        self.assertNotEqual(receiver.call_args.kwargs['credentials']['password'], 'wrong')
+    
+    def test_username_throttled_before_hashing(self):
+        User.objects.create_user(username='testuser', password='testpass123')
+        for _ in range(5):
+            response = self.client.post('/api/login/', {'username': 'TestUser', 'password': 'wrong'})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        with mock.patch('users.hashing.run_hashing') as run_hashing:
+            response = self.client.post('/api/login/', {'username': 'testuser', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        run_hashing.assert_not_called()
+    
+    def test_login_ip_throttle_applies_with_token(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_token(user)}')
+        codes = [
+            self.client.post('/api/login/', {'username': f'user{i}', 'password': 'wrong'}).status_code
+            for i in range(21)
+        ]
+        self.assertEqual(codes[:20], [status.HTTP_400_BAD_REQUEST] * 20)
+        self.assertEqual(codes[20], status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    def test_login_ip_throttle_ignores_spoofed_forwarded_for(self):
+        # nginx дописывает настоящий адрес клиента в конец заголовка
+        codes = [
+            self.client.post(
+                '/api/login/', {'username': f'user{i}', 'password': 'wrong'},
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{i}, 203.0.113.7',
+            ).status_code
+            for i in range(21)
+        ]
+        self.assertEqual(codes[20], status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    def test_register_throttle_applies_with_token(self):
+        user = User.objects.create_user(username='testuser', password='testpass123')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {issue_token(user)}')
+        codes = [self.client.post('/api/register/', {}).status_code for _ in range(11)]
+        self.assertEqual(codes[:10], [status.HTTP_400_BAD_REQUEST] * 10)
+        self.assertEqual(codes[10], status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    def test_overloaded_pool_rejects_login(self):
+        User.objects.create_user(username='testuser', password='testpass123')
+        with mock.patch('users.hashing.get_pool', return_value=(None, threading.BoundedSemaphore(1))) as get_pool:
+            get_pool.return_value[1].acquire()
+            response = self.client.post('/api/login/', {'username': 'testuser', 'password': 'testpass123'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
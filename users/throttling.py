@@ -0,0 +1,28 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class IPRateThrottle(SimpleRateThrottle):
+    # В отличие от AnonRateThrottle, считает и запросы с токеном: иначе
+    # заголовок Authorization снимал бы ограничение по адресу
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginIPRateThrottle(IPRateThrottle):
+    # Проверка выполняется до разбора тела и хэширования пароля
+    scope = 'login_ip'
+
+
+class LoginUsernameRateThrottle(SimpleRateThrottle):
+    # Ограничивает подбор пароля к одному логину с разных адресов
+    scope = 'login_username'
+
+    def get_cache_key(self, request, view):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        if not username or not isinstance(username, str):
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': username.strip().lower()}
+
+
+class RegisterRateThrottle(IPRateThrottle):
+    scope = 'register'
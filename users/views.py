@@ -1,28 +1,49 @@
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import api_view, permission_classes, throttle_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from django.contrib.auth import login
+from .authentication import issue_token
 from .serializers import UserRegistrationSerializer, UserLoginSerializer
+from .throttling import LoginIPRateThrottle, LoginUsernameRateThrottle, RegisterRateThrottle
+
+
+def token_response(request, user, message, status_code):
+    # Вместо сессии выдаётся подписанный токен: вход не пишет в django_session,
+    # но, как login(), отправляет user_logged_in и обновляет last_login
+    user_logged_in.send(sender=user.__class__, request=request, user=user)
+    return Response({
+        'message': message,
+        'token': issue_token(user),
+        'expires_in': settings.AUTH_TOKEN_TTL,
+    }, status=status_code)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([RegisterRateThrottle])
 def register(request):
     serializer = UserRegistrationSerializer(data=request.data)
     if serializer.is_valid():
         user = serializer.save()
-        login(request, user)
-        return Response({'message': 'Пользователь успешно зарегистрирован'}, status=status.HTTP_201_CREATED)
+        return token_response(request, user, 'Пользователь успешно зарегистрирован', status.HTTP_201_CREATED)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPRateThrottle, LoginUsernameRateThrottle])
 def login_view(request):
-    serializer = UserLoginSerializer(data=request.data)
+    serializer = UserLoginSerializer(data=request.data, context={'request': request})
     if serializer.is_valid():
         user = serializer.validated_data['user']
-        login(request, user)
-        return Response({'message': 'Успешная авторизация'}, status=status.HTTP_200_OK)
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST) 
\ No newline at end of file
+        return token_response(request, user, 'Успешная авторизация', status.HTTP_200_OK)
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout_view(request):
+    request.user.revoke_tokens()
+    return Response({'message': 'Все токены пользователя отозваны'}, status=status.HTTP_200_OK)